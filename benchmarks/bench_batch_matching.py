@@ -0,0 +1,112 @@
+"""
+Пропускная способность воркера (пар резюме/вакансия в секунду):
+одна задача analyze_resume_task на пару против пакетных score_chunk_task.
+Брокер и backend - в памяти, воркер - поток в этом же процессе, Postgres - из .env.
+
+    python -m benchmarks.bench_batch_matching --vacancies 5000 --chunk 200
+"""
+import argparse
+import json
+import random
+import time
+
+from celery.contrib.testing.worker import start_worker
+from sqlalchemy import delete, select, update
+
+from celery_app import celery_app, run_async
+from database import engine, async_session_maker, check_schema_revision
+from features import store_resume_vectors, store_vacancy_vectors
+from ingest import upsert_vacancies
+from matching import SKILLS
+from models import Resume, User, Vacancy
+from tasks import aggregate_matches_task, analyze_resume_task, score_chunk_task
+
+PREFIX = "bench-match-"
+EMAIL = "bench-match@example.com"
+
+
+def make_text(rng, words, length):
+    return " ".join(rng.choices(words, k=length) + rng.sample(list(SKILLS), 6))
+
+
+async def seed(count, length):
+    """Вакансии с описаниями и векторами + одно резюме; возвращает (resume_id, [vacancy_id])"""
+    rng = random.Random(1)
+    words = [f"слово{i}" for i in range(20000)]
+    await check_schema_revision()
+
+    async with async_session_maker() as session:
+        await upsert_vacancies(session, [{"id": f"{PREFIX}{i}", "name": f"Bench {i}",
+                                          "alternate_url": ""} for i in range(count)])
+        ids = (await session.execute(select(Vacancy.id).where(Vacancy.hh_id.like(f"{PREFIX}%"))
+                                     .order_by(Vacancy.id))).scalars().all()
+        rows = [{"id": vacancy_id, "description": make_text(rng, words, length)} for vacancy_id in ids]
+        await session.execute(update(Vacancy), rows)
+        await store_vacancy_vectors(session, [(row["id"], row["description"]) for row in rows])
+
+        user_id = await session.scalar(select(User.id).where(User.email == EMAIL))
+        if user_id is None:
+            user = User(email=EMAIL, hashed_password="-")
+            session.add(user)
+            await session.flush()
+            user_id = user.id
+        resume = Resume(user_id=user_id, content=make_text(rng, words, length))
+        session.add(resume)
+        await session.flush()
+        await store_resume_vectors(session, [(resume.id, resume.content)])
+        await session.commit()
+        return resume.id, list(ids)
+
+
+async def cleanup():
+    async with async_session_maker() as session:
+        await session.execute(delete(Vacancy).where(Vacancy.hh_id.like(f"{PREFIX}%")))
+        user_ids = select(User.id).where(User.email == EMAIL).scalar_subquery()
+        await session.execute(delete(Resume).where(Resume.user_id == user_ids))
+        await session.execute(delete(User).where(User.email == EMAIL))
+        await session.commit()
+
+
+def report(name, pairs, elapsed):
+    print(f"{name:<28} pairs={pairs:<6} time={elapsed:7.2f} s  rate={pairs / elapsed:8.0f} pairs/s")
+
+
+def main(count, length, chunk_size, single):
+    celery_app.conf.update(broker_url="memory://", result_backend="cache+memory://")
+    engine.echo = False  # лог SQL из database.py исказит замер
+    resume_id, vacancy_ids = run_async(seed(count, length))
+    print(f"seeded {len(vacancy_ids)} vacancies, ~{length} words each")
+
+    signature = score_chunk_task.s(resume_id, vacancy_ids[:chunk_size])
+    print(f"message args per chunk: {len(json.dumps(signature.args))} bytes "
+          f"(texts of the chunk: ~{chunk_size * length * 9} bytes)")
+
+    try:
+        with start_worker(celery_app, pool="solo", perform_ping_check=False, shutdown_timeout=30):
+            pairs = vacancy_ids[:single]
+            started = time.perf_counter()
+            results = [analyze_resume_task.delay(resume_id, vacancy_id) for vacancy_id in pairs]
+            for result in results:
+                result.get(timeout=600)
+            report("one task per pair", len(pairs), time.perf_counter() - started)
+
+            chunks = [vacancy_ids[start:start + chunk_size] for start in range(0, len(vacancy_ids), chunk_size)]
+            started = time.perf_counter()
+            results = [score_chunk_task.delay(resume_id, chunk) for chunk in chunks]
+            scored = [result.get(timeout=600) for result in results]
+            ranked = aggregate_matches_task(scored, resume_id, 20)
+            report(f"score_chunk_task x{len(chunks)}", ranked["total"], time.perf_counter() - started)
+            print(f"best score: {ranked['matches'][0]['score']}")
+    finally:
+        run_async(cleanup())
+        run_async(engine.dispose())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vacancies", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=300, help="слов в описании")
+    parser.add_argument("--chunk", type=int, default=200)
+    parser.add_argument("--single", type=int, default=300, help="пар для замера по одной задаче")
+    args = parser.parse_args()
+    main(args.vacancies, args.words, args.chunk, args.single)
@@ -0,0 +1,93 @@
+"""
+Поиск почти-дубликатов (dedup.py) на синтетическом корпусе (без БД): скорость подписей,
+сборка LSH-индекса, его память и латентность поиска кандидатов с проверкой по подписи.
+Часть вакансий - копии других с правками (замена и вставка слов), по ним считается полнота.
+
+    python -m benchmarks.bench_dedup --vacancies 100000 --duplicates 0.05
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from dedup import NUM_PERM, DuplicateIndex, band_keys, signature, similarity
+
+THRESHOLD = 0.8
+
+
+def make_corpus(vacancies, duplicates, vocabulary, words_per_doc, edits, seed):
+    """Тексты и пары (копия, оригинал): копия - оригинал с edits заменёнными словами и парой вставок"""
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    ranks = np.arange(1, vocabulary + 1)
+    draws = rng.choice(vocabulary, size=(vacancies, words_per_doc), p=(1 / ranks) / np.sum(1 / ranks))
+    texts = [" ".join(words[row]) for row in draws]
+
+    pairs = []
+    for copy in rng.choice(vacancies, size=int(vacancies * duplicates), replace=False):
+        original = int(rng.integers(vacancies))
+        if original == copy:
+            continue
+        tokens = texts[original].split()
+        for position in rng.choice(len(tokens), size=edits, replace=False):
+            tokens[position] = "правка"
+        tokens[1:1] = ["агентство", "звоните"]
+        texts[copy] = " ".join(tokens)
+        pairs.append((int(copy), original))
+    return texts, pairs
+
+
+def main(vacancies, duplicates, vocabulary, words_per_doc, edits, queries):
+    texts, pairs = make_corpus(vacancies, duplicates, vocabulary, words_per_doc, edits, seed=1)
+
+    started = time.perf_counter()
+    signatures = [signature(text) for text in texts]
+    elapsed = time.perf_counter() - started
+    print(f"signatures: {vacancies} in {elapsed:.1f} s, {vacancies / elapsed:.0f} /s "
+          f"({words_per_doc} words, {NUM_PERM} permutations)")
+
+    index = DuplicateIndex()
+    started = time.perf_counter()
+    for vacancy_id, values in enumerate(signatures):
+        index.upsert(vacancy_id, band_keys(values))
+    inserted = time.perf_counter() - started
+    started = time.perf_counter()
+    index.candidates(band_keys(signatures[0]))
+    print(f"index: insert {inserted:.1f} s, build {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"{index.nbytes() / 2 ** 20:.1f} MB ({index.nbytes() / vacancies:.0f} B/vacancy)")
+
+    latencies = []
+    candidates_seen = []
+    for query in np.random.default_rng(2).choice(vacancies, size=queries, replace=False):
+        started = time.perf_counter()
+        candidates = index.candidates(band_keys(signatures[query])) - {int(query)}
+        [other for other in candidates if similarity(signatures[query], signatures[other]) >= THRESHOLD]
+        latencies.append((time.perf_counter() - started) * 1000)
+        candidates_seen.append(len(candidates))
+    latencies.sort()
+    print(f"query: p50={statistics.median(latencies):.3f} ms  p99={latencies[int(len(latencies) * 0.99) - 1]:.3f} ms  "
+          f"candidates/query={statistics.mean(candidates_seen):.2f}")
+
+    found = sum(1 for copy, original in pairs
+                if original in index.candidates(band_keys(signatures[copy]))
+                and similarity(signatures[copy], signatures[original]) >= THRESHOLD)
+    print(f"planted duplicates: {found}/{len(pairs)} found (threshold {THRESHOLD}, {edits} edits)")
+
+    started = time.perf_counter()
+    for vacancy_id in range(vacancies, vacancies + 500):
+        index.upsert(vacancy_id, band_keys(signatures[vacancy_id - vacancies]))
+        index.candidates(band_keys(signatures[vacancy_id - vacancies]))
+    print(f"500 incremental upsert + query: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vacancies", type=int, default=100_000)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="доля вакансий-копий")
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=300, help="слов в описании")
+    parser.add_argument("--edits", type=int, default=5, help="заменённых слов в копии")
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.vacancies, args.duplicates, args.vocabulary, args.words, args.edits, args.queries)
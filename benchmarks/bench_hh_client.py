@@ -0,0 +1,69 @@
+"""
+Задержки запросов к HH через общий пул соединений и через новый клиент на каждый запрос
+(как было раньше). Бьёт в локальную заглушку benchmarks/hh_stub.py.
+
+    python -m benchmarks.bench_hh_client --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+PORT = 8901
+os.environ.setdefault("HH_API_URL", f"http://127.0.0.1:{PORT}")
+os.environ.setdefault("HH_RATE_LIMIT", "0")
+
+import hh_client  # noqa: E402  (HH_API_URL должен быть выставлен до импорта настроек)
+from benchmarks.hh_stub import run_stub  # noqa: E402
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def fresh_client_request(path):
+    async with httpx.AsyncClient(base_url=hh_client.settings.HH_API_URL) as client:
+        return await client.get(path)
+
+
+async def pooled_request(path):
+    return await hh_client.hh_request("GET", path)
+
+
+async def run(name, request, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request(f"/vacancies/{i}")
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    print(f"{name:<8} p50={percentile(latencies, 0.50):7.2f} ms  p99={percentile(latencies, 0.99):7.2f} ms  "
+          f"mean={statistics.mean(latencies):7.2f} ms  rps={total / elapsed:8.0f}")
+
+
+async def main(total, concurrency):
+    await run("fresh", fresh_client_request, total, concurrency)
+    await run("pooled", pooled_request, total, concurrency)
+    await hh_client.close_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with run_stub(PORT, latency_ms=args.latency_ms):
+        asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,82 @@
+"""
+Сравнение старого цикла "SELECT на каждую вакансию" с пакетным upsert из ingest.py.
+
+Запуск (нужна БД из .env после `alembic upgrade head`):
+    python -m benchmarks.bench_ingest --items 5000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import delete, select
+
+from database import engine, async_session_maker, check_schema_revision
+from ingest import upsert_vacancies
+from models import Vacancy
+
+
+def make_items(count, prefix):
+    return [{"id": f"{prefix}-{i}",
+             "name": f"Python Developer {i}",
+             "alternate_url": f"https://hh.ru/vacancy/{prefix}-{i}"}
+            for i in range(count)]
+
+
+async def legacy_loop(session, items):
+    """Копия прежнего кода из main.search_vacancies"""
+    saved = 0
+    for job in items:
+        query = select(Vacancy).where(Vacancy.hh_id == job.get('id'))
+        result = await session.execute(query)
+        if result.scalar_one_or_none() is None:
+            session.add(Vacancy(hh_id=job.get('id'),
+                                name=job.get('name'),
+                                url=job.get('alternate_url')))
+            saved += 1
+    await session.commit()
+    return saved
+
+
+async def bulk_upsert(session, items):
+    counters = await upsert_vacancies(session, items)
+    await session.commit()
+    return counters["saved_new"]
+
+
+async def measure(name, func, items):
+    async with async_session_maker() as session:
+        started = time.perf_counter()
+        saved = await func(session, items)
+        elapsed = time.perf_counter() - started
+    print(f"{name:<14} items={len(items):<6} saved={saved:<6} "
+          f"time={elapsed * 1000:8.1f} ms  rate={len(items) / elapsed:10.0f} items/s")
+    return elapsed
+
+
+async def main(count):
+    await check_schema_revision()
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    legacy_items = make_items(count, f"{prefix}-legacy")
+    bulk_items = make_items(count, f"{prefix}-bulk")
+
+    try:
+        # Первый проход - всё новое, второй - всё уже есть в базе (типичный повторный поиск)
+        legacy_new = await measure("legacy/new", legacy_loop, legacy_items)
+        legacy_dup = await measure("legacy/dup", legacy_loop, legacy_items)
+        bulk_new = await measure("upsert/new", bulk_upsert, bulk_items)
+        bulk_dup = await measure("upsert/dup", bulk_upsert, bulk_items)
+        print(f"speedup: new x{legacy_new / bulk_new:.1f}, dup x{legacy_dup / bulk_dup:.1f}")
+    finally:
+        async with async_session_maker() as session:
+            await session.execute(delete(Vacancy).where(Vacancy.hh_id.like(f"{prefix}-%")))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.items))
@@ -0,0 +1,73 @@
+"""
+Нагрузочный тест: латентность GET /vacancies до и во время пачки логинов.
+Пока bcrypt считался прямо в event loop, каждый логин останавливал весь процесс,
+и поиск ждал сотни миллисекунд; теперь латентность должна оставаться ровной,
+а лишние логины - получать 503.
+
+Нужен запущенный API (HH лучше подменить заглушкой, чтобы мерить только сервер):
+    python -m benchmarks.hh_stub --port 8900 &
+    HH_API_URL=http://127.0.0.1:8900 HH_RATE_LIMIT=0 uvicorn main:app --port 8000 &
+    python -m benchmarks.bench_login_burst --api http://127.0.0.1:8000 --logins 64
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+
+async def probe(client, count, interval):
+    """Последовательные GET /vacancies, латентности в мс"""
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = await client.get("/vacancies", params={"text": "python"})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def describe(name, latencies):
+    latencies = sorted(latencies)
+    print(f"{name:<28} p50={statistics.median(latencies):7.1f} ms  "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:7.1f} ms  max={latencies[-1]:7.1f} ms")
+
+
+async def main(api, logins, probes):
+    async with httpx.AsyncClient(base_url=api, timeout=60) as client:
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        credentials = {"email": email, "password": "bench-password"}
+        (await client.post("/register", json=credentials)).raise_for_status()
+
+        await probe(client, 5, 0)  # прогрев
+        describe("/vacancies, idle", await probe(client, probes, 0.02))
+
+        async def login():
+            started = time.perf_counter()
+            response = await client.post("/login", json=credentials)
+            return response.status_code, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        burst = asyncio.gather(*[login() for _ in range(logins)])
+        during = await probe(client, probes, 0.02)
+        results = await burst
+        elapsed = time.perf_counter() - started
+
+        describe(f"/vacancies, {logins} logins", during)
+        codes = Counter(code for code, _ in results)
+        ok = [ms for code, ms in results if code == 200]
+        print(f"logins: {dict(codes)} in {elapsed:.1f} s"
+              + (f", p50 of successful {statistics.median(ok):.0f} ms" if ok else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api", default="http://127.0.0.1:8000")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--probes", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(main(args.api, args.logins, args.probes))
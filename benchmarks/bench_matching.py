@@ -0,0 +1,70 @@
+"""
+Скорость matching.score_texts с IDF по корпусу (как в tasks.py): пар резюме/вакансия
+в секунду на одном ядре. Перед замером - проверка, что IDF работает.
+
+    python -m benchmarks.bench_matching --pairs 5000
+"""
+import argparse
+import random
+import time
+
+from matching import score_texts, score_vectors, term_weights, tokenize
+from benchmarks.bench_clean_html import make_description
+from html_text import html_to_text
+from vacancy_index import VacancyIndex
+
+RESUME_PARTS = [
+    "Python разработчик, 3 года коммерческого опыта.",
+    "Стек: FastAPI, Django, SQLAlchemy, PostgreSQL, Redis, Celery, RabbitMQ.",
+    "Писал микросервисы на asyncio, настраивал CI/CD в GitLab, Docker и docker-compose.",
+    "Покрываю код тестами на pytest, провожу code review.",
+    "Английский язык - B1, читаю документацию.",
+    "Опыт работы с Linux-серверами и Kubernetes на уровне пользователя.",
+]
+
+
+def make_resume(rnd):
+    return " ".join(rnd.choices(RESUME_PARTS, k=rnd.randint(4, 12)))
+
+
+def check_idf():
+    """Терм, который есть во всех вакансиях, не должен перевешивать редкий"""
+    index = VacancyIndex()
+    index.loaded = True  # без БД: весь корпус - то, что добавлено ниже
+    for vacancy_id in range(100):
+        index.upsert_weights(vacancy_id, {"опыт": 1.0, f"редкий{vacancy_id}": 1.0})
+    resume = {"опыт": 1.0, "редкий0": 1.0}
+    rare = {"редкий0": 1.0, "офис": 1.0}
+    common = {"опыт": 1.0, "офис": 1.0}
+    idf = index.idf_for(resume.keys() | rare.keys() | common.keys())
+
+    # Без IDF обе пары одинаковы: по одному общему терму из двух
+    assert score_vectors(resume, rare)["similarity"] == score_vectors(resume, common)["similarity"]
+    rare_result, common_result = score_vectors(resume, rare, idf), score_vectors(resume, common, idf)
+    assert rare_result["similarity"] > 2 * common_result["similarity"], (rare_result, common_result)
+    assert rare_result["top_terms"][0]["term"] == "редкий0"
+    print(f"idf check: rare {rare_result['similarity']} > common {common_result['similarity']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=2000)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    resumes = [make_resume(rnd) for _ in range(50)]
+    vacancies = [html_to_text(make_description(rnd)) for _ in range(200)]
+    pairs = [(rnd.choice(resumes), rnd.choice(vacancies)) for _ in range(args.pairs)]
+
+    check_idf()
+    index = VacancyIndex()
+    index.loaded = True  # без БД: весь корпус - то, что добавлено ниже
+    for vacancy_id, vacancy in enumerate(vacancies):
+        index.upsert_weights(vacancy_id, term_weights(tokenize(vacancy)))
+    idf = index.idf_for({term for text in resumes + vacancies for term in tokenize(text)})
+
+    started = time.perf_counter()
+    for resume, vacancy in pairs:
+        score_texts(resume, vacancy, idf)
+    elapsed = time.perf_counter() - started
+    print(f"pairs={len(pairs)}  {len(pairs) / elapsed:8.0f} pairs/s  {elapsed / len(pairs) * 1000:6.3f} ms/pair")
@@ -0,0 +1,146 @@
+"""
+Проверка, что метрики (metrics.py) стоят меньше 1% времени запроса.
+
+Цена считается по частям: middleware на пустом маршруте (с ним и без него) и пара
+обработчиков SQL-событий на запрос, умноженная на число запросов к БД. Затем она делится
+на медианное время реальных эндпоинтов main.app, вызванных в процессе через ASGI
+(без сети, то есть с самым строгим знаменателем). Код возврата 1 - порог превышен.
+
+Нужна БД из .env после `alembic upgrade head` (хватит нескольких вакансий и резюме):
+    python -m benchmarks.bench_metrics_overhead --requests 300
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import metrics
+from config import settings
+
+ENDPOINTS = {"/vacancies/list?limit=20": "/vacancies/list", "/resumes?limit=20": "/resumes",
+             "/vacancies/search?q=python": "/vacancies/search"}  # путь -> шаблон маршрута
+THRESHOLD = 0.01
+
+
+async def asgi_call(app, path, scope_template):
+    """Один запрос к ASGI-приложению напрямую: стоимость без httpx и сокетов"""
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        pass
+
+    await app({**scope_template, "path": path, "raw_path": path.encode()}, receive, send)
+
+
+async def per_call_us(app, path, calls, rounds=5):
+    """Лучшее из нескольких прогонов среднее время вызова, мкс"""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "query_string": b"", "root_path": "", "headers": [],
+             "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(calls):
+            await asgi_call(app, path, scope)
+        best = min(best, (time.perf_counter() - started) / calls * 1e6)
+    return best
+
+
+async def middleware_cost(calls):
+    """Middleware вокруг приложения, которое сразу отвечает: разница - чистая цена метрик"""
+    route = SimpleNamespace(path="/ping")
+
+    async def instant(scope, receive, send):
+        scope["route"] = route
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    without = await per_call_us(instant, "/ping", calls)
+    with_metrics = await per_call_us(metrics.MetricsMiddleware(instant), "/ping", calls)
+    return without, with_metrics
+
+
+def listener_cost(calls):
+    """Пара before/after_cursor_execute через диспетчер событий движка, мкс"""
+    engine = create_async_engine(settings.DATABASE_URL)  # без подключения к БД
+    metrics.instrument_engine(engine, "bench")
+    dispatch = engine.sync_engine.dispatch
+    conn = SimpleNamespace(info={})
+    usage = [0, 0.0]
+    token = metrics._db_usage.set(usage)
+    started = time.perf_counter()
+    for _ in range(calls):
+        dispatch.before_cursor_execute(conn, None, "", None, None, False)
+        dispatch.after_cursor_execute(conn, None, "", None, None, False)
+    elapsed = (time.perf_counter() - started) / calls * 1e6
+    metrics._db_usage.reset(token)
+    return elapsed
+
+
+def queries_per_request(route):
+    for sample in metrics.HTTP_REQUEST_DB_QUERIES.collect()[0].samples:
+        if sample.labels.get("route") == route and sample.name.endswith("_sum"):
+            total = sample.value
+        if sample.labels.get("route") == route and sample.name.endswith("_count"):
+            count = sample.value
+    return total / count
+
+
+async def endpoint_latencies(requests):
+    from main import app
+
+    latencies = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ENDPOINTS:
+            for _ in range(5):  # прогрев: пулы, кэши планов
+                (await client.get(path)).raise_for_status()
+            samples = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                (await client.get(path)).raise_for_status()
+                samples.append((time.perf_counter() - started) * 1e6)
+            latencies[path] = statistics.median(samples)
+    return latencies
+
+
+async def main(requests, calls):
+    if not settings.METRICS_ENABLED:
+        sys.exit("METRICS_ENABLED=false - мерить нечего")
+
+    without, with_metrics = await middleware_cost(calls)
+    middleware_us = max(0.0, with_metrics - without)
+    listener_us = listener_cost(calls)
+    print(f"middleware: {without:.1f} -> {with_metrics:.1f} us per call (+{middleware_us:.1f} us)")
+    print(f"SQL listeners: {listener_us:.2f} us per query")
+
+    latencies = await endpoint_latencies(requests)
+    worst = 0.0
+    for path, latency in latencies.items():
+        queries = queries_per_request(ENDPOINTS[path])
+        overhead = middleware_us + queries * listener_us
+        share = overhead / latency
+        worst = max(worst, share)
+        print(f"{path:<30} p50={latency / 1000:7.2f} ms  queries={queries:4.1f}  "
+              f"overhead={overhead:5.1f} us ({share:.2%})")
+
+    from database import engine
+    await engine.dispose()
+    print(f"worst: {worst:.2%} (threshold {THRESHOLD:.0%})")
+    return worst < THRESHOLD
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300, help="запросов на эндпоинт")
+    parser.add_argument("--calls", type=int, default=20000, help="вызовов в микробенчмарках")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.requests, args.calls)) else 1)
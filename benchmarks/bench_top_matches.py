@@ -0,0 +1,69 @@
+"""
+Латентность VacancyIndex.top_k на синтетическом корпусе (без БД).
+Словарь - распределение Ципфа, как у реальных текстов, плюс навыки из matching.SKILLS.
+
+    python -m benchmarks.bench_top_matches --vacancies 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from matching import SKILLS, term_weights
+from vacancy_index import VacancyIndex
+
+
+def main(vacancies, vocabulary, terms_per_doc, queries):
+    rng = np.random.default_rng(1)
+    words = [f"w{i}" for i in range(vocabulary)] + list(SKILLS)
+    ranks = np.arange(1, len(words) + 1)
+    probabilities = (1 / ranks) / np.sum(1 / ranks)
+
+    draws = rng.choice(len(words), size=(vacancies, terms_per_doc), p=probabilities)
+    index = VacancyIndex()
+    index.loaded = True  # без БД: весь корпус - то, что добавлено ниже
+    started = time.perf_counter()
+    for vacancy_id in range(vacancies):
+        index.upsert_weights(vacancy_id, term_weights([words[i] for i in draws[vacancy_id]]))
+    print(f"insert: {vacancies} vacancies in {time.perf_counter() - started:.1f} s")
+
+    started = time.perf_counter()
+    index._merge()  # в API - VacancyIndex.merge в потоке
+    print(f"build:  {(time.perf_counter() - started) * 1000:.0f} ms, vocabulary={len(index.vocabulary)}")
+
+    resume_words = random.Random(2)
+    latencies = []
+    for _ in range(queries):
+        resume = " ".join(resume_words.choices(words[:5000], k=150) + list(SKILLS)[:8])
+        started = time.perf_counter()
+        index.top_k(resume, k=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    print(f"top_k:  p50={statistics.median(latencies):.1f} ms  "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f} ms  (k=20)")
+
+    started = time.perf_counter()
+    for vacancy_id in range(vacancies, vacancies + 500):
+        index.upsert_weights(vacancy_id, term_weights([words[i] for i in draws[vacancy_id - vacancies]]))
+    index.top_k("python", k=20)
+    print(f"500 incremental inserts + first query: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    latencies = []
+    for _ in range(queries):
+        resume = " ".join(resume_words.choices(words[:5000], k=150))
+        started = time.perf_counter()
+        index.top_k(resume, k=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"top_k with delta: p50={statistics.median(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vacancies", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--terms", type=int, default=300, help="токенов в описании")
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+    main(args.vacancies, args.vocabulary, args.terms, args.queries)
@@ -0,0 +1,121 @@
+"""
+Латентность локального полнотекстового поиска (vacancy_search.py) на синтетических вакансиях
+против наивного ILIKE по описанию. Нужна БД из .env после `alembic upgrade head`.
+
+    python -m benchmarks.bench_vacancy_search --vacancies 100000
+    python -m benchmarks.bench_vacancy_search --cleanup   # удалить синтетические строки
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import delete, func, insert, select, text
+
+from database import engine, async_session_maker, check_schema_revision
+from matching import SKILLS
+from models import Vacancy
+from vacancy_search import search_vacancies_local
+
+PREFIX = "bench-fts-"
+CHUNK = 2000
+
+ROLES = ["разработчик", "программист", "инженер", "аналитик", "тестировщик", "архитектор",
+         "developer", "engineer", "менеджер", "дизайнер", "администратор", "тимлид"]
+LEVELS = ["junior", "middle", "senior", "lead", "стажер", "ведущий", "старший", "младший"]
+WORDS = """опыт работы команда проект разработка поддержка сервис система задачи требования
+условия офис удаленно график зарплата компания продукт клиенты данные база запросы оптимизация
+архитектура микросервисы интеграция тестирование документация код ревью релиз развитие обучение
+знание понимание умение английский уровень высшее образование плюсом будет преимуществом
+мы ищем предлагаем оформление отпуск бонусы ДМС гибкий стабильный крупный банк финтех ритейл
+we are looking for experience with strong knowledge team product backend frontend fullstack
+scalable services design development testing deployment cloud infrastructure monitoring""".split()
+
+
+def make_vacancy(rng, vocabulary, number, words_per_doc):
+    skills = rng.sample(list(SKILLS), 5)
+    name = f"{rng.choice(LEVELS).capitalize()} {rng.choice(skills)} {rng.choice(ROLES)}"
+    body = rng.choices(vocabulary, k=words_per_doc) + skills * 2
+    rng.shuffle(body)
+    return {"hh_id": f"{PREFIX}{number}", "name": name,
+            "url": f"https://hh.ru/vacancy/{PREFIX}{number}", "description": " ".join(body)}
+
+
+async def seed(count, words_per_doc):
+    await check_schema_revision()
+    async with async_session_maker() as session:
+        existing = await session.scalar(select(func.count()).where(Vacancy.hh_id.like(f"{PREFIX}%")))
+        if existing >= count:
+            print(f"already seeded: {existing}")
+            return
+        rng = random.Random(existing)
+        # Хвост Ципфа из синтетических слов поверх живого словаря
+        vocabulary = WORDS * 40 + [f"термин{i}" for i in range(30000)]
+        started = time.perf_counter()
+        for start in range(existing, count, CHUNK):
+            rows = [make_vacancy(rng, vocabulary, number, words_per_doc)
+                    for number in range(start, min(start + CHUNK, count))]
+            await session.execute(insert(Vacancy), rows)
+            await session.commit()
+        await session.execute(text("ANALYZE vacancy"))
+        await session.commit()
+        print(f"seeded {count - existing} vacancies in {time.perf_counter() - started:.1f} s")
+
+
+async def measure(name, func, repeats):
+    latencies = []
+    result = None
+    async with async_session_maker() as session:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = await func(session)
+            latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    print(f"{name:<40} p50={statistics.median(latencies):7.1f} ms  "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:7.1f} ms")
+    return result
+
+
+async def main(count, words_per_doc, repeats):
+    engine.echo = False  # лог SQL из database.py исказит замер
+    await seed(count, words_per_doc)
+
+    queries = ["python django", "senior разработчик postgresql", "kafka -java", "\"data\" engineer",
+               "тестировщик pytest", "аналитик sql", "kubernetes docker linux", "redis or rabbitmq"]
+    for q in queries:
+        page = await measure(f"fts: {q}", lambda s, q=q: search_vacancies_local(s, q, 20, 0), repeats)
+        if page["items"]:
+            print(f"    top: {page['items'][0]['name_highlight']} (rank {page['items'][0]['rank']})")
+
+    await measure("fts, 5th page: python", lambda s: search_vacancies_local(s, "python", 20, 80), repeats)
+
+    async def ilike(session):
+        rows = await session.execute(select(Vacancy.id, Vacancy.name)
+                                     .where(Vacancy.description.ilike("%postgresql%"),
+                                            Vacancy.description.ilike("%senior%"))
+                                     .limit(20))
+        return rows.all()
+    await measure("ILIKE baseline (no ranking)", ilike, max(3, repeats // 10))
+    await engine.dispose()
+
+
+async def cleanup():
+    async with async_session_maker() as session:
+        result = await session.execute(delete(Vacancy).where(Vacancy.hh_id.like(f"{PREFIX}%")))
+        await session.commit()
+        print(f"deleted {result.rowcount}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vacancies", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=200, help="слов в описании")
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+    if args.cleanup:
+        asyncio.run(cleanup())
+    else:
+        asyncio.run(main(args.vacancies, args.words, args.repeats))
@@ -0,0 +1,84 @@
+"""
+Синтетические данные для нагрузочных сценариев (benchmarks.loadtest) в БД из .env.
+
+Все строки помечены префиксом PREFIX и удаляются cleanup(): резюме уходят каскадом
+вместе с пользователями, векторы - вместе с вакансиями и резюме. Тексты резюме содержат
+токен запуска, поэтому кэш /match (ключ - хеш текста) не переносится между прогонами.
+
+Нужен Postgres после `alembic upgrade head`: SQLite не подойдёт - схема использует
+tsvector, JSONB и INSERT ... ON CONFLICT диалекта PostgreSQL.
+"""
+import random
+
+from sqlalchemy import delete, insert
+
+from database import async_session_maker, check_schema_revision
+from features import store_resume_vectors, store_vacancy_vectors
+from models import Resume, User, Vacancy
+from security import pwd_context
+
+PREFIX = "bench-load-"
+PASSWORD = "bench-password"
+
+SKILLS = ["Python", "FastAPI", "Django", "PostgreSQL", "Redis", "Celery", "Docker", "Kubernetes",
+          "Kafka", "Go", "Java", "SQL", "Linux", "Git", "asyncio", "RabbitMQ"]
+WORDS = ("разработка сервисов высоконагруженные системы проектирование API микросервисы "
+         "оптимизация запросов тестирование код ревью команда продукт backend опыт").split()
+
+
+def make_text(rng, words):
+    return " ".join(rng.choices(WORDS, k=words) + rng.sample(SKILLS, 5))
+
+
+async def insert_returning_ids(session, model, rows):
+    """Пакетный INSERT; id возвращаются в порядке rows"""
+    result = await session.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return result.scalars().all()
+
+
+async def seed(run_token, users=10, resumes=100, vacancies=1000, unfilled=200, words=150, seed=1):
+    """
+    vacancies - с описанием и векторами (для /match и /vacancies/search),
+    unfilled - без описания (для /vacancies/{hh_id}/fill), resumes - по одному на пару /match.
+    Возвращает словарь с email пользователей, id резюме и вакансий, hh_id без описания.
+    """
+    await check_schema_revision()
+    rng = random.Random(seed)
+    # Один хеш на всех: bcrypt на каждого пользователя сделал бы посев дольше самого теста
+    hashed = pwd_context.hash(PASSWORD)
+
+    async with async_session_maker() as session:
+        emails = [f"{PREFIX}{run_token}-{number}@example.com" for number in range(users)]
+        user_ids = await insert_returning_ids(session, User, [{"email": email, "hashed_password": hashed}
+                                                               for email in emails])
+
+        resume_rows = [{"user_id": user_ids[number % users],
+                        "content": f"{make_text(rng, words)} {run_token}-{number}"}
+                       for number in range(resumes)]
+        resume_ids = await insert_returning_ids(session, Resume, resume_rows)
+        await store_resume_vectors(session, [(resume_id, row["content"])
+                                             for resume_id, row in zip(resume_ids, resume_rows)])
+
+        vacancy_rows = [{"hh_id": f"{PREFIX}{run_token}-{number}",
+                         "name": f"{rng.choice(SKILLS)} developer #{number}",
+                         "url": f"https://hh.ru/vacancy/{PREFIX}{number}",
+                         "description": make_text(rng, words) if number < vacancies else None}
+                        for number in range(vacancies + unfilled)]
+        vacancy_ids = await insert_returning_ids(session, Vacancy, vacancy_rows)
+        await store_vacancy_vectors(session, [(vacancy_id, row["description"])
+                                              for vacancy_id, row in zip(vacancy_ids, vacancy_rows)
+                                              if row["description"]])
+        await session.commit()
+
+    return {"emails": emails, "password": PASSWORD, "resume_ids": list(resume_ids),
+            "vacancy_ids": list(vacancy_ids[:vacancies]),
+            "unfilled_hh_ids": [row["hh_id"] for row in vacancy_rows[vacancies:]]}
+
+
+async def cleanup():
+    """Удаляет всё, что создали seed() и сценарии (в том числе вакансии из заглушки HH)"""
+    async with async_session_maker() as session:
+        vacancies = await session.execute(delete(Vacancy).where(Vacancy.hh_id.like(f"{PREFIX}%")))
+        users = await session.execute(delete(User).where(User.email.like(f"{PREFIX}%")))
+        await session.commit()
+    return {"vacancies": vacancies.rowcount, "users": users.rowcount}
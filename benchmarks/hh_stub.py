@@ -0,0 +1,186 @@
+"""
+Локальная заглушка api.hh.ru для бенчмарков: /vacancies и /vacancies/{id}.
+Задержка с разбросом, доля ошибок (500 или 429 с Retry-After) и глубина выдачи
+настраиваются; при одном seed ответы одинаковы от запуска к запуску.
+
+Вакансия i опубликована за i * publish_step_minutes до старта заглушки, выдача
+фильтруется по date_from/date_to. Для проверки обновления сохранённых поисков:
+POST /stub/republish {"ids": [...], "change_description": true} - переопубликовать,
+POST /stub/archive {"ids": [...]} - убрать в архив.
+
+Отдельный запуск:
+    python -m benchmarks.hh_stub --port 8900 --latency-ms 20 --jitter-ms 10 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+DESCRIPTION = "<p>Ищем <strong>Python</strong> разработчика.</p><ul><li>FastAPI</li><li>PostgreSQL</li></ul>"
+SKILLS = ["Python", "FastAPI", "Django", "PostgreSQL", "Redis", "Celery", "Docker", "Kubernetes",
+          "Kafka", "Go", "Java", "SQL", "Linux", "Git", "asyncio", "RabbitMQ"]
+FILLER = ("опыт работы в команде над продуктом, поддержка и развитие сервисов, код ревью, "
+          "тестирование, проектирование API, оптимизация запросов к базе данных").split()
+MAX_DEPTH = 2000  # HH не отдаёт дальше 2000-го результата выдачи
+
+
+def make_description(vacancy_id, words, seed, version=0):
+    """HTML-описание, одинаковое для одного id и версии: несколько навыков из SKILLS + наполнитель"""
+    if not words:
+        return DESCRIPTION + (f"<p>Редакция {version}</p>" if version else "")
+    rng = random.Random(f"{seed}:{vacancy_id}:{version}")
+    skills = rng.sample(SKILLS, 4)
+    body = " ".join(rng.choices(FILLER, k=words))
+    return (f"<p>Ищем разработчика: {', '.join(skills[:2])}.</p><p>{body}</p>"
+            f"<ul>{''.join(f'<li>{skill}</li>' for skill in skills)}</ul>")
+
+
+def hh_date(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+
+def create_stub_app(latency_ms=0.0, found=200, jitter_ms=0.0, error_rate=0.0, error_status=500,
+                    retry_after=0, description_words=0, id_prefix="", seed=1, publish_step_minutes=10.0):
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.counters = {"requests": 0, "errors": 0}
+    started = datetime.now(timezone.utc).replace(microsecond=0)
+    republished = {}  # id -> новая дата публикации
+    versions = {}  # id -> редакция описания
+    archived = set()
+
+    def published(index):
+        vacancy_id = f"{id_prefix}{100000 + index}"
+        return republished.get(vacancy_id) or started - timedelta(minutes=index * publish_step_minutes)
+
+    async def simulate():
+        """Задержка сети/HH и, с вероятностью error_rate, ответ-ошибка"""
+        app.state.counters["requests"] += 1
+        delay = latency_ms + (rng.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if error_rate and rng.random() < error_rate:
+            app.state.counters["errors"] += 1
+            headers = {"Retry-After": str(retry_after)} if error_status == 429 else {}
+            return Response(status_code=error_status, headers=headers)
+        return None
+
+    @app.get("/vacancies")
+    async def vacancies(text: str = "", page: int = 0, per_page: int = 10,
+                        date_from: str | None = None, date_to: str | None = None):
+        error = await simulate()
+        if error is not None:
+            return error
+        if date_from is None and date_to is None and not republished and not archived:
+            total = found
+            indexes = range(page * per_page, min((page + 1) * per_page, min(found, MAX_DEPTH)))
+        else:
+            start = datetime.fromisoformat(date_from) if date_from else None
+            end = datetime.fromisoformat(date_to) if date_to else None
+            matched = [i for i in range(found)
+                       if f"{id_prefix}{100000 + i}" not in archived
+                       and (start is None or published(i) >= start) and (end is None or published(i) <= end)]
+            matched.sort(key=published, reverse=True)  # order_by=publication_time
+            total = len(matched)
+            indexes = matched[page * per_page:min((page + 1) * per_page, MAX_DEPTH)]
+        items = [{"id": f"{id_prefix}{100000 + i}",
+                  "name": f"{text or 'Vacancy'} #{i}",
+                  "alternate_url": f"https://hh.ru/vacancy/{100000 + i}",
+                  "published_at": hh_date(published(i)),
+                  "salary": None}
+                 for i in indexes]
+        return {"items": items, "found": total, "page": page,
+                "pages": -(-min(total, MAX_DEPTH) // per_page), "per_page": per_page}
+
+    @app.get("/vacancies/{vacancy_id}")
+    async def vacancy(vacancy_id: str, request: Request):
+        error = await simulate()
+        if error is not None:
+            return error
+        body = json.dumps({"id": vacancy_id, "name": f"Vacancy {vacancy_id}",
+                           "archived": vacancy_id in archived,
+                           "description": make_description(vacancy_id, description_words, seed,
+                                                           versions.get(vacancy_id, 0))},
+                          ensure_ascii=False)
+        etag = '"' + hashlib.md5(body.encode()).hexdigest() + '"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/stub/stats")
+    async def stats():
+        return app.state.counters
+
+    @app.post("/stub/republish")
+    async def republish(payload: dict):
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        for vacancy_id in payload["ids"]:
+            republished[vacancy_id] = now
+            archived.discard(vacancy_id)
+            if payload.get("change_description"):
+                versions[vacancy_id] = versions.get(vacancy_id, 0) + 1
+        return {"republished": len(payload["ids"])}
+
+    @app.post("/stub/archive")
+    async def archive(payload: dict):
+        archived.update(payload["ids"])
+        return {"archived": len(archived)}
+
+    return app
+
+
+@contextmanager
+def run_stub(port=8900, **options):
+    """Поднимает заглушку в фоновом потоке и отдаёт её базовый URL"""
+    config = uvicorn.Config(create_stub_app(**options), host="127.0.0.1", port=port,
+                            log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def add_stub_arguments(parser):
+    """Параметры заглушки - общие для запуска отдельно и из benchmarks.loadtest"""
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="разброс задержки, +-мс")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов-ошибок, 0..1")
+    parser.add_argument("--error-status", type=int, default=500, choices=[429, 500, 502, 503])
+    parser.add_argument("--retry-after", type=int, default=0, help="Retry-After у 429, секунды")
+    parser.add_argument("--found", type=int, default=200, help="размер выдачи /vacancies")
+    parser.add_argument("--description-words", type=int, default=0,
+                        help="слов в описании; 0 - короткое фиксированное")
+    parser.add_argument("--id-prefix", default="", help="префикс id вакансий в выдаче")
+    parser.add_argument("--publish-step-minutes", type=float, default=10.0,
+                        help="вакансия i опубликована за i * шаг минут до старта")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def stub_options(args):
+    return {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+            "error_status": args.error_status, "retry_after": args.retry_after, "found": args.found,
+            "description_words": args.description_words, "id_prefix": args.id_prefix, "seed": args.seed,
+            "publish_step_minutes": args.publish_step_minutes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8900)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(**stub_options(args)), host="127.0.0.1", port=args.port,
+                log_level="warning", access_log=False)
@@ -0,0 +1,338 @@
+"""
+Нагрузочный прогон API по сценариям: поиск через HH (заглушку), локальный поиск,
+загрузка описаний, логин и анализ /match вместе с воркером. По каждому сценарию -
+пропускная способность, p50/p95/p99 и ошибки; итог пишется в benchmarks/results/
+JSON-файлом с коммитом в имени, чтобы сравнивать прогоны между коммитами.
+
+Без --api поднимает всё сам: заглушку HH, uvicorn и воркер Celery (БД, Redis и брокер -
+из .env / RABBITMQ_URL / REDIS_URL, схема - после `alembic upgrade head`):
+    python -m benchmarks.loadtest --latency-ms 30 --jitter-ms 10 --error-rate 0.01
+Против уже запущенного API (его HH_API_URL должен смотреть в заглушку):
+    python -m benchmarks.loadtest --api http://127.0.0.1:8000 --scenarios search_local,login
+Сравнение с прошлым прогоном:
+    python -m benchmarks.loadtest --compare benchmarks/results/<файл>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks import fixtures
+from benchmarks.hh_stub import add_stub_arguments, stub_options
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SCENARIOS = ["search_hh", "search_local", "fill", "login", "match"]
+QUERIES = ["python", "fastapi postgresql", "django -java", "kafka or rabbitmq", "docker kubernetes",
+           "celery redis", "go", "sql linux"]
+TERMINAL = {"SUCCESS", "FAILURE", "REVOKED"}
+
+
+# --- статистика ---
+
+def percentile(ordered, share):
+    """Ближайший ранг: p99 из 100 замеров - 99-й по возрастанию"""
+    return ordered[max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))]
+
+
+def summarize(latencies, statuses, elapsed):
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if not str(status).startswith("2"))
+    summary = {"requests": len(latencies), "errors": errors,
+               "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+               "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+               "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)}}
+    if ordered:
+        summary.update({"mean_ms": round(sum(ordered) / len(ordered), 2),
+                        "p50_ms": round(percentile(ordered, 0.50), 2),
+                        "p95_ms": round(percentile(ordered, 0.95), 2),
+                        "p99_ms": round(percentile(ordered, 0.99), 2),
+                        "max_ms": round(ordered[-1], 2)})
+    return summary
+
+
+class Recorder:
+    """Замеры одного сценария (или производной метрики, как match_e2e)"""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+
+    def add(self, started, status):
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        self.statuses[status] += 1
+
+
+async def run_scenario(total, concurrency, request, recorders):
+    """total вызовов request(i) в concurrency параллельных потоков; сводка по каждому recorder"""
+    numbers = iter(range(total))
+
+    async def user():
+        for number in numbers:
+            await request(number)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return [summarize(recorder.latencies, recorder.statuses, elapsed) for recorder in recorders]
+
+
+# --- сценарии ---
+
+async def wait_task(client, task_id):
+    """Ждёт финальный статус задачи по SSE /tasks/{id}/events"""
+    async with client.stream("GET", f"/tasks/{task_id}/events") as response:
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                status = json.loads(line[5:]).get("status")
+                if status in TERMINAL:
+                    return status
+    return "STREAM_CLOSED"
+
+
+def build_scenarios(client, data, args):
+    """имя -> (число вызовов, запрос, [Recorder])"""
+    rng = random.Random(args.seed)
+
+    async def timed(recorder, method, url, **kwargs):
+        """Ответ или None при сетевой ошибке/таймауте (она идёт в статусы именем исключения)"""
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            recorder.add(started, type(e).__name__)
+            return None
+        recorder.add(started, response.status_code)
+        return response
+
+    def simple(method, make_url, make_body=None):
+        recorder = Recorder()
+
+        async def request(number):
+            await timed(recorder, method, make_url(number),
+                        json=make_body(number) if make_body else None)
+        return request, [recorder]
+
+    def match():
+        api, e2e = Recorder(), Recorder()
+        pairs = [(resume_id, rng.choice(data["vacancy_ids"])) for resume_id in data["resume_ids"]]
+
+        async def request(number):
+            resume_id, vacancy_id = pairs[number % len(pairs)]
+            started = time.perf_counter()
+            response = await timed(api, "POST", "/match",
+                                   json={"resume_id": resume_id, "vacancy_id": vacancy_id})
+            if response is None or response.status_code != 200:
+                e2e.add(started, "API_ERROR")
+                return
+            body = response.json()
+            try:
+                status = "SUCCESS" if body["status"] == "done" else await wait_task(client, body["task_id"])
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            e2e.add(started, 200 if status == "SUCCESS" else status)
+        return request, [api, e2e]
+
+    emails, hh_ids = data["emails"], data["unfilled_hh_ids"]
+    return {
+        "search_hh": (args.requests, *simple("GET", lambda n: f"/vacancies?text={QUERIES[n % len(QUERIES)]}")),
+        "search_local": (args.requests, *simple("GET", lambda n: f"/vacancies/search?q={QUERIES[n % len(QUERIES)]}")),
+        "fill": (args.requests, *simple("POST", lambda n: f"/vacancies/{hh_ids[n % len(hh_ids)]}/fill")),
+        "login": (args.login_requests, *simple("POST", lambda n: "/login",
+                                               lambda n: {"email": emails[n % len(emails)],
+                                                          "password": data["password"]})),
+        "match": (args.match_requests, *match()),
+    }
+
+
+# --- окружение ---
+
+def wait_http(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} не отвечает {timeout} с")
+
+
+@contextmanager
+def environment(args):
+    """Адрес API: переданный --api или поднятые здесь заглушка HH + uvicorn + воркер"""
+    if args.api:
+        yield args.api
+        return
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    api_url = f"http://127.0.0.1:{args.port}"
+    env = {**os.environ, "HH_API_URL": stub_url, "HH_RATE_LIMIT": "0",
+           "METRICS_WORKER_PORT": "0", "PYTHONPATH": ROOT}
+    stub_args = [f"--{name.replace('_', '-')}={value}" for name, value in stub_options(args).items()]
+    pool = ["-P", "solo"] if args.worker_concurrency == 1 else ["-c", str(args.worker_concurrency)]
+    commands = {
+        "stub": [sys.executable, "-m", "benchmarks.hh_stub", "--port", str(args.stub_port), *stub_args],
+        "api": [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+                "--log-level", "warning", "--no-access-log"],
+        "worker": [sys.executable, "-m", "celery", "-A", "celery_app", "worker", "-l", "warning", *pool],
+    }
+    logs = tempfile.mkdtemp(prefix="smarthunter-loadtest-")
+    processes = []
+    try:
+        for name, command in commands.items():
+            log = open(os.path.join(logs, f"{name}.log"), "w")
+            processes.append(subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=log))
+        wait_http(f"{stub_url}/stub/stats")
+        wait_http(f"{api_url}/")
+        print(f"environment up, logs in {logs}")
+        yield api_url
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# --- результаты ---
+
+def git_revision():
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def save_results(results, path=None):
+    commit = results["meta"]["commit"]
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{commit}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def print_table(scenarios):
+    print(f"{'scenario':<14} {'req':>5} {'err':>4} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}  ms")
+    for name, summary in scenarios.items():
+        print(f"{name:<14} {summary['requests']:>5} {summary['errors']:>4} {summary['throughput_rps']:>8.1f} "
+              f"{summary.get('p50_ms', 0):>9.1f} {summary.get('p95_ms', 0):>9.1f} {summary.get('p99_ms', 0):>9.1f}")
+
+
+def print_comparison(previous, current):
+    print(f"\ncompared with {previous['meta']['commit']} ({previous['meta']['timestamp']}):")
+    for name, summary in current["scenarios"].items():
+        before = previous["scenarios"].get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before.get(key):
+                changes.append(f"{key} {before[key]:.1f} -> {summary.get(key, 0):.1f} "
+                               f"({(summary.get(key, 0) - before[key]) / before[key]:+.0%})")
+        print(f"  {name:<14} " + ", ".join(changes))
+
+
+# --- прогон ---
+
+async def run(args, api_url, data):
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.timeout, limits=limits) as client:
+        scenarios = build_scenarios(client, data, args)
+        results = {}
+        for name in args.scenarios:
+            total, request, recorders = scenarios[name]
+            summaries = await run_scenario(total, args.concurrency, request, recorders)
+            results[name] = summaries[0]
+            if name == "match":
+                results["match_e2e"] = summaries[1]  # POST /match -> SUCCESS по SSE: очередь + воркер
+            print(f"{name}: done")
+        return results
+
+
+async def seed_data(args, run_token):
+    from database import engine
+    data = await fixtures.seed(run_token, users=args.users, resumes=args.match_requests,
+                               vacancies=args.vacancies, unfilled=args.unfilled,
+                               words=args.words, seed=args.seed)
+    await engine.dispose()  # у каждого asyncio.run свой цикл - пул в следующий не переносится
+    return data
+
+
+async def cleanup_data():
+    from database import engine
+    deleted = await fixtures.cleanup()
+    await engine.dispose()
+    return deleted
+
+
+def main(args):
+    commit, dirty = git_revision()
+    run_token = uuid.uuid4().hex[:8]
+    data = asyncio.run(seed_data(args, run_token))
+    print(f"seeded {len(data['vacancy_ids'])} vacancies, {len(data['unfilled_hh_ids'])} without description, "
+          f"{len(data['resume_ids'])} resumes")
+    try:
+        with environment(args) as api_url:
+            scenarios = asyncio.run(run(args, api_url, data))
+    finally:
+        if not args.keep:
+            print(f"cleanup: {asyncio.run(cleanup_data())}")
+
+    results = {
+        "meta": {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 "commit": commit, "dirty": dirty, "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "options": {key: value for key, value in vars(args).items() if key != "compare"}},
+        "scenarios": scenarios,
+    }
+    print_table(scenarios)
+    print(f"saved to {save_results(results, args.output)}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api", help="URL уже запущенного API; без него окружение поднимается здесь")
+    parser.add_argument("--port", type=int, default=8010, help="порт API, который поднимает харнесс")
+    parser.add_argument("--stub-port", type=int, default=8910)
+    parser.add_argument("--worker-concurrency", type=int, default=1, help="1 - solo-пул, иначе prefork")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных клиентов")
+    parser.add_argument("--requests", type=int, default=300, help="вызовов на сценарий поиска и fill")
+    parser.add_argument("--login-requests", type=int, default=48)
+    parser.add_argument("--match-requests", type=int, default=100, help="столько же резюме засевается")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--vacancies", type=int, default=2000, help="вакансий с описанием")
+    parser.add_argument("--unfilled", type=int, default=200, help="вакансий без описания для fill")
+    parser.add_argument("--words", type=int, default=150, help="слов в описаниях и резюме")
+    parser.add_argument("--keep", action="store_true", help="не удалять засеянные данные")
+    parser.add_argument("--output", help="путь к JSON вместо benchmarks/results/<время>-<коммит>.json")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    add_stub_arguments(parser)
+    parser.set_defaults(id_prefix=f"{fixtures.PREFIX}hh-", description_words=120)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+    main(args)
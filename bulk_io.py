@@ -0,0 +1,293 @@
+"""
+Массовый импорт и экспорт в NDJSON (строка - один JSON-объект) для переноса данных
+и офлайн-анализа. Память не зависит от объёма:
+
+- импорт читает тело запроса по кускам и режет на строки сам, в БД пишет пачками
+  по IMPORT_BATCH_SIZE строк, каждая пачка - своя транзакция. Вакансии идут через
+  COPY asyncpg во временную таблицу и один INSERT ... SELECT ... ON CONFLICT (hh_id);
+  резюме - executemany с RETURNING id (они нужны для векторов);
+- экспорт - серверный курсор (session.stream + yield_per) на реплике для чтения,
+  наружу уходит по пачке строк за раз. after_id продолжает оборванную выгрузку.
+"""
+import json
+import time
+from datetime import datetime
+
+import anyio
+from sqlalchemy import func, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import column, table
+
+from config import settings
+from database import async_session_maker, read_session_maker
+from descriptions import index_descriptions
+from features import store_resume_vectors
+from ingest import parse_hh_date
+from models import MatchResult, Resume, User, Vacancy
+
+ERRORS_SHOWN = 20  # сколько ошибок по строкам вернуть в итоге импорта
+
+VACANCY_IMPORT_COLUMNS = ("hh_id", "name", "url", "published_at", "description", "description_html")
+_staging = table("vacancy_import", *(column(name) for name in VACANCY_IMPORT_COLUMNS))
+
+
+async def read_ndjson(chunks, max_line_bytes=None):
+    """
+    Куски тела запроса -> (номер строки, объект, ошибка). Пустые строки пропускаются.
+    Строка длиннее max_line_bytes отбрасывается целиком, не накапливаясь в памяти.
+    """
+    max_line_bytes = max_line_bytes or settings.IMPORT_MAX_LINE_BYTES
+    buffer = bytearray()
+    line_no = 0
+    skipping = False  # хвост слишком длинной строки, уже посчитанной как ошибка
+
+    def parse(raw):
+        try:
+            value = json.loads(raw)
+        except ValueError as e:
+            return line_no, None, f"некорректный JSON: {e}"
+        if not isinstance(value, dict):
+            return line_no, None, "ожидается объект"
+        return line_no, value, None
+
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            if skipping:
+                skipping = False
+            else:
+                line_no += 1
+                if buffer[start:end].strip():
+                    yield parse(bytes(buffer[start:end]))
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                line_no += 1
+                yield line_no, None, f"строка длиннее {max_line_bytes} байт"
+                skipping = True
+            buffer.clear()
+
+    if buffer.strip() and not skipping:
+        line_no += 1
+        yield parse(bytes(buffer))
+
+
+class ImportReport:
+    """Итог импорта: счётчики и первые ERRORS_SHOWN ошибок с номерами строк"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counters = {"lines": 0, "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+        self.errors = []
+
+    def fail(self, line_no, error):
+        self.counters["failed"] += 1
+        if len(self.errors) < ERRORS_SHOWN:
+            self.errors.append({"line": line_no, "error": error})
+
+    def result(self):
+        return {**self.counters, "errors": self.errors,
+                "seconds": round(time.perf_counter() - self.started, 3)}
+
+
+async def _batches(chunks, report, parse_row):
+    """Пачки по IMPORT_BATCH_SIZE разобранных строк; ошибки разбора - сразу в отчёт"""
+    batch = []
+    async for line_no, value, error in read_ndjson(chunks):
+        report.counters["lines"] = line_no
+        if error is None:
+            row, error = parse_row(value)
+        if error is not None:
+            report.fail(line_no, error)
+            continue
+        batch.append((line_no, row))
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _optional_text(value, row, name):
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{name}: ожидается строка")
+    row[name] = value or None
+
+
+def _parse_vacancy(value):
+    hh_id = value.get("hh_id")
+    if hh_id is None or str(hh_id) == "":
+        return None, "нет hh_id"
+    row = {"hh_id": str(hh_id)}
+    try:
+        for name in ("name", "url", "description", "description_html"):
+            _optional_text(value.get(name), row, name)
+    except ValueError as e:
+        return None, str(e)
+    published_at = value.get("published_at")
+    row["published_at"] = parse_hh_date(published_at) if isinstance(published_at, str) else None
+    if published_at and row["published_at"] is None:
+        return None, "published_at: ожидается дата ISO 8601"
+    return row, None
+
+
+def _vacancy_upsert():
+    """INSERT из временной таблицы; пустые поля импорта не затирают уже сохранённые"""
+    stmt = insert(Vacancy).from_select(list(VACANCY_IMPORT_COLUMNS),
+                                       select(*(_staging.c[name] for name in VACANCY_IMPORT_COLUMNS)))
+    fields = [name for name in VACANCY_IMPORT_COLUMNS if name != "hh_id"]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Vacancy.hh_id],
+        set_={**{name: func.coalesce(stmt.excluded[name], getattr(Vacancy, name)) for name in fields},
+              "updated_at": func.now()},
+        where=or_(*(stmt.excluded[name].is_not(None)
+                    & getattr(Vacancy, name).is_distinct_from(stmt.excluded[name])
+                    for name in fields)))
+    # xmax = 0 только у только что вставленной строки
+    return stmt.returning(Vacancy.id, Vacancy.description, literal_column("xmax = 0").label("inserted"))
+
+
+async def import_vacancies(chunks):
+    """
+    NDJSON {"hh_id", "name", "url", "published_at", "description", "description_html"} ->
+    upsert по hh_id. У новых и изменившихся описаний считаются векторы и дубликаты,
+    как при загрузке с HH (descriptions.index_descriptions).
+    """
+    report = ImportReport()
+    upsert = _vacancy_upsert()
+    async with async_session_maker() as session:
+        async for batch in _batches(chunks, report, _parse_vacancy):
+            rows = {row["hh_id"]: row for _, row in batch}  # одна строка не обновится дважды за запрос
+            report.counters["unchanged"] += len(batch) - len(rows)
+
+            await session.execute(text(
+                "CREATE TEMP TABLE vacancy_import (hh_id text, name text, url text, "
+                "published_at timestamptz, description text, description_html text) ON COMMIT DROP"))
+            connection = await session.connection()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                "vacancy_import", columns=VACANCY_IMPORT_COLUMNS,
+                records=[tuple(row[name] for name in VACANCY_IMPORT_COLUMNS) for row in rows.values()])
+
+            changed = (await session.execute(upsert)).all()
+            inserted = sum(1 for row in changed if row.inserted)
+            report.counters["inserted"] += inserted
+            report.counters["updated"] += len(changed) - inserted
+            report.counters["unchanged"] += len(rows) - len(changed)
+            await index_descriptions(session, [(row.id, row.description) for row in changed if row.description])
+    return report.result()
+
+
+def _parse_resume(value):
+    content = value.get("content")
+    if not isinstance(content, str) or not content.strip():
+        return None, "нет content"
+    email, user_id = value.get("email"), value.get("user_id")
+    if isinstance(email, str) and email:
+        return {"email": email, "content": content}, None
+    if isinstance(user_id, int) and not isinstance(user_id, bool):
+        return {"user_id": user_id, "content": content}, None
+    return None, "нужен email или user_id"
+
+
+async def import_resumes(chunks):
+    """
+    NDJSON {"email" | "user_id", "content"} -> новые резюме существующих пользователей
+    (естественного ключа у резюме нет: повторный импорт создаст копии) с векторами.
+    """
+    report = ImportReport()
+    users = {}  # email -> id и id -> id известных пользователей, на весь импорт
+    async with async_session_maker() as session:
+        async for batch in _batches(chunks, report, _parse_resume):
+            emails = {row["email"] for _, row in batch if "email" in row} - users.keys()
+            ids = {row["user_id"] for _, row in batch if "user_id" in row} - users.keys()
+            if emails:
+                result = await session.execute(select(User.email, User.id).where(User.email.in_(emails)))
+                users.update(dict(result.all()))
+            if ids:
+                users.update({user_id: user_id for user_id in
+                              (await session.scalars(select(User.id).where(User.id.in_(ids)))).all()})
+
+            rows = []
+            for line_no, row in batch:
+                user_id = users.get(row.get("email", row.get("user_id")))
+                if user_id is None:
+                    report.fail(line_no, "пользователь не найден")
+                else:
+                    rows.append({"user_id": user_id, "content": row["content"]})
+            if not rows:
+                continue
+
+            resume_ids = (await session.scalars(insert(Resume).returning(Resume.id, sort_by_parameter_order=True),
+                                                rows)).all()
+            await store_resume_vectors(session, [(resume_id, row["content"])
+                                                 for resume_id, row in zip(resume_ids, rows)])
+            await session.commit()
+            report.counters["inserted"] += len(rows)
+    return report.result()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+async def stream_ndjson(query):
+    """
+    Строки запроса как NDJSON: серверный курсор, EXPORT_FETCH_SIZE строк на выборку
+    и на кусок ответа. Своя сессия - поток живёт дольше обработчика запроса.
+    """
+    session = read_session_maker()
+    try:
+        # Клиент ушёл - Starlette отменяет поток. Отмена посреди выборки из курсора ломает
+        # соединение asyncpg, поэтому выборка (не больше EXPORT_FETCH_SIZE строк) и закрытие
+        # сессии защищены: отмена приходит на yield, курсор закрывается откатом транзакции
+        with anyio.CancelScope(shield=True):
+            result = await session.stream(query.execution_options(yield_per=settings.EXPORT_FETCH_SIZE))
+        partitions = result.mappings().partitions()
+        while True:
+            with anyio.CancelScope(shield=True):
+                rows = await anext(partitions, None)
+            if rows is None:
+                return
+            yield "".join(json.dumps(dict(row), ensure_ascii=False, default=_json_default) + "\n"
+                          for row in rows)
+    finally:
+        with anyio.CancelScope(shield=True):
+            await session.close()
+
+
+def export_resumes_query(after_id=0, email=None):
+    query = (select(Resume.id, Resume.user_id, User.email, Resume.content, Resume.created_at)
+             .outerjoin(User, User.id == Resume.user_id)  # резюме без владельца тоже выгружаются
+             .where(Resume.id > after_id))
+    if email is not None:
+        query = query.where(User.email == email)
+    return query.order_by(Resume.id)
+
+
+def export_vacancies_query(after_id=0, has_description=None, with_html=False):
+    columns = [Vacancy.id, Vacancy.hh_id, Vacancy.name, Vacancy.url, Vacancy.published_at,
+               Vacancy.archived_at, Vacancy.duplicate_of, Vacancy.description]
+    if with_html:
+        columns.append(Vacancy.description_html)
+    query = select(*columns, Vacancy.updated_at).where(Vacancy.id > after_id)
+    if has_description is True:
+        query = query.where(Vacancy.description.is_not(None), Vacancy.description != "")
+    elif has_description is False:
+        query = query.where(or_(Vacancy.description.is_(None), Vacancy.description == ""))
+    return query.order_by(Vacancy.id)
+
+
+def export_match_results_query(after_id=0, resume_id=None):
+    query = (select(MatchResult.id, MatchResult.resume_id, MatchResult.vacancy_id, Vacancy.hh_id,
+                    MatchResult.score, MatchResult.similarity, MatchResult.skill_coverage,
+                    MatchResult.breakdown, MatchResult.matcher_version, MatchResult.analyzed_at)
+             .join(Vacancy, Vacancy.id == MatchResult.vacancy_id)
+             .where(MatchResult.id > after_id))
+    if resume_id is not None:
+        query = query.where(MatchResult.resume_id == resume_id)
+    return query.order_by(MatchResult.id)
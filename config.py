@@ -6,12 +6,128 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
+    
+    # Движок и пул соединений (database.py). На каждый процесс uvicorn/воркера
+    # открывается до DB_POOL_SIZE + DB_MAX_OVERFLOW соединений - учитывайте max_connections
+    DB_ECHO: bool = False  # лог каждого SQL-запроса, только для отладки
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # сколько ждать свободного соединения, потом ошибка
+    DB_POOL_RECYCLE: int = 1800  # пересоздавать соединения старше, секунд
+    DB_POOL_PRE_PING: bool = False  # проверка соединения перед выдачей (за балансировщиком/PgBouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100  # 0 для PgBouncer в режиме transaction
+    # Реплика для запросов только на чтение (необязательно)
+    DB_READ_HOST: str | None = None
+    DB_READ_PORT: int | None = None
+    
+    # Общий HTTP-клиент для api.hh.ru
+    HH_API_URL: str = "https://api.hh.ru"
+    HH_USER_AGENT: str = "SmartHunter/1.0"
+    HH_HTTP2: bool = False
+    HH_MAX_CONNECTIONS: int = 50
+    HH_MAX_KEEPALIVE: int = 20
+    HH_KEEPALIVE_EXPIRY: float = 30.0
+    HH_CONNECT_TIMEOUT: float = 5.0
+    HH_TIMEOUT: float = 15.0
+    HH_MAX_RETRIES: int = 3
+    HH_BACKOFF_BASE: float = 0.5
+    HH_BACKOFF_MAX: float = 10.0  # потолок своей задержки между повторами, секунд
+    HH_RETRY_AFTER_MAX: float = 60.0  # Retry-After длиннее - не ждём, запрос завершается ошибкой
+    HH_RATE_LIMIT: float = 30.0  # запросов в секунду на процесс, 0 - без ограничения
+    HH_RATE_BURST: int = 30
+    
+    # Кэш ответов HH по вакансиям (ETag + JSON)
+    HH_CACHE_TTL: int = 600  # сколько секунд запись считается свежей без ревалидации
+    HH_CACHE_MAX_ITEMS: int = 5000
+    HH_CACHE_REDIS: bool = False  # второй уровень в Redis из celery_app.REDIS_URL
+    HH_CACHE_REDIS_TTL: int = 86400
+    
+    # Выдача /vacancies и single-flight одинаковых запросов к HH (singleflight.py)
+    SEARCH_CACHE_TTL: int = 60  # секунд; 0 - без кэша, только объединение одновременных
+    SEARCH_CACHE_MAX_ITEMS: int = 1000
+    SINGLEFLIGHT_REDIS: bool = False  # объединять запросы и между процессами, через Redis
+    SINGLEFLIGHT_LOCK_TTL: int = 30  # блокировка лидера, если он упал, секунды
+    SINGLEFLIGHT_WAIT: float = 20.0  # сколько ждать лидера из другого процесса
+    SINGLEFLIGHT_RESULT_TTL: int = 5  # сколько держать в Redis результат для опоздавших (описания)
+    
+    # Сохранённые поиски: обновление по расписанию Celery beat (saved_searches.py)
+    SAVED_SEARCH_REFRESH_INTERVAL: int = 900  # как часто обновлять один поиск, секунд
+    SAVED_SEARCH_DISPATCH_INTERVAL: int = 60  # как часто beat ищет поиски, которым пора
+    SAVED_SEARCH_INITIAL_DAYS: int = 3  # глубина окна дат при первом обновлении
+    SAVED_SEARCH_OVERLAP: int = 600  # запас date_from на задержку индексации HH, секунд
+    SAVED_SEARCH_MAX_PER_USER: int = 20
+    VACANCY_RECHECK_DAYS: int = 3  # не видели в выдаче дольше - проверяем, не в архиве ли
+    VACANCY_RECHECK_BATCH: int = 500  # вакансий за одну проверку
+    VACANCY_RECHECK_INTERVAL: int = 600  # секунд между проверками
+    
+    # Индекс вакансий в памяти процесса (vacancy_index.py)
+    VACANCY_INDEX_SYNC_INTERVAL: float = 30.0  # как часто догружать векторы других процессов, секунд
+    
+    # Почти-дубликаты вакансий при сохранении описаний (dedup.py)
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.8  # оценка сходства по Жаккару, с которой вакансия - дубликат
+    
+    # Хеширование паролей (security.py)
+    BCRYPT_ROUNDS: int = 12  # work factor: +1 удваивает время хеширования
+    PASSWORD_HASH_WORKERS: int = 4  # потоков под bcrypt на процесс
+    PASSWORD_HASH_MAX_PENDING: int = 32  # больше - сразу 503 вместо очереди
+    PASSWORD_HASH_RETRY_AFTER: int = 1
+    
+    # Пакетная загрузка описаний
+    FILL_CONCURRENCY: int = 10
+    FILL_CONCURRENCY_MAX: int = 50  # верхняя граница concurrency в запросе /vacancies/fill-batch
+    FILL_MAX_BATCH: int = 1000
+    FILL_SAVE_BATCH: int = 100  # описаний на одну запись в БД по ходу загрузки
+    
+    # Кэш результатов /match
+    MATCH_CACHE_REDIS: bool = False  # копия результатов в Redis перед таблицей match_cache
+    MATCH_CACHE_REDIS_TTL: int = 86400
+    MATCH_INFLIGHT_TTL: int = 300  # сколько секунд пара считается "в работе" у воркера
+    
+    # Пакетный анализ /match/batch
+    MATCH_BATCH_CHUNK: int = 200  # вакансий в одной задаче score_chunk_task
+    MATCH_BATCH_MAX: int = 5000
+    
+    # Локальный полнотекстовый поиск /vacancies/search
+    SEARCH_RANK_CANDIDATES: int = 2000  # сколько самых свежих совпадений ранжировать (truncated в ответе)
+    
+    # Импорт и экспорт NDJSON (bulk_io.py)
+    IMPORT_BATCH_SIZE: int = 1000  # строк на транзакцию
+    IMPORT_MAX_LINE_BYTES: int = 1_000_000  # длиннее - строка отбрасывается с ошибкой
+    EXPORT_FETCH_SIZE: int = 1000  # строк на выборку из серверного курсора
+    
+    # SSE-поток /tasks/{task_id}/events
+    TASK_EVENTS_HEARTBEAT: float = 15.0  # пинг клиенту и перепроверка статуса, секунды
+    TASK_EVENTS_TIMEOUT: float = 600.0  # дольше поток не держим
+    
+    # Лимиты времени задач Celery, секунды (мягкий - исключение в задаче, жёсткий - процесс убивается)
+    CELERY_INTERACTIVE_SOFT_LIMIT: int = 20
+    CELERY_INTERACTIVE_HARD_LIMIT: int = 30
+    CELERY_BULK_SOFT_LIMIT: int = 120
+    CELERY_BULK_HARD_LIMIT: int = 180
+    CELERY_CRAWL_SOFT_LIMIT: int = 900
+    CELERY_CRAWL_HARD_LIMIT: int = 960
+    CELERY_FILL_SOFT_LIMIT: int = 600
+    CELERY_FILL_HARD_LIMIT: int = 660
+    CELERY_VISIBILITY_TIMEOUT: int = 3600  # Redis-брокер: больше любого жёсткого лимита
+    CELERY_RESULT_EXPIRES: int = 21600  # сколько result backend хранит результат задачи, секунды
+    
+    # Метрики Prometheus (metrics.py)
+    METRICS_ENABLED: bool = True  # middleware и /metrics в API
+    METRICS_WORKER_PORT: int = 9100  # HTTP-сервер метрик воркера Celery; 0 - выключен
 
     @property
     def DATABASE_URL(self):
         
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
     
+    @property
+    def READ_DATABASE_URL(self):
+        if not self.DB_READ_HOST:
+            return None
+        port = self.DB_READ_PORT or self.DB_PORT
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_READ_HOST}:{port}/{self.DB_NAME}"
+    
     model_config = SettingsConfigDict(env_file=".env")
     
 settings = Settings()
\ No newline at end of file
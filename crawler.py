@@ -0,0 +1,194 @@
+"""
+Режим краулера: обходит все страницы выдачи HH по списку запросов и регионов
+и складывает вакансии в БД пачками.
+
+Запуск:
+    python crawler.py "Python" "Java" --area 1002 --area 1003 --days 7
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from database import async_session_maker
+from hh_client import DEFAULT_AREAS, close_client, fetch_vacancies_page
+from ingest import upsert_vacancies
+
+HH_MAX_DEPTH = 2000  # HH не отдаёт больше 2000 результатов на один запрос (per_page * page)
+MAX_PER_PAGE = 100
+DEFAULT_CONCURRENCY = 8
+DEFAULT_WINDOW_DAYS = 30
+MIN_WINDOW = timedelta(minutes=10)  # мельче окно по датам не дробим
+DEFAULT_BATCH_SIZE = 500
+
+
+def _hh_date(value):
+    return value.isoformat(timespec="seconds")
+
+
+async def crawl_vacancies(texts, areas=DEFAULT_AREAS, date_from=None, date_to=None,
+                          concurrency=DEFAULT_CONCURRENCY, per_page=MAX_PER_PAGE,
+                          stats=None):
+    """
+    Асинхронный генератор вакансий.
+    Каждая пара (запрос, регион) обходится постранично, одновременно в полёте
+    не больше concurrency запросов к HH. Если по окну дат найдено больше, чем HH
+    готов отдать, окно делится пополам, пока выдача не влезет в лимит глубины.
+    Дубликаты на границах окон отбрасываются.
+    stats (dict) при желании заполняется счётчиками запросов и вакансий;
+    failed_pages - страницы, которые HH не отдал (не 200 после всех повторов): их вакансии пропущены.
+    """
+    if stats is None:
+        stats = {}
+    stats.update(requests=0, items=0, duplicates=0, splits=0, failed_pages=0,
+                 started=time.perf_counter())
+
+    date_to = date_to or datetime.now(timezone.utc)
+    date_from = date_from or date_to - timedelta(days=DEFAULT_WINDOW_DAYS)
+    max_pages = max(1, HH_MAX_DEPTH // per_page)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # Ограниченная очередь даёт обратное давление: если БД не успевает, краулер ждёт
+    out = asyncio.Queue(maxsize=per_page * concurrency)
+    tasks = set()
+    signals = []
+    done = object()
+    seen = set()
+
+    async def fetch(params, page):
+        async with semaphore:
+            stats["requests"] += 1
+            data = await fetch_vacancies_page({**params, "page": page, "per_page": per_page})
+        if data is None:
+            stats["failed_pages"] += 1
+        return data
+
+    async def emit(data):
+        if data is None:
+            return
+        for item in data.get("items", []):
+            await out.put(item)
+
+    async def walk_slice(text, area, start, end):
+        params = {"text": text, "area": area, "order_by": "publication_time",
+                  "date_from": _hh_date(start), "date_to": _hh_date(end)}
+        data = await fetch(params, 0)
+        if data is None:
+            return
+
+        if data.get("found", 0) > HH_MAX_DEPTH and end - start > MIN_WINDOW:
+            stats["splits"] += 1
+            middle = start + (end - start) / 2
+            spawn(walk_slice(text, area, start, middle))
+            spawn(walk_slice(text, area, middle, end))
+            return
+
+        await emit(data)
+        for page in range(1, min(data.get("pages", 1), max_pages)):
+            spawn(walk_page(params, page))
+
+    async def walk_page(params, page):
+        await emit(await fetch(params, page))
+
+    def spawn(coro):
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(finished)
+
+    def finished(task):
+        tasks.discard(task)
+        # Сигнал кладём через put, а не put_nowait: очередь ограничена
+        if not task.cancelled() and task.exception() is not None:
+            signals.append(asyncio.create_task(out.put(task.exception())))
+        elif not tasks:
+            signals.append(asyncio.create_task(out.put(done)))
+
+    for text in texts:
+        for area in areas:
+            spawn(walk_slice(text, area, date_from, date_to))
+
+    try:
+        while True:
+            item = await out.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+
+            hh_id = item.get("id")
+            if hh_id in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(hh_id)
+            stats["items"] += 1
+            yield item
+    finally:
+        pending = list(tasks) + signals
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def crawl_to_db(texts, areas=DEFAULT_AREAS, batch_size=DEFAULT_BATCH_SIZE, changed=None,
+                      **crawl_options):
+    """
+    Прогоняет краулер и сохраняет вакансии в БД пачками по batch_size
+    через ingest.upsert_vacancies. Возвращает итоговые счётчики и скорость.
+    changed - как в upsert_vacancies: сюда попадут (id, hh_id) новых и изменившихся.
+    """
+    stats = {}
+    totals = {"saved_new": 0, "updated": 0, "unchanged": 0}
+    batch = []
+
+    async def flush():
+        counters = await upsert_vacancies(session, batch, changed=changed)
+        await session.commit()
+        for key in totals:
+            totals[key] += counters[key]
+        batch.clear()
+
+    async with async_session_maker() as session:
+        async for item in crawl_vacancies(texts, areas, stats=stats, **crawl_options):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                await flush()
+                elapsed = time.perf_counter() - stats["started"]
+                print(f"Краулер: {stats['items']} вакансий, {stats['items'] / elapsed:.0f} шт/с")
+        if batch:
+            await flush()
+
+    elapsed = time.perf_counter() - stats["started"]
+    return {
+        **totals,
+        "items": stats["items"],
+        "requests": stats["requests"],
+        "duplicates": stats["duplicates"],
+        "splits": stats["splits"],
+        "failed_pages": stats["failed_pages"],
+        "seconds": round(elapsed, 3),
+        "items_per_second": round(stats["items"] / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Полный обход выдачи HH")
+    parser.add_argument("texts", nargs="+", help="поисковые запросы")
+    parser.add_argument("--area", type=int, action="append", help="регион HH, можно несколько раз")
+    parser.add_argument("--days", type=int, default=DEFAULT_WINDOW_DAYS, help="глубина окна в днях")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    async def run():
+        now = datetime.now(timezone.utc)
+        try:
+            return await crawl_to_db(args.texts,
+                                     areas=args.area or DEFAULT_AREAS,
+                                     batch_size=args.batch_size,
+                                     concurrency=args.concurrency,
+                                     date_from=now - timedelta(days=args.days),
+                                     date_to=now)
+        finally:
+            await close_client()
+
+    print(asyncio.run(run()))
@@ -1,14 +1,122 @@
+import itertools
+import os
+import time
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
+from metrics import instrument_engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+# Границы гистограммы ожидания соединения из пула, секунды
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+pool_checkout_stats = {}  # имя пула -> счётчики ожидания соединения
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Обычный пул asyncpg, который дополнительно меряет, сколько запрос ждал соединение.
+    Имя берётся из pool_logging_name движка и переживает dispose()/recreate().
+    """
+
+    def connect(self):
+        stats = pool_checkout_stats.setdefault(self._orig_logging_name, {
+            "checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+            "buckets": [0] * (len(CHECKOUT_BUCKETS) + 1)})
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            stats["checkouts"] += 1
+            stats["wait_seconds_total"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+            stats["buckets"][sum(waited > bound for bound in CHECKOUT_BUCKETS)] += 1
+
+
+def create_engine(url, name):
+    async_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedPool,
+        pool_logging_name=name,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        # Кэш prepared statements у asyncpg и у диалекта SQLAlchemy; 0 - для PgBouncer в transaction mode
+        connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                      "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+    instrument_engine(async_engine, name)
+    return async_engine
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+
+engine = create_engine(settings.DATABASE_URL, "primary")
 
 async_session_maker = async_sessionmaker(engine, class_= AsyncSession, expire_on_commit=False)
 
+# Реплика для эндпоинтов только на чтение; без DB_READ_HOST - тот же движок
+read_engine = create_engine(settings.READ_DATABASE_URL, "read") if settings.READ_DATABASE_URL else engine
+
+read_session_maker = async_sessionmaker(read_engine, class_= AsyncSession, expire_on_commit=False)
+
 class Base(DeclarativeBase):
     pass
 
 async def get_async_session():
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_read_session():
+    """Сессия для чтения: с репликой данные могут отставать от основной БД"""
+    async with read_session_maker() as session:
+        yield session
+
+
+async def check_schema_revision():
+    """
+    Схема меняется только миграциями (alembic upgrade head), при старте - лишь сверка ревизии:
+    приложение не должно работать со схемой, которой не ожидает models.py.
+    """
+    heads = set(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+    async with engine.connect() as conn:
+        current = set(await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads()))
+    if current != heads:
+        raise RuntimeError(f"Схема БД на ревизии {sorted(current) or 'нет'}, ожидается {sorted(heads)}: "
+                           f"выполните `alembic upgrade head`")
+
+
+def pool_stats():
+    """Занятость пулов и ожидание соединений - для подбора размеров под число воркеров uvicorn"""
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["read"] = read_engine
+    stats = {}
+    for name, current in engines.items():
+        pool = current.pool
+        checkout = pool_checkout_stats.get(name, {})
+        stats[name] = {
+            "size": pool.size(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            **checkout,
+            # Накопительно, как у гистограмм Prometheus: сколько ожиданий уложилось в границу
+            "buckets": dict(zip([f"le_{bound}" for bound in CHECKOUT_BUCKETS] + ["le_inf"],
+                                itertools.accumulate(checkout.get("buckets", [])))),
+        }
+    return stats
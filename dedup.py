@@ -0,0 +1,337 @@
+"""
+Поиск почти-дубликатов вакансий: MinHash по шинглам описания + LSH по полосам.
+
+Одна и та же вакансия приходит с разными hh_id (перевыложили, или её разместили
+и агентство, и работодатель). Дубликат получает Vacancy.duplicate_of = канонической
+вакансии (самой ранней в кластере), ранжирование и анализ его пропускают.
+
+- Подпись - NUM_PERM минимумов хешей шинглов из SHINGLE слов (uint32), хранится
+  в vacancy_signatures рядом с content_hash описания: неизменившийся текст не пересчитывается.
+- LSH: подпись режется на BANDS полос по ROWS значений, у каждой полосы один uint64-ключ.
+  Кандидаты - вакансии, совпавшие хотя бы одной полосой; порог срабатывания около
+  (1 / BANDS) ** (1 / ROWS) ~ 0.7 по Жаккару. Кандидаты проверяются по полной подписи
+  (доля совпавших минимумов) против DEDUP_THRESHOLD.
+- Индекс в памяти процесса - только ключи полос: отсортированные массивы numpy на полосу
+  (BANDS * 12 байт на вакансию), поиск - searchsorted. Новые подписи копятся в дельте
+  и вливаются пересортировкой, как в vacancy_index. Перед каждой пачкой индекс
+  догружает подписи, записанные другими процессами (по updated_at).
+  Кандидаты вне пачки проверяются по подписям из БД: в памяти их не держим.
+
+NUM_PERM, ROWS, SHINGLE и SEED задают формат подписи: после их изменения
+таблицу vacancy_signatures нужно очистить, она пересчитается при загрузке.
+"""
+import asyncio
+import string
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import async_session_maker
+from features import content_hash
+from models import Vacancy, VacancySignature
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3  # слов в шингле: перестановка пары фраз меняет немногие шинглы
+SEED = 1
+LOAD_CHUNK = 2000
+MERGE_MIN_PENDING = 2000
+MERGE_PENDING_RATIO = 0.05
+COMPACT_DEAD_RATIO = 0.2
+SYNC_OVERLAP = timedelta(seconds=30)  # запас на транзакции, закоммиченные позже начала
+
+# Знаки препинания -> пробелы: str.translate + split в несколько раз быстрее регулярки \w+
+_SEPARATORS = str.maketrans({char: " " for char in string.punctuation + "«»“”„—–…•·©®№"})
+_EMPTY = np.zeros(0, dtype=np.uint32)
+
+_rng = np.random.default_rng(SEED)
+# Перестановки вида a * x + b по модулю 2**32 с нечётным a. Хеши шинглов x уже
+# перемешаны crc32, поэтому такой семьи хватает: ошибка оценки как у 64-битной, а вдвое быстрее
+_PERM_A = (_rng.integers(0, 2 ** 31, size=NUM_PERM, dtype=np.uint32) * np.uint32(2) + np.uint32(1))[:, None]
+_PERM_B = _rng.integers(0, 2 ** 32, size=NUM_PERM, dtype=np.uint32)[:, None]
+_SHINGLE_MULT = _rng.integers(1, 2 ** 63, size=SHINGLE, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_BAND_MULT = _rng.integers(1, 2 ** 63, size=ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+def shingle_hashes(text):
+    """Хеши шинглов из SHINGLE подряд идущих слов (uint32, повторы не убираются - минимум от них не меняется)"""
+    words = (text or "").lower().replace("ё", "е").translate(_SEPARATORS).split()
+    if not words:
+        return _EMPTY
+    hashes = np.array([zlib.crc32(word.encode()) for word in words], dtype=np.uint64)
+    if len(hashes) < SHINGLE:
+        combined = (hashes * _SHINGLE_MULT[:len(hashes)]).sum(keepdims=True)
+    else:
+        count = len(hashes) - SHINGLE + 1
+        combined = hashes[:count] * _SHINGLE_MULT[0]
+        for offset in range(1, SHINGLE):
+            combined += hashes[offset:offset + count] * _SHINGLE_MULT[offset]
+    return (combined >> np.uint64(32)).astype(np.uint32)
+
+
+def signature(text):
+    """MinHash-подпись текста: NUM_PERM значений uint32, None для пустого текста"""
+    shingles = shingle_hashes(text)
+    if not len(shingles):
+        return None
+    values = np.multiply(_PERM_A, shingles[None, :])
+    values += _PERM_B
+    return values.min(axis=1)
+
+
+def band_keys(signature_values):
+    """Ключ каждой из BANDS полос подписи (uint64)"""
+    return (signature_values.reshape(BANDS, ROWS).astype(np.uint64) * _BAND_MULT).sum(axis=1)
+
+
+def similarity(left, right):
+    """Оценка сходства по Жаккару: доля совпавших минимумов"""
+    return float(np.count_nonzero(left == right)) / NUM_PERM
+
+
+def pack_signature(signature_values):
+    return signature_values.astype(np.uint32).tobytes()
+
+
+def unpack_signature(raw):
+    return np.frombuffer(raw, dtype=np.uint32)
+
+
+class DuplicateIndex:
+    """
+    LSH-индекс: для каждой полосы - отсортированные ключи и номера строк.
+    Изменения копятся в дельте (словарь id -> ключи полос) и проверяются перебором,
+    основные массивы пересобираются, когда дельта или доля удалённых строк вырастет.
+    """
+
+    def __init__(self):
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._order = np.zeros((BANDS, 0), dtype=np.int32)  # строки по возрастанию ключа полосы
+        self._sorted = np.zeros((BANDS, 0), dtype=np.uint64)  # сами ключи в том же порядке
+        self._row_of = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._pending = {}
+        self._delta = None  # (ids, ключи) собранная дельта, сбрасывается при изменениях
+        self.synced_at = None  # наибольший updated_at среди загруженных из БД подписей
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self):
+        return int(self._alive.sum()) + len(self._pending)
+
+    def nbytes(self):
+        """Память основных массивов индекса (без дельты и словаря id -> строка)"""
+        return self._sorted.nbytes + self._order.nbytes + self._ids.nbytes + self._alive.nbytes
+
+    def upsert(self, vacancy_id, keys):
+        self.remove(vacancy_id)
+        self._pending[vacancy_id] = keys
+        self._delta = None
+
+    def remove(self, vacancy_id):
+        if self._pending.pop(vacancy_id, None) is not None:
+            self._delta = None
+            return
+        row = self._row_of.pop(vacancy_id, None)
+        if row is not None:
+            self._alive[row] = False
+
+    def _needs_merge(self):
+        rows = len(self._alive)
+        dead = rows - int(self._alive.sum())
+        return (len(self._pending) > max(MERGE_MIN_PENDING, MERGE_PENDING_RATIO * rows)
+                or dead > COMPACT_DEAD_RATIO * max(rows, 1))
+
+    def _merge(self):
+        # Матрица ключей по строкам восстанавливается из отсортированных полос
+        keys = np.empty((len(self._ids), BANDS), dtype=np.uint64)
+        for band in range(BANDS):
+            keys[self._order[band], band] = self._sorted[band]
+        keep = np.flatnonzero(self._alive)
+        keys, ids = keys[keep], self._ids[keep]
+        if self._pending:
+            keys = np.vstack([keys, np.array(list(self._pending.values()), dtype=np.uint64)])
+            ids = np.concatenate([ids, np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))])
+            self._pending = {}
+            self._delta = None
+        self._ids = ids
+        self._order = np.argsort(keys, axis=0).T.astype(np.int32)
+        self._sorted = np.take_along_axis(keys, self._order.T, axis=0).T.copy()
+        self._alive = np.ones(len(ids), dtype=bool)
+        self._row_of = {int(vacancy_id): row for row, vacancy_id in enumerate(ids)}
+
+    def candidates(self, keys):
+        """id вакансий, совпавших с ключами хотя бы в одной полосе"""
+        if self._needs_merge():
+            self._merge()
+        found = set()
+        for band in range(BANDS if len(self._ids) else 0):
+            start = np.searchsorted(self._sorted[band], keys[band], side="left")
+            end = np.searchsorted(self._sorted[band], keys[band], side="right")
+            if start < end:
+                rows = self._order[band, start:end]
+                found.update(self._ids[rows[self._alive[rows]]].tolist())
+        if self._pending:
+            if self._delta is None:
+                self._delta = (np.fromiter(self._pending, dtype=np.int64, count=len(self._pending)),
+                               np.array(list(self._pending.values()), dtype=np.uint64))
+            delta_ids, delta_keys = self._delta
+            found.update(delta_ids[np.any(delta_keys == keys, axis=1)].tolist())
+        return found
+
+    async def ensure_loaded(self, session: AsyncSession, skip=()):
+        """
+        Первый вызов загружает все подписи и досчитывает недостающие (описания старше этой схемы),
+        следующие - догружают подписи, записанные после прошлой синхронизации, в том числе
+        другими процессами. updated_at - время начала транзакции, поэтому окно берётся с запасом.
+        skip - вакансии, которые вызывающий код привяжет сам (их описание уже в этой транзакции).
+        """
+        async with self._load_lock:
+            query = (select(VacancySignature.vacancy_id, VacancySignature.signature, VacancySignature.updated_at)
+                     .order_by(VacancySignature.updated_at, VacancySignature.vacancy_id))
+            if self.synced_at is not None:
+                query = query.where(VacancySignature.updated_at > self.synced_at - SYNC_OVERLAP)
+            result = await session.stream(query.execution_options(yield_per=LOAD_CHUNK))
+            async for vacancy_id, raw, updated_at in result:
+                self.upsert(vacancy_id, band_keys(unpack_signature(raw)))
+                self.synced_at = max(self.synced_at or updated_at, updated_at)
+            if self.loaded:
+                return
+            self.loaded = True
+
+        # Своя сессия: транзакцию вызывающего кода не коммитим.
+        # По id, а не "у кого нет подписи": у текста без слов подписи не будет никогда
+        async with async_session_maker() as backfill:
+            await self._backfill(backfill, skip)
+        print(f"Индекс дубликатов загружен: {len(self)} шт.")
+
+    async def _backfill(self, session, skip):
+        after_id = 0
+        while True:
+            rows = (await session.execute(
+                select(Vacancy.id, Vacancy.description)
+                .outerjoin(VacancySignature, VacancySignature.vacancy_id == Vacancy.id)
+                .where(Vacancy.id > after_id, Vacancy.description.is_not(None), Vacancy.description != "",
+                       VacancySignature.vacancy_id.is_(None), Vacancy.id.not_in(skip))
+                .order_by(Vacancy.id)
+                .limit(LOAD_CHUNK))).all()
+            if not rows:
+                break
+            await link_duplicates(session, rows, sync=False)
+            await session.commit()
+            after_id = rows[-1].id
+
+
+duplicate_index = DuplicateIndex()
+
+
+async def _store_signatures(session: AsyncSession, rows):
+    """
+    Подписи для (vacancy_id, текст), у которых поменялся content_hash.
+    Возвращает {vacancy_id: подпись} пересчитанных.
+    """
+    rows = dict(rows)
+    if not rows:
+        return {}
+    known = dict((await session.execute(select(VacancySignature.vacancy_id, VacancySignature.content_hash)
+                                        .where(VacancySignature.vacancy_id.in_(rows)))).all())
+    computed = {}
+    for vacancy_id, text in rows.items():
+        text_hash = content_hash(text)
+        if known.get(vacancy_id) == text_hash:
+            continue
+        values = signature(text)
+        if values is not None:
+            computed[vacancy_id] = (text_hash, values)
+    if computed:
+        stmt = insert(VacancySignature).values([{"vacancy_id": vacancy_id, "content_hash": text_hash,
+                                                 "signature": pack_signature(values)}
+                                                for vacancy_id, (text_hash, values) in computed.items()])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VacancySignature.vacancy_id],
+            set_={"content_hash": stmt.excluded.content_hash, "signature": stmt.excluded.signature,
+                  "updated_at": func.now()})
+        await session.execute(stmt)
+    return {vacancy_id: values for vacancy_id, (_, values) in computed.items()}
+
+
+async def link_duplicates(session: AsyncSession, rows, sync=True):
+    """
+    Этап дедупликации при сохранении описаний: rows = [(vacancy_id, чистый текст)].
+    Считает подписи изменившихся текстов, ищет кандидатов через LSH, проверяет их
+    по полной подписи и проставляет duplicate_of. Каноническая вакансия кластера -
+    с наименьшим id: если новая вакансия раньше канонической найденного кластера,
+    кластер целиком переходит на неё. Дубликаты, висевшие на вакансии с изменившимся
+    текстом, перепроверяются заново.
+    Возвращает {"signed", "duplicates": id ставших дубликатами, "canonical": id, переставших ими быть}.
+    Коммит за вызывающим кодом.
+    """
+    rows = list(rows)
+    if sync or not duplicate_index.loaded:
+        await duplicate_index.ensure_loaded(session, skip=[vacancy_id for vacancy_id, _ in rows])
+    signatures = await _store_signatures(session, rows)
+    if not signatures:
+        return {"signed": 0, "duplicates": set(), "canonical": set()}
+
+    # Бывшие дубликаты изменившихся вакансий перепроверяются по сохранённым подписям
+    result = await session.execute(
+        select(VacancySignature.vacancy_id, VacancySignature.signature)
+        .join(Vacancy, Vacancy.id == VacancySignature.vacancy_id)
+        .where(Vacancy.duplicate_of.in_(signatures), Vacancy.id.not_in(signatures)))
+    for vacancy_id, raw in result:
+        signatures[vacancy_id] = unpack_signature(raw)
+
+    for vacancy_id, values in signatures.items():
+        duplicate_index.upsert(vacancy_id, band_keys(values))
+    candidates = {vacancy_id: duplicate_index.candidates(band_keys(values)) - {vacancy_id}
+                  for vacancy_id, values in signatures.items()}
+
+    known = dict(signatures)
+    canonical_of = {}
+    outside = set().union(*candidates.values()) - signatures.keys()
+    if outside:
+        result = await session.execute(
+            select(VacancySignature.vacancy_id, VacancySignature.signature, Vacancy.duplicate_of)
+            .join(Vacancy, Vacancy.id == VacancySignature.vacancy_id)
+            .where(VacancySignature.vacancy_id.in_(outside)))
+        for vacancy_id, raw, duplicate_of in result:
+            known[vacancy_id] = unpack_signature(raw)
+            canonical_of[vacancy_id] = duplicate_of or vacancy_id
+
+    regroup = {}  # старая каноническая -> новая
+    for vacancy_id in sorted(signatures):
+        matches = [other for other in candidates[vacancy_id] if other in known
+                   and similarity(signatures[vacancy_id], known[other]) >= settings.DEDUP_THRESHOLD]
+        clusters = {canonical_of.get(other, other) for other in matches}
+        canonical = min(clusters | {vacancy_id})
+        canonical_of[vacancy_id] = canonical
+        for cluster in clusters - {canonical}:
+            regroup[cluster] = canonical
+            for member, member_canonical in canonical_of.items():
+                if member_canonical == cluster:
+                    canonical_of[member] = canonical
+
+    linked = {vacancy_id: canonical_of[vacancy_id] for vacancy_id in signatures}
+    await session.execute(update(Vacancy), [{"id": vacancy_id,
+                                             "duplicate_of": None if canonical == vacancy_id else canonical}
+                                            for vacancy_id, canonical in linked.items()])
+    duplicates = {vacancy_id for vacancy_id, canonical in linked.items() if canonical != vacancy_id}
+    by_target = {}
+    for cluster, canonical in regroup.items():
+        by_target.setdefault(canonical_of.get(cluster, canonical), []).append(cluster)
+    for canonical, clusters in by_target.items():
+        result = await session.execute(
+            update(Vacancy)
+            .where(or_(Vacancy.id.in_(clusters), Vacancy.duplicate_of.in_(clusters)), Vacancy.id != canonical)
+            .values(duplicate_of=canonical)
+            .returning(Vacancy.id))
+        duplicates.update(result.scalars())
+
+    return {"signed": len(signatures), "duplicates": duplicates,
+            "canonical": {vacancy_id for vacancy_id, canonical in linked.items() if canonical == vacancy_id}}
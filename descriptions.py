@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+
+import anyio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import async_session_maker
+from dedup import link_duplicates
+from features import store_vacancy_vectors
+from hh_client import get_vacancy_description
+from models import Vacancy
+from vacancy_index import vacancy_index
+
+
+async def fetch_descriptions(targets, concurrency=None, revalidate=False):
+    """
+    Параллельно качает описания для списка (vacancy_id, hh_id).
+    Одновременно в полёте не больше concurrency запросов, общий темп
+    дополнительно ограничивает rate limiter в hh_client.
+    Отдаёт (vacancy_id, hh_id, description) по мере готовности, где description -
+    пара (html, текст) или None при ошибке.
+    revalidate=True - не верить свежему кэшу, спросить HH условным запросом.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.FILL_CONCURRENCY)
+
+    async def fetch_one(vacancy_id, hh_id):
+        async with semaphore:
+            try:
+                description = await get_vacancy_description(hh_id, revalidate)
+            except Exception as e:
+                print(f"Не удалось скачать описание {hh_id}: {e}")
+                description = None
+            return vacancy_id, hh_id, description
+
+    tasks = [asyncio.create_task(fetch_one(vacancy_id, hh_id)) for vacancy_id, hh_id in targets]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def save_descriptions(session: AsyncSession, rows):
+    """
+    Один bulk UPDATE по первичному ключу: rows = [{"id", "description", "description_html"}],
+    в той же транзакции - векторы изменившихся описаний и поиск почти-дубликатов.
+    """
+    if rows:
+        await session.execute(update(Vacancy), rows)
+    await index_descriptions(session, [(row["id"], row["description"]) for row in rows])
+
+
+async def index_descriptions(session: AsyncSession, texts):
+    """
+    Для описаний, уже записанных в этой транзакции (texts = [(vacancy_id, текст)]):
+    векторы, почти-дубликаты, коммит и обновление vacancy_index этого процесса.
+    """
+    vectors = {}
+    duplicates = None
+    if texts:
+        vectors = await store_vacancy_vectors(session, texts)
+        if settings.DEDUP_ENABLED:
+            duplicates = await link_duplicates(session, texts)
+    await session.commit()
+    for vacancy_id, weights in vectors.items():
+        vacancy_index.upsert_weights(vacancy_id, weights)
+    if duplicates:
+        await vacancy_index.apply_duplicates(session, duplicates["duplicates"], duplicates["canonical"])
+
+
+async def fill_progress(targets, concurrency=None):
+    """
+    NDJSON-поток для /vacancies/fill-batch: строка на каждую вакансию и итоговая строка.
+    Описания пишутся в БД пачками по FILL_SAVE_BATCH по ходу загрузки, остаток - в конце
+    или при обрыве потока клиентом: скачанное не теряется.
+    """
+    started = time.perf_counter()
+    rows = []
+    updated = failed = 0
+
+    async def flush():
+        # Своя сессия: сессия из Depends к этому моменту уже может быть закрыта.
+        # Клиент ушёл - Starlette отменяет поток; отмена посреди записи сломала бы
+        # соединение asyncpg, поэтому запись пачки доводится до конца
+        with anyio.CancelScope(shield=True):
+            async with async_session_maker() as session:
+                await save_descriptions(session, rows)
+        rows.clear()
+
+    try:
+        async for vacancy_id, hh_id, description in fetch_descriptions(targets, concurrency):
+            if description and description[1]:
+                rows.append({"id": vacancy_id, "description": description[1],
+                             "description_html": description[0]})
+                updated += 1
+                status = "updated"
+            else:
+                failed += 1
+                status = "failed"
+            if len(rows) >= settings.FILL_SAVE_BATCH:
+                await flush()
+            yield json.dumps({"hh_id": hh_id, "status": status,
+                              "done": updated + failed, "total": len(targets)},
+                             ensure_ascii=False) + "\n"
+    finally:
+        if rows:
+            await flush()
+
+    yield json.dumps({"status": "finished", "updated": updated, "failed": failed,
+                      "seconds": round(time.perf_counter() - started, 3)}) + "\n"
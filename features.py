@@ -0,0 +1,232 @@
+"""
+Предпосчитанные векторы текстов резюме и вакансий.
+Текст токенизируется один раз при записи, вектор хранится рядом с ORM-моделью
+в упакованном виде (array('I') id термов + float32 веса) вместе с хешем текста:
+если текст не менялся, повторной обработки нет.
+"""
+import asyncio
+import hashlib
+import math
+from array import array
+from collections import Counter
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import async_session_maker
+from matching import term_weights, tokenize
+from models import MatchCache, ResumeVector, Term, VacancyVector
+
+TERMS_CHUNK = 5000  # параметров в запросе не больше лимита Postgres
+
+# Кэш словаря в процессе: термы не меняют id, поэтому его не нужно инвалидировать
+_term_ids = {}
+_terms_by_id = {}
+
+# Какая колонка match_cache ссылается на хеш текста этой модели
+_MATCH_CACHE_COLUMN = {VacancyVector: MatchCache.vacancy_hash, ResumeVector: MatchCache.resume_hash}
+
+
+def content_hash(text):
+    return hashlib.sha256((text or "").encode()).hexdigest()
+
+
+def pack(ids, weights):
+    return array("I", ids).tobytes(), array("f", weights).tobytes()
+
+
+def unpack(term_ids_bytes, weights_bytes):
+    ids = array("I")
+    ids.frombytes(term_ids_bytes)
+    weights = array("f")
+    weights.frombytes(weights_bytes)
+    return ids, weights
+
+
+async def get_term_ids(terms):
+    """
+    Терм -> id, недостающие термы добавляются в словарь.
+    Вставка - своя короткая транзакция, в кэш процесса id попадают только после её коммита:
+    иначе откат транзакции вызывающего кода оставил бы в кэше id, которых нет в БД,
+    а конкурентные транзакции ждали бы на уникальном индексе до конца чужой.
+    """
+    missing = sorted({term for term in terms if term not in _term_ids})
+    if missing:
+        found = {}
+        async with async_session_maker() as session:
+            for start in range(0, len(missing), TERMS_CHUNK):
+                chunk = missing[start:start + TERMS_CHUNK]
+                # Сортировка даёт одинаковый порядок блокировок у конкурентных транзакций
+                await session.execute(insert(Term).values([{"term": term} for term in chunk])
+                                      .on_conflict_do_nothing(index_elements=[Term.term]))
+                await session.commit()
+                result = await session.execute(select(Term.id, Term.term).where(Term.term.in_(chunk)))
+                found.update({term: term_id for term_id, term in result})
+        for term, term_id in found.items():
+            _term_ids[term] = term_id
+            _terms_by_id[term_id] = term
+    return {term: _term_ids[term] for term in terms}
+
+
+async def get_terms(session: AsyncSession, ids):
+    """id -> терм для распаковки векторов"""
+    missing = sorted({term_id for term_id in ids if term_id not in _terms_by_id})
+    for start in range(0, len(missing), TERMS_CHUNK):
+        chunk = missing[start:start + TERMS_CHUNK]
+        result = await session.execute(select(Term.id, Term.term).where(Term.id.in_(chunk)))
+        for term_id, term in result:
+            _term_ids[term] = term_id
+            _terms_by_id[term_id] = term
+    return _terms_by_id
+
+
+def _compute(texts):
+    return [term_weights(tokenize(text)) for text in texts]
+
+
+async def _store_vectors(session: AsyncSession, model, key, rows):
+    """
+    rows = [(owner_id, text)]. Пересчитывает только строки с изменившимся хешем,
+    вектор пишется upsert'ом. Результаты анализа по старому тексту удаляются из match_cache.
+    Возвращает {owner_id: {терм: вес}} для пересчитанных.
+    Коммит остаётся за вызывающим кодом.
+    """
+    rows = {owner_id: text for owner_id, text in rows if text}
+    if not rows:
+        return {}
+
+    owner_column = getattr(model, key)
+    result = await session.execute(select(owner_column, model.content_hash, model.term_ids)
+                                   .where(owner_column.in_(list(rows))))
+    stored = {}
+    stored_term_ids = {}
+    for owner_id, text_hash, term_ids in result:
+        stored[owner_id] = text_hash
+        stored_term_ids[owner_id] = term_ids
+
+    changed = [(owner_id, text, content_hash(text)) for owner_id, text in rows.items()]
+    changed = [row for row in changed if stored.get(row[0]) != row[2]]
+    if not changed:
+        return {}
+
+    # Токенизация - чистый CPU, не держим на ней event loop
+    weights = await asyncio.to_thread(_compute, [text for _, text, _ in changed])
+    ids = await get_term_ids({term for vector in weights for term in vector})
+
+    values = []
+    for (owner_id, _, text_hash), vector in zip(changed, weights):
+        term_ids, term_weights_bytes = pack([ids[term] for term in vector], vector.values())
+        values.append({key: owner_id, "content_hash": text_hash,
+                       "term_ids": term_ids, "weights": term_weights_bytes})
+
+    if model is VacancyVector:
+        await _update_df(session, [row["term_ids"] for row in values],
+                         [stored_term_ids[owner_id] for owner_id, _, _ in changed if owner_id in stored])
+
+    for start in range(0, len(values), TERMS_CHUNK // 4):
+        stmt = insert(model).values(values[start:start + TERMS_CHUNK // 4])
+        changes = {"content_hash": stmt.excluded.content_hash,
+                   "term_ids": stmt.excluded.term_ids,
+                   "weights": stmt.excluded.weights}
+        if "updated_at" in model.__table__.c:
+            changes["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=[owner_column], set_=changes)
+        await session.execute(stmt)
+
+    stale = [stored[owner_id] for owner_id, _, _ in changed if owner_id in stored]
+    if stale:
+        await session.execute(delete(MatchCache).where(_MATCH_CACHE_COLUMN[model].in_(stale)))
+
+    return {owner_id: vector for (owner_id, _, _), vector in zip(changed, weights)}
+
+
+async def _update_df(session: AsyncSession, added, removed):
+    """
+    terms.df += 1 за каждый новый вектор вакансии с термом, -= 1 за заменённый.
+    Строки обновляются по возрастанию id: параллельные транзакции блокируют их
+    в одном порядке и не упираются в deadlock.
+    """
+    delta = Counter()
+    for packed_ids in added:
+        ids = array("I")
+        ids.frombytes(packed_ids)
+        delta.update(ids)
+    for packed_ids in removed:
+        ids = array("I")
+        ids.frombytes(packed_ids)
+        delta.subtract(ids)
+    params = [{"term_id": term_id, "delta": count} for term_id, count in sorted(delta.items()) if count]
+    terms = Term.__table__
+    stmt = (update(terms).where(terms.c.id == bindparam("term_id"))
+            .values(df=terms.c.df + bindparam("delta")))
+    for start in range(0, len(params), TERMS_CHUNK):
+        await session.execute(stmt, params[start:start + TERMS_CHUNK])
+
+
+async def load_idf(session: AsyncSession, terms):
+    """
+    Терм -> IDF по всем векторам вакансий, формула та же, что в vacancy_index.
+    Читаются только df нужных термов (terms.df), весь индекс в процесс не грузится.
+    Терм, которого нет ни в одной вакансии, получает наибольший IDF.
+    """
+    documents = await session.scalar(select(func.count()).select_from(VacancyVector))
+    terms = list(terms)
+    df = {}
+    for start in range(0, len(terms), TERMS_CHUNK):
+        result = await session.execute(select(Term.term, Term.df)
+                                       .where(Term.term.in_(terms[start:start + TERMS_CHUNK])))
+        df.update(result.all())
+    return {term: math.log((1 + documents) / (1 + df.get(term, 0))) + 1 for term in terms}
+
+
+async def _load_packed(session: AsyncSession, model, key, owner_ids):
+    """
+    Строки векторов как есть из БД и {term_id: терм} для них.
+    Разворачивание в словари (unpack_vectors) - чистый CPU, его можно увести в поток.
+    """
+    owner_column = getattr(model, key)
+    result = await session.execute(select(owner_column, model.term_ids, model.weights)
+                                   .where(owner_column.in_(list(owner_ids))))
+    rows = result.all()
+    term_ids = set()
+    for _, packed_ids, _ in rows:
+        ids = array("I")
+        ids.frombytes(packed_ids)
+        term_ids.update(ids)
+    return rows, await get_terms(session, term_ids)
+
+
+def unpack_vectors(rows, terms):
+    """{owner_id: {терм: вес}} из результата _load_packed"""
+    vectors = {}
+    for owner_id, term_ids, weights in rows:
+        ids, weights = unpack(term_ids, weights)
+        # Термы коммитятся раньше векторов, так что id без терма - только при ручной правке БД
+        vectors[owner_id] = {terms[term_id]: weight for term_id, weight in zip(ids, weights) if term_id in terms}
+    return vectors
+
+
+async def _load_vectors(session: AsyncSession, model, key, owner_ids):
+    """{owner_id: {терм: вес}} для тех, у кого вектор уже посчитан"""
+    return unpack_vectors(*await _load_packed(session, model, key, owner_ids))
+
+
+async def store_vacancy_vectors(session: AsyncSession, rows):
+    return await _store_vectors(session, VacancyVector, "vacancy_id", rows)
+
+
+async def store_resume_vectors(session: AsyncSession, rows):
+    return await _store_vectors(session, ResumeVector, "resume_id", rows)
+
+
+async def load_vacancy_vectors(session: AsyncSession, vacancy_ids):
+    return await _load_vectors(session, VacancyVector, "vacancy_id", vacancy_ids)
+
+
+async def load_vacancy_vectors_packed(session: AsyncSession, vacancy_ids):
+    return await _load_packed(session, VacancyVector, "vacancy_id", vacancy_ids)
+
+
+async def load_resume_vectors(session: AsyncSession, resume_ids):
+    return await _load_vectors(session, ResumeVector, "resume_id", resume_ids)
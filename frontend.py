@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import time
 import os
+import json
 
 # Настройка адреса (Локально или Докер)
 API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
@@ -18,6 +19,20 @@ if 'user_email' not in st.session_state:
 def navigate():
     st.session_state['page'] = st.session_state.menu_selection
 
+def show_match_result(result):
+    """Показывает структуру из matching.score_vectors: балл, навыки, ключевые термы"""
+    st.metric("Совместимость", f"{result['score']}%")
+    col_ok, col_miss = st.columns(2)
+    with col_ok:
+        st.write("**Совпавшие навыки**")
+        st.write(", ".join(result["matched_skills"]) or "—")
+    with col_miss:
+        st.write("**Не хватает**")
+        st.write(", ".join(result["missing_skills"]) or "—")
+    if result["top_terms"]:
+        st.write("**Что дало больший вклад**")
+        st.table([{"Терм": t["term"], "Вклад": t["weight"]} for t in result["top_terms"]])
+
 # БОКОВОЕ МЕНЮ
 with st.sidebar:
     st.title("Меню")
@@ -138,6 +153,29 @@ elif st.session_state['page'] == "Поиск Вакансий":
                         st.error(f"Ошибка сервера: {response.text}")
                 except Exception as e:
                     st.error(f"Ошибка соединения: {e}")
+        
+        # Пакетная загрузка описаний: бэкенд качает их параллельно и шлёт прогресс построчно
+        if st.button("Скачать описания для всех вакансий без описания"):
+            progress = st.progress(0.0, text="Скачиваем описания...")
+            try:
+                with requests.post(f"{API_URL}/vacancies/fill-batch",
+                                   json={"all_missing": True}, stream=True) as response:
+                    if response.status_code != 200:
+                        st.error(f"Ошибка сервера: {response.text}")
+                    else:
+                        for line in response.iter_lines():
+                            if not line:
+                                continue
+                            event = json.loads(line)
+                            if event["status"] == "finished":
+                                progress.progress(1.0, text="Готово!")
+                                st.success(f"Обновлено: {event['updated']}, ошибок: {event['failed']} "
+                                           f"за {event['seconds']} с")
+                            else:
+                                progress.progress(event["done"] / event["total"],
+                                                  text=f"{event['done']} / {event['total']}")
+            except Exception as e:
+                st.error(f"Ошибка соединения: {e}")
 
 # --- СТРАНИЦА АНАЛИЗА (MATCH) ---
 elif st.session_state['page'] == "Анализ (Match)":
@@ -146,22 +184,23 @@ elif st.session_state['page'] == "Анализ (Match)":
     if not st.session_state['user_email']:
         st.warning("Нужен вход в систему")
     else:
-        st.info("Выберите резюме из списка и введите ID вакансии")
+        st.info("Выберите резюме и вакансию из списков")
         
         resume_options = []
         res_id = None
         
         try:
-            # Запрашиваем список всех резюме
-            res_response = requests.get(f"{API_URL}/all_resumes")
+            # Резюме текущего пользователя: только id и начало текста, без полных тел
+            res_response = requests.get(f"{API_URL}/resumes",
+                                        params={"email": st.session_state['user_email'], "limit": 200})
             if res_response.status_code == 200:
-                resumes_list = res_response.json()
+                resumes_list = res_response.json()["items"]
                 if not resumes_list:
                     st.warning("В базе нет резюме. Сначала создайте его.")
                 else:
                     # Формируем список для Selectbox
                     # словарь, Ключ = "Красивое название", Значение = ID
-                    resume_map = {f"ID: {r['id']} | {r['content'][:40]}...": r['id'] for r in resumes_list}
+                    resume_map = {f"ID: {r['id']} | {r['preview'][:40]}...": r['id'] for r in resumes_list}
                     
                     selected_label = st.selectbox("Выберите резюме", options=list(resume_map.keys()))
                     
@@ -172,6 +211,21 @@ elif st.session_state['page'] == "Анализ (Match)":
         except Exception as e:
             st.error(f"Ошибка соединения (список резюме): {e}")
 
+        if res_id and st.button("Подобрать лучшие вакансии"):
+            try:
+                top_response = requests.get(f"{API_URL}/resumes/{res_id}/top-matches", params={"k": 20})
+                if top_response.status_code == 200:
+                    matches = top_response.json()["matches"]
+                    if matches:
+                        st.table([{"ID": m["vacancy_id"], "Вакансия": m["name"], "Совпадение, %": m["score"]}
+                                  for m in matches])
+                    else:
+                        st.info("Нет вакансий с описанием. Скачайте описания на странице поиска.")
+                else:
+                    st.error(f"Ошибка: {top_response.text}")
+            except Exception as e:
+                st.error(f"Ошибка соединения: {e}")
+
         c1, c2 = st.columns(2)
         with c1:
             # Показываем выбранный ID (просто для информации, заблокированный)
@@ -181,7 +235,25 @@ elif st.session_state['page'] == "Анализ (Match)":
                 st.text_input("ID Резюме", value="Не выбрано", disabled=True)
                 
         with c2:
-            vac_id = st.number_input("ID Вакансии", min_value=1, value=1)
+            vac_id = None
+            name_filter = st.text_input("Фильтр вакансий по названию")
+            only_ready = st.checkbox("Только с описанием")
+            try:
+                params = {"limit": 200}
+                if name_filter:
+                    params["name"] = name_filter
+                if only_ready:
+                    params["has_description"] = True
+                vac_response = requests.get(f"{API_URL}/vacancies/list", params=params)
+                vacancies_list = vac_response.json()["items"] if vac_response.status_code == 200 else []
+                if vacancies_list:
+                    vacancy_map = {f"ID: {v['id']} | {v['name']}" + (" ✓" if v['has_description'] else ""): v['id']
+                                   for v in vacancies_list}
+                    vac_id = vacancy_map[st.selectbox("Выберите вакансию", options=list(vacancy_map.keys()))]
+                else:
+                    st.warning("Вакансий не найдено. Сначала выполните поиск.")
+            except Exception as e:
+                st.error(f"Ошибка соединения (список вакансий): {e}")
 
         vacancy_ready = False
         
@@ -219,31 +291,42 @@ elif st.session_state['page'] == "Анализ (Match)":
                     payload = {"resume_id": res_id, "vacancy_id": vac_id}
                     response = requests.post(f"{API_URL}/match", json=payload)
                     
-                    if response.status_code == 200:
+                    if response.status_code == 200 and response.json()["status"] == "done":
+                        # Эта пара уже анализировалась по тем же текстам - результат из кэша
+                        status_box.update(label="Готово (из кэша)", state="complete", expanded=False)
+                        st.divider()
+                        st.subheader("Результат анализа:")
+                        show_match_result(response.json()["result"])
+                    elif response.status_code == 200:
                         task_id = response.json().get("task_id")
                         status_box.write(f"Задача ID: {task_id}")
                         status_box.write("⏳ Ожидание воркера...")
                         
-                        #Polling (опрос сервера, готов ли результат)
-                        while True:
-                            time.sleep(2)
-                            status_resp = requests.get(f"{API_URL}/tasks/{task_id}")
-                            status_data = status_resp.json()
+                        # Сервер сам присылает смену статуса (SSE), опрашивать не нужно
+                        events = requests.get(f"{API_URL}/tasks/{task_id}/events", stream=True, timeout=(5, 60))
+                        for line in events.iter_lines(decode_unicode=True):
+                            if not line or not line.startswith("data:"):
+                                continue
+                            status_data = json.loads(line[len("data:"):])
                             status = status_data["status"]
                             
-                            if status == "SUCCESS":
+                            if status == "STARTED":
+                                status_box.write("⚙️ Воркер анализирует...")
+                            
+                            elif status == "SUCCESS":
                                 status_box.update(label="Готово!", state="complete", expanded=False)
                                 
                                 # КРАСИВЫЙ ВЫВОД РЕЗУЛЬТАТА
                                 st.divider()
                                 st.subheader("Результат анализа:")
-                                st.code(status_data["result"], language="text")
+                                show_match_result(status_data["result"])
                                 break
                             
                             elif status == "FAILURE":
                                 status_box.update(label="Ошибка", state="error")
                                 st.error(status_data['result'])
                                 break
+                        events.close()
                     else:
                         st.error(f"Ошибка: {response.text}")
                 except Exception as e:
@@ -0,0 +1,169 @@
+import json
+import time
+from collections import OrderedDict
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from config import settings
+from metrics import count_cache_event
+
+
+class VacancyCache:
+    """
+    Кэш ответов HH по вакансиям: ETag/Last-Modified + сырой JSON.
+    Первый уровень - ограниченный LRU в памяти процесса, второй (по желанию) - Redis,
+    общий для всех воркеров. Запись старше ttl не выбрасывается, а ревалидируется
+    условным GET, поэтому хранится дольше свежести.
+    """
+
+    def __init__(self, max_items, ttl, redis_url=None, redis_ttl=86400, prefix="hh:vacancy:"):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self.redis_url = redis_url
+        self._redis = None
+        self._local = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "revalidated": 0, "refreshed": 0,
+                         "redis_hits": 0, "evictions": 0, "redis_errors": 0}
+
+    def _get_redis(self):
+        if self.redis_url and self._redis is None:
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def count(self, name):
+        self.counters[name] += 1
+        count_cache_event("hh_vacancy", name)
+
+    async def get(self, key):
+        entry = self._local.get(key)
+        if entry is not None:
+            self._local.move_to_end(key)
+            return entry
+
+        redis = self._get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(self.prefix + key)
+        except RedisError as e:
+            self.count("redis_errors")
+            print("Кэш HH: Redis недоступен:", e)
+            return None
+        if raw is None:
+            return None
+
+        self.count("redis_hits")
+        entry = json.loads(raw)
+        self._remember(key, entry)
+        return entry
+
+    async def put(self, key, entry):
+        self._remember(key, entry)
+        redis = self._get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(self.prefix + key, json.dumps(entry, ensure_ascii=False), ex=self.redis_ttl)
+        except RedisError as e:
+            self.count("redis_errors")
+            print("Кэш HH: Redis недоступен:", e)
+
+    async def drop(self, key):
+        self._local.pop(key, None)
+        redis = self._get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(self.prefix + key)
+        except RedisError:
+            self.count("redis_errors")
+
+    def _remember(self, key, entry):
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_items:
+            self._local.popitem(last=False)
+            self.count("evictions")
+
+    def stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"] + \
+            self.counters["revalidated"] + self.counters["refreshed"]
+        served_without_body = self.counters["hits"] + self.counters["revalidated"]
+        return {
+            **self.counters,
+            "size": len(self._local),
+            "max_items": self.max_items,
+            "ttl": self.ttl,
+            "redis": bool(self.redis_url),
+            "hit_ratio": round(served_without_body / lookups, 4) if lookups else 0.0,
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+class SearchResultCache:
+    """
+    Короткий кэш выдачи /vacancies в памяти процесса: ключ - нормализованный запрос + регионы.
+    Выдача HH меняется медленно, а одинаковые поиски приходят пачками; между процессами
+    выдачу делит single-flight через Redis (см. hh_client.search_vacancies_once).
+    """
+
+    def __init__(self, max_items, ttl):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._local = OrderedDict()  # ключ -> (истекает, items)
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(text, areas, per_page):
+        """"  Python   Junior" и "python junior" - один ключ; порядок регионов не важен"""
+        return f"{' '.join(text.lower().split())}|{','.join(sorted(map(str, areas)))}|{per_page}"
+
+    def count(self, name):
+        self.counters[name] += 1
+        count_cache_event("hh_search", name)
+
+    def get(self, key):
+        entry = self._local.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.count("misses")
+            return None
+        self._local.move_to_end(key)
+        self.count("hits")
+        return entry[1]
+
+    def put(self, key, items):
+        if self.ttl <= 0:
+            return
+        self._local[key] = (time.monotonic() + self.ttl, items)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_items:
+            self._local.popitem(last=False)
+            self.count("evictions")
+
+    def stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {**self.counters, "size": len(self._local), "ttl": self.ttl,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0}
+
+
+def create_search_cache():
+    return SearchResultCache(settings.SEARCH_CACHE_MAX_ITEMS, settings.SEARCH_CACHE_TTL)
+
+
+def create_vacancy_cache():
+    redis_url = None
+    if settings.HH_CACHE_REDIS:
+        from celery_app import REDIS_URL
+        redis_url = REDIS_URL
+    return VacancyCache(settings.HH_CACHE_MAX_ITEMS, settings.HH_CACHE_TTL,
+                        redis_url=redis_url, redis_ttl=settings.HH_CACHE_REDIS_TTL)
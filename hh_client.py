@@ -1,49 +1,318 @@
 import httpx
 import asyncio
-import re
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from config import settings
+from hh_cache import create_search_cache, create_vacancy_cache
+from html_text import html_to_text
+from metrics import hh_endpoint, observe_hh_request
+from singleflight import create_single_flight
 
-async def get_vacancies(keyword):
+DEFAULT_AREAS = [1002, 1003] # Минск и Гродно
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+GONE_STATUSES = {404, 410}  # вакансию удалили или скрыли
+
+# Один долгоживущий клиент на процесс: пул соединений, keep-alive, без повторного TLS
+_client = None
+vacancy_cache = create_vacancy_cache()
+search_cache = create_search_cache()
+# Одновременные одинаковые поиски и загрузки одной вакансии ждут один запрос к HH
+search_flight = create_single_flight("search", max(settings.SEARCH_CACHE_TTL, settings.SINGLEFLIGHT_RESULT_TTL))
+vacancy_flight = create_single_flight("vacancy", settings.SINGLEFLIGHT_RESULT_TTL)
+
+
+def create_client():
+    return httpx.AsyncClient(
+        base_url=settings.HH_API_URL,
+        http2=settings.HH_HTTP2,
+        headers={"User-Agent": settings.HH_USER_AGENT},
+        limits=httpx.Limits(max_connections=settings.HH_MAX_CONNECTIONS,
+                            max_keepalive_connections=settings.HH_MAX_KEEPALIVE,
+                            keepalive_expiry=settings.HH_KEEPALIVE_EXPIRY),
+        timeout=httpx.Timeout(settings.HH_TIMEOUT, connect=settings.HH_CONNECT_TIMEOUT),
+    )
+
+
+def get_client():
+    """Общий клиент процесса. Создаётся лениво, если lifespan/воркер его ещё не открыл."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+async def init_client():
+    return get_client()
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    await vacancy_cache.close()
+    await search_flight.close()
+    await vacancy_flight.close()
+
+
+class RateLimiter:
+    """Token bucket: не больше rate запросов в секунду с запасом burst"""
+    
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_rate_limiter = RateLimiter(settings.HH_RATE_LIMIT, settings.HH_RATE_BURST) if settings.HH_RATE_LIMIT > 0 else None
+
+
+def _retry_after(response):
+    """Retry-After бывает в секундах или HTTP-датой"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def _backoff(attempt):
+    """Экспоненциальная задержка с полным джиттером"""
+    return random.uniform(0, min(settings.HH_BACKOFF_MAX, settings.HH_BACKOFF_BASE * 2 ** attempt))
+
+
+async def hh_request(method, path, **kwargs):
+    """
+    Запрос к HH через общий клиент.
+    На 429/5xx и сетевых ошибках повторяет с джиттером, уважая Retry-After
+    (не дольше HH_RETRY_AFTER_MAX - иначе сразу отдаёт ответ с ошибкой).
+    Возвращает последний ответ (или пробрасывает последнюю сетевую ошибку).
+    """
+    client = get_client()
+    endpoint = hh_endpoint(path)
+    attempt = 0
+    while True:
+        if _rate_limiter is not None:
+            await _rate_limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.TransportError:
+            observe_hh_request(endpoint, "error", time.perf_counter() - started)
+            if attempt >= settings.HH_MAX_RETRIES:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+            continue
+        observe_hh_request(endpoint, response.status_code, time.perf_counter() - started)
+        
+        if response.status_code not in RETRY_STATUSES or attempt >= settings.HH_MAX_RETRIES:
+            return response
+        
+        # Retry-After соблюдаем как есть (HH_BACKOFF_MAX - только для своей задержки);
+        # если HH просит ждать дольше HH_RETRY_AFTER_MAX, не держим запрос и отдаём ответ
+        delay = _retry_after(response)
+        if delay is None:
+            delay = _backoff(attempt)
+        elif delay > settings.HH_RETRY_AFTER_MAX:
+            return response
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def fetch_vacancies_page(params):
+    """
+    Один запрос к /vacancies. Возвращает весь ответ HH (items, found, pages, page)
+    или None при ошибке.
+    """
+    response = await hh_request("GET", "/vacancies", params=params)
+    
+    if response.status_code !=200:
+        print("Ошибка получения данных:", response.status_code)
+        return None
+    
+    return response.json()
+
+
+async def _fetch_vacancy_items(keyword, areas, per_page):
     params = {
         "text": keyword,
-        "area": [1002, 1003], # Минск и Гродно
-        "per_page": 10 
+        "area": areas,
+        "per_page": per_page
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get('https://api.hh.ru/vacancies', params=params)
-        
-        if response.status_code !=200:
-            print("Ошибка получения данных:", response.status_code)
-            return []
-        
-        return response.json()['items']
+    data = await fetch_vacancies_page(params)
+    if data is None:
+        return None
+    
+    return data['items']
+
+
+async def search_vacancies_once(keyword, areas=DEFAULT_AREAS, per_page=10):
+    """
+    Выдача HH по запросу: (items, fetched).
+    Повторный поиск в пределах SEARCH_CACHE_TTL берётся из кэша, одновременные
+    одинаковые - ждут один запрос. fetched=True только у вызова, который сам сходил в HH:
+    сохранять выдачу в БД нужно ему одному.
+    """
+    key = search_cache.key(keyword, areas, per_page)
+    items = search_cache.get(key)
+    if items is not None:
+        return items, False
+    
+    items, fetched = await search_flight.do(key, _fetch_vacancy_items, keyword, areas, per_page)
+    if items is None:
+        return [], fetched
+    search_cache.put(key, items)
+    return items, fetched
+
+
+async def get_vacancies(keyword, areas=DEFAULT_AREAS, per_page=10):
+    items, _ = await search_vacancies_once(keyword, areas, per_page)
+    return items
     
     
 def clean_html(raw_html):
-    """Удаляет теги типа <p>, <br> из текста"""
-    cleanr = re.compile("<.*?>")
-    cleantext = re.sub(cleanr, "", raw_html)
-    return cleantext
+    """Превращает HTML описания в текст: теги, сущности, абзацы и списки (см. html_text)"""
+    return html_to_text(raw_html)
+
+
+async def get_vacancy_json(vacancy_id: str, revalidate=False):
+    """
+    JSON вакансии через кэш: свежая запись отдаётся без запроса,
+    устаревшая ревалидируется по ETag/Last-Modified (304 - тело не качаем).
+    revalidate=True - условный запрос даже к свежей записи (обновление сохранённых поисков).
+    Если HH вакансию больше не отдаёт, запись из кэша удаляется.
+    """
+    vacancy_id = str(vacancy_id)
+    entry = await vacancy_cache.get(vacancy_id)
+    
+    if entry is not None and not revalidate and vacancy_cache.is_fresh(entry):
+        vacancy_cache.count("hits")
+        return entry["payload"]
+    
+    # Параллельные fill одной вакансии не качают её дважды
+    payload, _ = await vacancy_flight.do(vacancy_id, _fetch_vacancy_json, vacancy_id, entry)
+    return payload
+
+
+async def _fetch_vacancy_json(vacancy_id, entry):
+    _, payload = await _request_vacancy(vacancy_id, entry)
+    return payload
+
+
+async def _request_vacancy(vacancy_id, entry):
+    """
+    Запрос к HH: условный, если есть устаревшая запись entry.
+    Возвращает (статус ответа, JSON вакансии или None).
+    """
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    
+    response = await hh_request("GET", f"/vacancies/{vacancy_id}", headers=headers)
+    
+    if response.status_code == 304 and entry is not None:
+        vacancy_cache.count("revalidated")
+        entry["fetched_at"] = time.time()
+        await vacancy_cache.put(vacancy_id, entry)
+        return 304, entry["payload"]
+    
+    if response.status_code != 200:
+        await vacancy_cache.drop(vacancy_id)
+        return response.status_code, None
+    
+    vacancy_cache.count("misses" if entry is None else "refreshed")
+    payload = response.json()
+    await vacancy_cache.put(vacancy_id, {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "payload": payload,
+        "fetched_at": time.time(),
+    })
+    return response.status_code, payload
+
+
+async def get_vacancy_state(vacancy_id: str):
+    """
+    Жива ли вакансия на HH: "active", "archived" (в архиве или удалена - 404/410)
+    или None, если узнать не удалось (сеть, 5xx).
+    Всегда условный запрос: для неизменившейся вакансии HH отвечает 304 без тела.
+    """
+    vacancy_id = str(vacancy_id)
+    entry = await vacancy_cache.get(vacancy_id)
+    try:
+        status, payload = await _request_vacancy(vacancy_id, entry)
+    except httpx.TransportError as e:
+        print(f"Не удалось проверить вакансию {vacancy_id}: {e}")
+        return None
+    
+    if status in GONE_STATUSES:
+        return "archived"
+    if payload is None:
+        return None
+    return "archived" if payload.get("archived") else "active"
+
+
+async def get_vacancy_description(vacancy_id: str, revalidate=False):
+    """
+    Описание вакансии в двух видах: (сырой HTML, чистый текст) или None.
+    """
+    data = await get_vacancy_json(vacancy_id, revalidate)
+    
+    if data is None:
+        return None
+    
+    description_html = data.get("description") or ""
+    return description_html, clean_html(description_html)
 
 
 async def get_vacancy_full_text(vacancy_id: str):
     """
     Получает полное описание вакансии по её ID.
     """
-    url = f"https://api.hh.ru/vacancies/{vacancy_id}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        
-        if response.status_code != 200:
-            return None
-        
-        data = response.json()
-        description_html = data.get("description", "")
-        return clean_html(description_html)
+    description = await get_vacancy_description(vacancy_id)
     
+    if description is None:
+        return None
     
+    return description[1]
+    
+    
+async def _demo():
+    try:
+        return await get_vacancies("Python Junior")
+    finally:
+        await close_client()
+
+
 if __name__ == "__main__":
-    found_jobs = asyncio.run(get_vacancies("Python Junior"))
+    found_jobs = asyncio.run(_demo())
     
     for job in found_jobs:
         salary = job.get('salary')
@@ -0,0 +1,83 @@
+import html
+import re
+
+# Токенизатор тегов: один проход по строке, текст между тегами не трогается
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)[^>]*>")
+# Комментарии, script и style выкидываем целиком (в описаниях HH почти не встречаются)
+_SKIP_RE = re.compile(r"<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>", re.S | re.I)
+_SKIP_MARKERS = ("<!--", "<script", "<style", "<SCRIPT", "<STYLE")
+
+PARAGRAPH_TAGS = {"p", "div", "ul", "ol", "table", "section", "article", "blockquote",
+                  "h1", "h2", "h3", "h4", "h5", "h6", "pre"}
+LINE_TAGS = {"br", "tr", "dt", "dd", "hr"}
+BULLET = "• "
+
+# Описания HH состоят из небольшого набора одинаковых тегов и сущностей: "<p>", "</li>",
+# "&nbsp;"... Замену считаем один раз на точный текст тега/сущности
+_tag_replacements = {}
+_entity_replacements = {}
+_MAX_CACHED = 4096
+# Те же теги, что _TAG_RE, и те же сущности, что в html.unescape, целиком в группе:
+# re.split отдаёт текст и найденное вперемешку
+_TAG_SPLIT_RE = re.compile(r"(</?[a-zA-Z][^>]*>)")
+_ENTITY_SPLIT_RE = re.compile(r"(&(?:#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?))")
+
+
+def _tag_replacement(raw):
+    is_closing, tag = _TAG_RE.match(raw).groups()
+    tag = tag.lower()
+    if tag == "li":
+        return "" if is_closing else "\n" + BULLET
+    if tag in PARAGRAPH_TAGS:
+        return "\n\n"
+    if tag in LINE_TAGS:
+        return "\n"
+    return ""  # строчные теги (strong, em, a, span...) просто исчезают
+
+
+def _substitute(split_re, text, replacements, convert):
+    """
+    Один re.split и подстановка из словаря через map - без вызова Python-функции
+    на каждое совпадение, как было с re.sub(callback): тегов в описании сотни.
+    """
+    parts = split_re.split(text)
+    if len(parts) == 1:
+        return text
+    found = parts[1::2]
+    missing = set(found).difference(replacements)
+    if missing:
+        if len(replacements) + len(missing) > _MAX_CACHED:
+            replacements = dict(replacements)  # кэш полон: новое - только для этого документа
+        for raw in missing:
+            replacements[raw] = convert(raw)
+    parts[1::2] = map(replacements.__getitem__, found)
+    return "".join(parts)
+
+
+def _normalize_whitespace(text):
+    """
+    Пробелы внутри строки схлопываются, между абзацами остаётся одна пустая строка.
+    Строки обходят map/str.split/str.join в C, пустые строки схлопывает str.replace.
+    """
+    text = "\n".join(map(" ".join, map(str.split, text.split("\n"))))
+    while "\n\n\n" in text:
+        text = text.replace("\n\n\n\n", "\n\n").replace("\n\n\n", "\n\n")
+    return text.strip("\n")
+
+
+def html_to_text(raw_html):
+    """
+    HTML описания HH -> чистый текст.
+    Абзацы разделяются пустой строкой, пункты списков начинаются с "• ",
+    сущности (&nbsp;, &quot;, &#8212; ...) декодируются, пробелы нормализуются.
+    """
+    if not raw_html:
+        return ""
+    text = raw_html
+    if any(marker in text for marker in _SKIP_MARKERS):
+        text = _SKIP_RE.sub("", text)
+    if "<" in text:
+        text = _substitute(_TAG_SPLIT_RE, text, _tag_replacements, _tag_replacement)
+    if "&" in text:
+        text = _substitute(_ENTITY_SPLIT_RE, text, _entity_replacements, html.unescape)
+    return _normalize_whitespace(text)
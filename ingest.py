@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, literal_column, or_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Vacancy
+
+# Postgres ограничивает запрос 32767 параметрами, на строку уходит 4 параметра
+UPSERT_CHUNK_SIZE = 1000
+# last_seen_at нужен с точностью до дней (VACANCY_RECHECK_DAYS): чаще раза в час
+# строку не переписываем, иначе каждый обход обновлял бы всю выдачу и индекс ix_vacancy_recheck
+LAST_SEEN_RESOLUTION = timedelta(hours=1)
+
+
+def parse_hh_date(value):
+    """HH отдаёт даты как 2026-10-17T12:00:00+0300"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def vacancy_row(job):
+    """Превращает элемент выдачи HH в строку для таблицы vacancy"""
+    return {
+        "hh_id": str(job.get('id')),
+        "name": job.get('name'),
+        "url": job.get('alternate_url'),
+        "published_at": parse_hh_date(job.get('published_at')),
+    }
+
+
+async def upsert_vacancies(session: AsyncSession, items, update_existing=True,
+                           chunk_size=UPSERT_CHUNK_SIZE, changed=None):
+    """
+    Сохраняет пачку вакансий с HH одним запросом на чанк:
+    INSERT ... ON CONFLICT (hh_id) DO UPDATE/NOTHING ... RETURNING.
+    Возвращает счётчики: сколько вставлено новых и сколько реально обновлено.
+    last_seen_at сдвигается у всех вакансий пачки, в том числе неизменившихся.
+    В список changed, если он передан, дописываются (id, hh_id) новых и изменившихся.
+    Коммит остаётся за вызывающим кодом.
+    """
+    rows = {}
+    for job in items:
+        if job.get('id') is None:
+            continue
+        row = vacancy_row(job)
+        rows[row["hh_id"]] = row  # одна строка не может обновиться дважды в одном запросе
+    rows = list(rows.values())
+
+    saved_new = 0
+    updated = 0
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        stmt = insert(Vacancy).values(chunk)
+
+        if update_existing:
+            # Обновляем только то, что реально поменялось, чтобы не плодить мёртвые строки
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Vacancy.hh_id],
+                # Вакансия снова в выдаче - значит, жива, даже если раньше ушла в архив
+                set_={"name": stmt.excluded.name, "url": stmt.excluded.url,
+                      "published_at": stmt.excluded.published_at, "archived_at": None,
+                      "last_seen_at": func.now(), "updated_at": func.now()},
+                where=or_(Vacancy.name.is_distinct_from(stmt.excluded.name),
+                          Vacancy.url.is_distinct_from(stmt.excluded.url),
+                          Vacancy.published_at.is_distinct_from(stmt.excluded.published_at),
+                          Vacancy.archived_at.is_not(None)),
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[Vacancy.hh_id])
+
+        # xmax = 0 только у только что вставленной строки
+        stmt = stmt.returning(Vacancy.id, Vacancy.hh_id, literal_column("xmax = 0").label("inserted"))
+        result = await session.execute(stmt)
+
+        for row in result:
+            if changed is not None:
+                changed.append((row.id, row.hh_id))
+            if row.inserted:
+                saved_new += 1
+            else:
+                updated += 1
+
+        # Неизменившиеся вакансии upsert не трогает, но в выдаче они были - значит, живы.
+        # Отдельный UPDATE только last_seen_at; строки из upsert выше уже с now()
+        await session.execute(update(Vacancy)
+                              .where(Vacancy.hh_id.in_([row["hh_id"] for row in chunk]),
+                                     Vacancy.last_seen_at < func.now() - LAST_SEEN_RESOLUTION)
+                              .values(last_seen_at=func.now())
+                              .execution_options(synchronize_session=False))
+
+    return {
+        "received": len(rows),
+        "saved_new": saved_new,
+        "updated": updated,
+        "unchanged": len(rows) - saved_new - updated,
+    }
@@ -1,30 +1,76 @@
-from fastapi import FastAPI, Depends
-from database import engine, Base, get_async_session
-from models import User, Vacancy, Resume
+import asyncio
+from fastapi import FastAPI, Depends, Query, Request
+from database import check_schema_revision, get_async_session, get_read_session, pool_stats
+from models import User, Vacancy, Resume, SavedSearch
 from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession
-from schemas import UserCreate, UserLogin, ResumeCreate, MatchRequest
+from schemas import (UserCreate, UserLogin, ResumeCreate, MatchRequest, FillBatchRequest, MatchBatchRequest,
+                     SavedSearchCreate)
 from fastapi import HTTPException
-from sqlalchemy import select
-from passlib.context import CryptContext
-from hh_client import get_vacancies, get_vacancy_full_text
-from tasks import analyze_resume_task
-from celery.result import AsyncResult
-from celery_app import celery_app
-
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update, delete, and_, or_, func
+from security import hash_password, verify_password
+from hh_client import (search_vacancies_once, get_vacancy_description, init_client, close_client,
+                       vacancy_cache, search_cache, search_flight, vacancy_flight, DEFAULT_AREAS)
+from ingest import upsert_vacancies
+from descriptions import fill_progress
+from config import settings
+from vacancy_index import vacancy_index
+from dedup import link_duplicates
+from vacancy_search import search_vacancies_local
+from features import content_hash, store_resume_vectors, store_vacancy_vectors
+from match_cache import match_cache
+from match_results import best_matches, match_history, store_match_results
+from bulk_io import (import_resumes, import_vacancies, stream_ndjson, export_resumes_query,
+                     export_vacancies_query, export_match_results_query)
+from celery_app import HIGH_PRIORITY
+from tasks import analyze_resume_task, analyze_batch, refresh_saved_search_task
+from uuid import uuid4
+from task_events import task_event_hub, task_snapshot, stream_task_events
+import metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await check_schema_revision()
     print("База данных готова!")
+    await init_client()
+    task_event_hub.start()
+    index_warm_up = asyncio.create_task(vacancy_index.warm_up())
     yield
+    index_warm_up.cancel()
+    await task_event_hub.stop()
+    await close_client()
+    await match_cache.close()
     
     
 app = FastAPI(lifespan=lifespan)
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.register_api_collectors()
+
+LIST_MAX_LIMIT = 200
+RESUME_PREVIEW_CHARS = 80
+SEARCH_MAX_OFFSET = 1000  # дальше по рангу не листаем: уточните запрос
+# Пустая строка - тоже "нет описания", как в выгрузке (bulk_io.export_vacancies_query)
+HAS_DESCRIPTION = and_(Vacancy.description.is_not(None), Vacancy.description != "")
+
+
+def like_pattern(text):
+    """Подстрока для ILIKE: %, _ и сам \\ из ввода - обычные символы (escape="\\")"""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def page_response(rows, limit):
+    """Страница keyset-пагинации: запрошено limit + 1 строк, лишняя говорит, что есть продолжение"""
+    items = [dict(row) for row in rows[:limit]]
+    return {
+        "items": items,
+        "next_after_id": items[-1]["id"] if len(rows) > limit else None
+    }
+
 @app.get("/")
 async def root():
     return {"message": "Smart Hunter is alive!"}
@@ -46,7 +92,9 @@ async def register_user(user_data: UserCreate,
     if existing_user:
         raise HTTPException(status_code=400, detail='Пользователь с таким email уже сущетсвует')
     
-    hashed_pass = pwd_context.hash(user_data.password)
+    # Соединение возвращается в пул на время bcrypt, иначе пачка регистраций его исчерпает
+    await session.rollback()
+    hashed_pass = await hash_password(user_data.password)
     
     new_user = User(email=user_data.email,
                     hashed_password=hashed_pass)
@@ -71,8 +119,14 @@ async def login_user(user_data: UserLogin,
     if user_from_db is None:
         raise HTTPException(status_code=400, detail='Неверный email или пароль')
     
-    password_check = pwd_context.verify(user_data.password, user_from_db.hashed_password)
+    user_id, hashed_password = user_from_db.id, user_from_db.hashed_password
+    await session.rollback()  # не держим соединение из пула, пока считается bcrypt
+    password_check, new_hash = await verify_password(user_data.password, hashed_password)
     
+    if password_check and new_hash:
+        # Хеш посчитан с другим BCRYPT_ROUNDS - заменяем, пока пароль известен
+        await session.execute(update(User).where(User.id == user_id).values(hashed_password=new_hash))
+        await session.commit()
     
     if password_check:
         return {"status": "success", "msg": "Login correct!"}
@@ -87,28 +141,18 @@ async def search_vacancies(text: str,
     Пример: /vacancies?text=java
     """
     print(f"Ищу вакансии по запросу: {text}")
-    found_jobs = await get_vacancies(text)
-    saved_vacancies_counter = 0
+    found_jobs, fetched = await search_vacancies_once(text)
     
-    for job in found_jobs:
-        
-        hh_id_from_api = job.get('id')
-        query = select(Vacancy).where(Vacancy.hh_id == hh_id_from_api)
-        result = await session.execute(query)
-        existing_vacancy = result.scalar_one_or_none()
-        
-        if existing_vacancy is None:
-            new_vacancy = Vacancy(hh_id = hh_id_from_api,
-                                  name = job.get('name'),
-                                  url = job.get('alternate_url'))
-            session.add(new_vacancy)
-            saved_vacancies_counter+=1
-        else:
-            pass
+    # Выдачу из кэша или чужого одновременного запроса уже сохранил тот, кто ходил в HH
+    counters = {"saved_new": 0, "updated": 0}
+    if fetched:
+        counters = await upsert_vacancies(session, found_jobs)
+        await session.commit()
     
-    await session.commit()
     return {"found_on_hh" : len(found_jobs),
-            "saved_new" : saved_vacancies_counter}
+            "saved_new" : counters["saved_new"],
+            "updated" : counters["updated"],
+            "shared" : not fetched}
 
 
 
@@ -127,6 +171,8 @@ async def save_resume(resume: ResumeCreate,
                         content = resume.content)
     
     session.add(new_resume)
+    await session.flush()
+    await store_resume_vectors(session, [(new_resume.id, new_resume.content)])
     await session.commit()
     
     return {"status": "success", "msg": f"Резюме для {email} сохранено"}
@@ -138,7 +184,8 @@ async def fill_vacancy_description(hh_id: str,
                                    ):
     """
     1. Ищет вакансию в БД по hh_id.
-    2. Если описания нет - скачивает с HH и сохраняет.
+    2. Берёт описание через кэш hh_client (свежая запись или условный GET с ETag).
+    3. Если текст изменился - сохраняет.
     """
     query = select(Vacancy).where(Vacancy.hh_id == hh_id)
     result = await session.execute(query)
@@ -147,19 +194,55 @@ async def fill_vacancy_description(hh_id: str,
     if vacancy is None:
         raise HTTPException(status_code=404, detail='Вакансии нет в Базе Данных')
     
-    if vacancy.description:
-        return {"status": "cached", "description": vacancy.description}
+    description = await get_vacancy_description(hh_id)
     
-    full_text = await get_vacancy_full_text(hh_id)
+    if not description or not description[1]:
+        if vacancy.description:
+            # HH не отдал вакансию (архив или сбой) - оставляем то, что уже сохранено
+            return {"status": "cached", "description": vacancy.description}
+        raise HTTPException(status_code=404, detail='Не удалось полчить данные с HH.ru')
     
-    if not full_text:
-        raise HTTPException(status_code=404, deatail='Не удалось полчить данные с HH.ru')
+    description_html, full_text = description
+    
+    if full_text == vacancy.description:
+        return {"status": "cached", "description": vacancy.description}
     
     vacancy.description = full_text
+    vacancy.description_html = description_html
+    vectors = await store_vacancy_vectors(session, [(vacancy.id, full_text)])
+    duplicates = await link_duplicates(session, [(vacancy.id, full_text)]) if settings.DEDUP_ENABLED else None
     await session.commit()
+    if vacancy.id in vectors:
+        vacancy_index.upsert_weights(vacancy.id, vectors[vacancy.id])
+    if duplicates:
+        await vacancy_index.apply_duplicates(session, duplicates["duplicates"], duplicates["canonical"])
     
     return {"status": "updated", "description": full_text}
 
+@app.post("/vacancies/fill-batch")
+async def fill_vacancies_batch(batch: FillBatchRequest,
+                               session: AsyncSession = Depends(get_async_session)
+                               ):
+    """
+    Пакетно скачивает описания: по списку hh_ids или для всех вакансий без описания.
+    Прогресс отдаётся потоком NDJSON, в БД всё пишется одним bulk UPDATE.
+    """
+    if not batch.all_missing and not batch.hh_ids:
+        raise HTTPException(status_code=400, detail="Передайте hh_ids или all_missing=true")
+    
+    query = (select(Vacancy.id, Vacancy.hh_id)
+             .where(or_(Vacancy.description.is_(None), Vacancy.description == ""))
+             .order_by(Vacancy.id)
+             .limit(settings.FILL_MAX_BATCH))
+    if not batch.all_missing:
+        query = query.where(Vacancy.hh_id.in_(batch.hh_ids))
+    
+    result = await session.execute(query)
+    targets = [tuple(row) for row in result]
+    
+    return StreamingResponse(fill_progress(targets, batch.concurrency),
+                             media_type="application/x-ndjson")
+
 @app.post("/match")
 async def match_resume_vacancy(match_data: MatchRequest,
                                session: AsyncSession = Depends(get_async_session)
@@ -183,22 +266,186 @@ async def match_resume_vacancy(match_data: MatchRequest,
         raise HTTPException(status_code=400,
                             detail="у этой вакансии пустое описание. Сначала выполните запрос /fill")
         
-    task = analyze_resume_task.delay(resume.content, vacancy.description)
+    # Пара уже считалась по тем же текстам - отдаём результат сразу, без воркера
+    resume_hash = content_hash(resume.content)
+    vacancy_hash = content_hash(vacancy.description)
+    cached = await match_cache.get(session, resume_hash, vacancy_hash)
+    if cached is not None:
+        # Те же тексты могли считаться для другой пары id - в match_results её ещё нет
+        await store_match_results(session, resume.id, [(vacancy.id, cached)])
+        await session.commit()
+        return {"status": "done", "task_id": None, "result": cached}
+    
+    # Одинаковые запросы, пока задача в работе, получают её же task_id
+    task_id = str(uuid4())
+    running_task_id = await match_cache.claim(resume_hash, vacancy_hash, task_id)
+    if running_task_id is None:
+        analyze_resume_task.apply_async((resume.id, vacancy.id, resume_hash, vacancy_hash), task_id=task_id,
+                                        priority=HIGH_PRIORITY)
     
     return {
         "status": "processing",
-        "task_id": task.id, #Клиент получает id своего чека
+        "task_id": running_task_id or task_id, #Клиент получает id своего чека
         "message": "Задача отправлена в обработку. Проверьте результат позже."
     }
     
+@app.post("/match/batch")
+async def match_resume_batch(batch: MatchBatchRequest,
+                             session: AsyncSession = Depends(get_async_session)
+                             ):
+    """
+    Одно резюме против многих вакансий: воркеры считают части по
+    MATCH_BATCH_CHUNK вакансий, итоговая задача отдаёт ранжированный список.
+    В брокер уходят только id, размер сообщений не зависит от длины текстов.
+    """
+    resume_id = await session.scalar(select(Resume.id).where(Resume.id == batch.resume_id))
+    if resume_id is None:
+        raise HTTPException(status_code=404, detail="Резюме с таким id не найдено")
+    
+    query = select(Vacancy.id).where(HAS_DESCRIPTION)
+    if batch.all_with_description:
+        query = query.where(Vacancy.duplicate_of.is_(None))  # копии одной вакансии считать незачем
+    else:
+        query = query.where(Vacancy.id.in_(batch.vacancy_ids))
+    vacancy_ids = (await session.execute(query.order_by(Vacancy.id).limit(settings.MATCH_BATCH_MAX + 1))).scalars().all()
+    
+    if not vacancy_ids:
+        raise HTTPException(status_code=400, detail="Нет вакансий с описанием для анализа")
+    if len(vacancy_ids) > settings.MATCH_BATCH_MAX:
+        raise HTTPException(status_code=400,
+                            detail=f"Не больше {settings.MATCH_BATCH_MAX} вакансий за один запрос")
+    
+    task = analyze_batch(resume_id, vacancy_ids, limit=batch.limit)
+    
+    return {
+        "status": "processing",
+        "task_id": task.id,
+        "vacancies": len(vacancy_ids),
+        "message": "Пакетный анализ запущен. Результат - по /tasks/{task_id}."
+    }
+    
+@app.get("/resumes/{resume_id}/top-matches")
+async def get_top_matches(resume_id: int,
+                          k: int = Query(20, ge=1, le=200),
+                          session: AsyncSession = Depends(get_async_session)
+                          ):
+    """
+    Ранжирует все вакансии с описанием под резюме одним проходом
+    по разреженной матрице TF-IDF (vacancy_index) и отдаёт top-k.
+    Индекс грузится в фоне при старте; загрузка и слияния идут в потоке.
+    """
+    query = select(Resume).where(Resume.id == resume_id)
+    result = await session.execute(query)
+    resume = result.scalar_one_or_none()
+    
+    if resume is None:
+        raise HTTPException(status_code=404, detail="Резюме с таким id не найдено")
+    
+    await vacancy_index.ensure_loaded(session)
+    top = vacancy_index.top_k(resume.content, k)
+    
+    # Индекс другого процесса мог ещё не узнать о новых дубликатах - отсекаем и здесь
+    query = (select(Vacancy.id, Vacancy.hh_id, Vacancy.name)
+             .where(Vacancy.id.in_([vacancy_id for vacancy_id, _ in top]), Vacancy.duplicate_of.is_(None)))
+    result = await session.execute(query)
+    vacancies = {row.id: row for row in result}
+    
+    return {
+        "resume_id": resume_id,
+        "matches": [{"vacancy_id": vacancy_id,
+                     "hh_id": vacancies[vacancy_id].hh_id,
+                     "name": vacancies[vacancy_id].name,
+                     "score": round(similarity * 100),
+                     "similarity": round(similarity, 4)}
+                    for vacancy_id, similarity in top if vacancy_id in vacancies]
+    }
+
+@app.get("/resumes/{resume_id}/best-matches")
+async def get_best_matches(resume_id: int,
+                           min_score: int = Query(0, ge=0, le=100),
+                           limit: int = Query(20, ge=1, le=LIST_MAX_LIMIT),
+                           after_vacancy_id: int | None = Query(None, ge=1),
+                           session: AsyncSession = Depends(get_read_session)
+                           ):
+    """
+    Лучшие среди уже проанализированных вакансий (/match, /match/batch) - из match_results,
+    с разбором: совпавшие и недостающие навыки, главные термы. Ничего не пересчитывает.
+    Keyset: ?after_vacancy_id=<next_after_vacancy_id>.
+    """
+    if await session.scalar(select(Resume.id).where(Resume.id == resume_id)) is None:
+        raise HTTPException(status_code=404, detail="Резюме с таким id не найдено")
+
+    return {"resume_id": resume_id,
+            **await best_matches(session, resume_id, limit=limit, after_vacancy_id=after_vacancy_id,
+                                 min_score=min_score)}
+
+@app.get("/resumes/{resume_id}/match-history")
+async def get_match_history(resume_id: int,
+                            before_id: int | None = Query(None, ge=1),
+                            limit: int = Query(50, ge=1, le=LIST_MAX_LIMIT),
+                            session: AsyncSession = Depends(get_read_session)
+                            ):
+    """
+    История анализов резюме, новые сверху: каждый новый или изменившийся результат пары,
+    а не только последний (keyset: ?before_id=<next_before_id>)
+    """
+    if await session.scalar(select(Resume.id).where(Resume.id == resume_id)) is None:
+        raise HTTPException(status_code=404, detail="Резюме с таким id не найдено")
+
+    return {"resume_id": resume_id, **await match_history(session, resume_id, before_id=before_id, limit=limit)}
+
+@app.get("/vacancies/search")
+async def search_saved_vacancies(q: str = Query(..., min_length=2, max_length=200),
+                                 limit: int = Query(20, ge=1, le=100),
+                                 offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+                                 session: AsyncSession = Depends(get_read_session)
+                                 ):
+    """
+    Полнотекстовый поиск по вакансиям, уже сохранённым в БД (HH не вызывается).
+    Результаты по убыванию релевантности, с подсветкой совпадений <b>...</b>.
+    Пример: /vacancies/search?q=python -java
+    """
+    return {"query": q, **await search_vacancies_local(session, q, limit, offset)}
+    
+@app.get("/vacancies/list")
+async def list_vacancies(has_description: bool | None = None,
+                         archived: bool | None = None,
+                         name: str | None = None,
+                         after_id: int = Query(0, ge=0),
+                         limit: int = Query(50, ge=1, le=LIST_MAX_LIMIT),
+                         session: AsyncSession = Depends(get_read_session)
+                         ):
+    """
+    Сохранённые вакансии страницами по id (keyset: ?after_id=<next_after_id>),
+    без загрузки описаний. Фильтры: есть ли описание, в архиве ли на HH и подстрока в названии.
+    """
+    query = (select(Vacancy.id, Vacancy.hh_id, Vacancy.name, Vacancy.url,
+                    HAS_DESCRIPTION.label("has_description"),
+                    Vacancy.archived_at.is_not(None).label("archived"))
+             .where(Vacancy.id > after_id))
+    if has_description is not None:
+        query = query.where(HAS_DESCRIPTION if has_description
+                            else or_(Vacancy.description.is_(None), Vacancy.description == ""))
+    if archived is not None:
+        query = query.where(Vacancy.archived_at.is_not(None) if archived
+                            else Vacancy.archived_at.is_(None))
+    if name:
+        query = query.where(Vacancy.name.ilike(like_pattern(name), escape="\\"))
+    
+    result = await session.execute(query.order_by(Vacancy.id).limit(limit + 1))
+    rows = result.mappings().all()
+    return page_response(rows, limit)
+    
 @app.get("/vacancies/{internal_id}")
 async def get_vacancy_info(
     internal_id: int, 
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
-    query = select(Vacancy).where(Vacancy.id == internal_id)
+    query = select(Vacancy.id, Vacancy.hh_id, Vacancy.name,
+                   HAS_DESCRIPTION.label("has_description"),
+                   Vacancy.archived_at).where(Vacancy.id == internal_id)
     result = await session.execute(query)
-    vacancy = result.scalar_one_or_none()
+    vacancy = result.one_or_none()
     
     if vacancy is None:
         raise HTTPException(status_code=404, detail="Вакансия не найдена")
@@ -207,33 +454,181 @@ async def get_vacancy_info(
         "id": vacancy.id, 
         "hh_id": vacancy.hh_id, 
         "name": vacancy.name, 
-        "has_description": bool(vacancy.description)
+        "has_description": vacancy.has_description,
+        "archived_at": vacancy.archived_at
     }
+
+@app.post("/saved-searches")
+async def create_saved_search(search: SavedSearchCreate,
+                              session: AsyncSession = Depends(get_async_session)
+                              ):
+    """
+    Сохраняет поиск: Celery beat будет обновлять его раз в SAVED_SEARCH_REFRESH_INTERVAL
+    (только новые и изменившиеся вакансии, см. saved_searches.py). Первое обновление - сразу.
+    """
+    user_id = await session.scalar(select(User.id).where(User.email == search.email))
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="Пользователь с таким email не найден")
     
-@app.get("/tasks/{task_id}")
-def get_task_status(task_id: str):
+    count = await session.scalar(select(func.count()).where(SavedSearch.user_id == user_id))
+    if count >= settings.SAVED_SEARCH_MAX_PER_USER:
+        raise HTTPException(status_code=400, detail="Слишком много сохранённых поисков")
     
-    task_result = AsyncResult(task_id, app=celery_app)
+    saved = SavedSearch(user_id=user_id, text=search.text, areas=search.areas or DEFAULT_AREAS)
+    session.add(saved)
+    await session.commit()
     
-    response = {
-        "task_id": task_id,
-        "status": task_result.status,
-        "result": None
-    }
+    task = refresh_saved_search_task.apply_async(([saved.id],), priority=HIGH_PRIORITY)
+    return {"id": saved.id, "task_id": task.id}
+
+@app.get("/saved-searches")
+async def list_saved_searches(email: str,
+                              session: AsyncSession = Depends(get_read_session)
+                              ):
+    """Сохранённые поиски пользователя с итогами последнего обновления"""
+    query = (select(SavedSearch.id, SavedSearch.text, SavedSearch.areas,
+                    SavedSearch.last_refreshed_at, SavedSearch.last_result)
+             .join(User, User.id == SavedSearch.user_id)
+             .where(User.email == email)
+             .order_by(SavedSearch.id))
+    result = await session.execute(query)
+    return {"items": [dict(row) for row in result.mappings()]}
+
+@app.post("/saved-searches/{search_id}/refresh")
+async def refresh_saved_search(search_id: int,
+                               session: AsyncSession = Depends(get_async_session)
+                               ):
+    """Обновить поиск сейчас, не дожидаясь расписания. Статус - /tasks/{task_id}"""
+    if await session.get(SavedSearch, search_id) is None:
+        raise HTTPException(status_code=404, detail="Сохранённый поиск не найден")
     
-    if task_result.status == 'SUCCESS':
-        response["result"] = task_result.result
-    elif task_result.status == 'FAILURE':
-        response["result"] = str(task_result.result)
-        
-    return response
+    # Пользователь ждёт: вперёд плановых обновлений из beat
+    task = refresh_saved_search_task.apply_async(([search_id],), priority=HIGH_PRIORITY)
+    return {"task_id": task.id}
 
-@app.get("/all_resumes")
-async def get_all_resumes(session: AsyncSession = Depends(get_async_session)):
+@app.delete("/saved-searches/{search_id}")
+async def delete_saved_search(search_id: int,
+                              session: AsyncSession = Depends(get_async_session)
+                              ):
+    """Вакансии, найденные поиском, остаются в базе"""
+    result = await session.execute(delete(SavedSearch).where(SavedSearch.id == search_id))
+    await session.commit()
+    
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Сохранённый поиск не найден")
+    return {"status": "deleted"}
+    
+@app.get("/hh/cache-stats")
+async def get_hh_cache_stats():
+    """
+    Счётчики кэша вакансий HH в этом процессе: hits/misses/revalidated и т.д.,
+    плюс кэш выдачи /vacancies и объединённые одинаковые запросы (single-flight).
+    """
+    return {**vacancy_cache.stats(),
+            "search": search_cache.stats(),
+            "singleflight": {"search": search_flight.stats(), "vacancy": vacancy_flight.stats()}}
+    
+@app.get("/db/pool-stats")
+async def get_db_pool_stats():
+    """Занятость пулов соединений и время ожидания соединения в этом процессе"""
+    return pool_stats()
+    
+@app.get("/match/cache-stats")
+async def get_match_cache_stats():
+    """Попадания/промахи кэша результатов /match и объединённые запросы в этом процессе"""
+    return match_cache.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Метрики Prometheus; коллектор очередей ходит в брокер, поэтому не в event loop"""
+    body, content_type = await run_in_threadpool(metrics.render)
+    return Response(content=body, media_type=content_type)
+
+@app.get("/tasks/{task_id}")
+def get_task_status(task_id: str):
+    
+    return task_snapshot(task_id)
+
+@app.get("/tasks/{task_id}/events")
+async def get_task_events(task_id: str):
+    """
+    Server-Sent Events вместо опроса: статус приходит сразу при подключении,
+    дальше - STARTED/SUCCESS/FAILURE от воркера через общую подписку Redis pub/sub.
+    """
+    return StreamingResponse(stream_task_events(task_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/resumes")
+async def list_resumes(user_id: int | None = None,
+                       email: str | None = None,
+                       after_id: int = Query(0, ge=0),
+                       limit: int = Query(50, ge=1, le=LIST_MAX_LIMIT),
+                       session: AsyncSession = Depends(get_read_session)
+                       ):
+    """
+    Резюме страницами по id (keyset: ?after_id=<next_after_id>).
+    Отдаёт только id, user_id, начало текста и длину - колонка content целиком не читается.
+    """
+    query = (select(Resume.id, Resume.user_id,
+                    func.substr(Resume.content, 1, RESUME_PREVIEW_CHARS).label("preview"),
+                    func.length(Resume.content).label("length"))
+             .where(Resume.id > after_id))
+    if user_id is not None:
+        query = query.where(Resume.user_id == user_id)
+    if email is not None:
+        query = query.join(User, User.id == Resume.user_id).where(User.email == email)
+    
+    result = await session.execute(query.order_by(Resume.id).limit(limit + 1))
+    rows = result.mappings().all()
+    return page_response(rows, limit)
+
+@app.get("/all_resumes", deprecated=True)
+async def get_all_resumes(session: AsyncSession = Depends(get_read_session)):
     """
     Возвращает список всех резюме из базы, чтобы фронтенд мог их показать в списке.
+    Оставлен для совместимости, списки - через GET /resumes, выгрузка - через GET /export/resumes.
     """
     query = select(Resume)
     result = await session.execute(query)
     resumes = result.scalars().all()
-    return resumes
\ No newline at end of file
+    return resumes
+
+@app.post("/import/vacancies")
+async def import_vacancies_ndjson(request: Request):
+    """
+    Тело - NDJSON, строка на вакансию: {"hh_id", "name", "url", "published_at",
+    "description", "description_html"} (формат GET /export/vacancies?with_html=true).
+    Upsert по hh_id, пустые поля не затирают сохранённые. Ошибочные строки пропускаются
+    и перечисляются в ответе, остальное записывается пачками.
+    """
+    return await import_vacancies(request.stream())
+
+@app.post("/import/resumes")
+async def import_resumes_ndjson(request: Request):
+    """
+    Тело - NDJSON, строка на резюме: {"email" или "user_id", "content"}.
+    Пользователи должны уже существовать; каждая строка - новое резюме.
+    """
+    return await import_resumes(request.stream())
+
+@app.get("/export/resumes")
+async def export_resumes(email: str | None = None,
+                         after_id: int = Query(0, ge=0)):
+    """Все резюме как NDJSON по id; оборвалась выгрузка - ?after_id=<последний id>"""
+    return StreamingResponse(stream_ndjson(export_resumes_query(after_id, email)),
+                             media_type="application/x-ndjson")
+
+@app.get("/export/vacancies")
+async def export_vacancies(has_description: bool | None = None,
+                           with_html: bool = False,
+                           after_id: int = Query(0, ge=0)):
+    """Все вакансии как NDJSON по id; исходная разметка описаний - с ?with_html=true"""
+    return StreamingResponse(stream_ndjson(export_vacancies_query(after_id, has_description, with_html)),
+                             media_type="application/x-ndjson")
+
+@app.get("/export/match-results")
+async def export_match_results(resume_id: int | None = None,
+                               after_id: int = Query(0, ge=0)):
+    """Результаты анализа (match_results) как NDJSON по id - для офлайн-анализа"""
+    return StreamingResponse(stream_ndjson(export_match_results_query(after_id, resume_id)),
+                             media_type="application/x-ndjson")
@@ -0,0 +1,180 @@
+"""
+Кэш результатов анализа "резюме + вакансия".
+Ключ - хеши текстов (features.content_hash) и версия матчера: изменился текст -
+изменился ключ, старая запись просто перестаёт находиться.
+Основное хранилище - таблица match_cache в Postgres, по желанию перед ней Redis.
+Одинаковые запросы, пришедшие одновременно, получают один и тот же task_id:
+задача в полёте помечается ключом в Redis (SET NX), без Redis - словарём в процессе.
+"""
+import json
+import time
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from matching import MATCHER_VERSION
+from metrics import count_cache_event
+from models import MatchCache
+
+RESULT_PREFIX = "match:result:"
+INFLIGHT_PREFIX = "match:inflight:"
+
+
+class MatchResultCache:
+
+    def __init__(self, redis_url, use_redis_results=False, redis_ttl=86400, inflight_ttl=300):
+        self.redis_url = redis_url
+        self.use_redis_results = use_redis_results
+        self.redis_ttl = redis_ttl
+        self.inflight_ttl = inflight_ttl
+        self._redis = None
+        self._inflight = {}  # запасной вариант без Redis: ключ -> (task_id, истекает)
+        self.counters = {"hits": 0, "redis_hits": 0, "misses": 0, "coalesced": 0,
+                         "stored": 0, "redis_errors": 0}
+
+    def _get_redis(self):
+        if self.redis_url and self._redis is None:
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+        count_cache_event("match", name, amount)
+
+    @staticmethod
+    def key(resume_hash, vacancy_hash):
+        return f"{MATCHER_VERSION}:{resume_hash}:{vacancy_hash}"
+
+    def _redis_failed(self, e):
+        self.count("redis_errors")
+        print("Кэш матчинга: Redis недоступен:", e)
+
+    async def get(self, session: AsyncSession, resume_hash, vacancy_hash):
+        """Сохранённый результат или None. Считает попадания и промахи."""
+        key = self.key(resume_hash, vacancy_hash)
+        redis = self._get_redis() if self.use_redis_results else None
+        if redis is not None:
+            try:
+                raw = await redis.get(RESULT_PREFIX + key)
+            except RedisError as e:
+                self._redis_failed(e)
+                raw = None
+            if raw is not None:
+                self.count("redis_hits")
+                return json.loads(raw)
+
+        result = await session.scalar(
+            select(MatchCache.result).where(MatchCache.resume_hash == resume_hash,
+                                            MatchCache.vacancy_hash == vacancy_hash,
+                                            MatchCache.matcher_version == MATCHER_VERSION))
+        if result is None:
+            self.count("misses")
+            return None
+
+        self.count("hits")
+        if redis is not None:
+            await self._redis_put(redis, key, result)
+        return result
+
+    async def put(self, session: AsyncSession, resume_hash, vacancy_hash, result):
+        """Запись результата (из воркера). Коммит остаётся за вызывающим кодом."""
+        stmt = insert(MatchCache).values(resume_hash=resume_hash, vacancy_hash=vacancy_hash,
+                                         matcher_version=MATCHER_VERSION, result=result)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[MatchCache.resume_hash, MatchCache.vacancy_hash, MatchCache.matcher_version],
+            set_={"result": stmt.excluded.result, "created_at": stmt.excluded.created_at}))
+        self.count("stored")
+
+        redis = self._get_redis() if self.use_redis_results else None
+        if redis is not None:
+            await self._redis_put(redis, self.key(resume_hash, vacancy_hash), result)
+
+    async def put_many(self, session: AsyncSession, resume_hash, results):
+        """results = [(vacancy_hash, result)] одного резюме - одним INSERT (пакетный анализ)"""
+        if not results:
+            return
+        rows = {vacancy_hash: result for vacancy_hash, result in results}
+        stmt = insert(MatchCache).values([{"resume_hash": resume_hash, "vacancy_hash": vacancy_hash,
+                                           "matcher_version": MATCHER_VERSION, "result": result}
+                                          for vacancy_hash, result in rows.items()])
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[MatchCache.resume_hash, MatchCache.vacancy_hash, MatchCache.matcher_version],
+            set_={"result": stmt.excluded.result, "created_at": stmt.excluded.created_at}))
+        self.count("stored", len(rows))
+
+    async def _redis_put(self, redis, key, result):
+        try:
+            await redis.set(RESULT_PREFIX + key, json.dumps(result, ensure_ascii=False), ex=self.redis_ttl)
+        except RedisError as e:
+            self._redis_failed(e)
+
+    async def claim(self, resume_hash, vacancy_hash, task_id):
+        """
+        Пытается занять пару под новую задачу task_id.
+        Возвращает task_id уже идущей задачи, если кто-то успел раньше, иначе None.
+        """
+        key = INFLIGHT_PREFIX + self.key(resume_hash, vacancy_hash)
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                if await redis.set(key, task_id, nx=True, ex=self.inflight_ttl):
+                    return None
+                running = await redis.get(key)
+                if running is not None:
+                    self.count("coalesced")
+                    return running.decode()
+                # Ключ истёк между SET и GET - пробуем ещё раз
+                return await self.claim(resume_hash, vacancy_hash, task_id)
+            except RedisError as e:
+                self._redis_failed(e)
+
+        now = time.monotonic()
+        running = self._inflight.get(key)
+        if running is not None and running[1] > now:
+            self.count("coalesced")
+            return running[0]
+        self._inflight[key] = (task_id, now + self.inflight_ttl)
+        if len(self._inflight) > 10_000:
+            self._inflight = {k: v for k, v in self._inflight.items() if v[1] > now}
+        return None
+
+    async def release(self, resume_hash, vacancy_hash):
+        """Снимает отметку "в полёте", когда результат уже записан"""
+        key = INFLIGHT_PREFIX + self.key(resume_hash, vacancy_hash)
+        self._inflight.pop(key, None)
+        redis = self._get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(key)
+        except RedisError as e:
+            self._redis_failed(e)
+
+    def stats(self):
+        hits = self.counters["hits"] + self.counters["redis_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "matcher_version": MATCHER_VERSION,
+            "redis": self.use_redis_results,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+def create_match_cache():
+    from celery_app import REDIS_URL
+    return MatchResultCache(REDIS_URL, use_redis_results=settings.MATCH_CACHE_REDIS,
+                            redis_ttl=settings.MATCH_CACHE_REDIS_TTL,
+                            inflight_ttl=settings.MATCH_INFLIGHT_TTL)
+
+
+match_cache = create_match_cache()
@@ -0,0 +1,132 @@
+"""
+Результаты анализа резюме + вакансия в Postgres (таблицы match_results и match_result_history).
+
+Раньше результат жил только в result backend Celery: строка JSON в Redis без срока,
+по которой ничего не найти и не посчитать. Теперь воркер пишет его сюда - одиночный
+анализ одной строкой, часть пакетного анализа одним запросом на всю часть. В match_results
+на пару хранится последний результат; analyzed_at меняется, только если результат изменился.
+Каждый новый или изменившийся результат тем же запросом дописывается в match_result_history -
+по ней /resumes/{id}/match-history.
+Result backend держит результаты задач лишь CELERY_RESULT_EXPIRES секунд - для /tasks/{task_id}.
+"""
+from sqlalchemy import and_, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from matching import MATCHER_VERSION
+from models import MatchResult, MatchResultHistory, Vacancy
+
+BREAKDOWN_FIELDS = ("matched_skills", "missing_skills", "top_terms")
+HISTORY_COLUMNS = ("resume_id", "vacancy_id", "score", "similarity", "skill_coverage",
+                   "breakdown", "matcher_version", "analyzed_at")
+
+
+def result_row(resume_id, vacancy_id, result):
+    """Результат score_vectors -> строка match_results: числа в колонки, остальное в breakdown"""
+    return {
+        "resume_id": resume_id,
+        "vacancy_id": vacancy_id,
+        "score": result["score"],
+        "similarity": result["similarity"],
+        "skill_coverage": result["skill_coverage"],
+        "breakdown": {field: result[field] for field in BREAKDOWN_FIELDS},
+        "matcher_version": MATCHER_VERSION,
+    }
+
+
+async def store_match_results(session: AsyncSession, resume_id, results):
+    """
+    results = [(vacancy_id, result)] одного резюме - одним INSERT.
+    Коммит остаётся за вызывающим кодом.
+    """
+    rows = {vacancy_id: result_row(resume_id, vacancy_id, result) for vacancy_id, result in results}
+    if not rows:
+        return
+    stmt = insert(MatchResult).values(list(rows.values()))
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_match_results_pair",
+        set_={"score": excluded.score, "similarity": excluded.similarity,
+              "skill_coverage": excluded.skill_coverage, "breakdown": excluded.breakdown,
+              "matcher_version": excluded.matcher_version, "analyzed_at": func.now()},
+        # Тот же результат (повторный анализ, попадание в match_cache) строку не трогает
+        where=(tuple_(MatchResult.score, MatchResult.similarity, MatchResult.breakdown,
+                      MatchResult.matcher_version)
+               .is_distinct_from(tuple_(excluded.score, excluded.similarity, excluded.breakdown,
+                                        excluded.matcher_version))))
+    # RETURNING отдаёт только вставленные и изменённые строки - они же и уходят в историю
+    changed = stmt.returning(*(getattr(MatchResult, name) for name in HISTORY_COLUMNS)).cte("changed")
+    await session.execute(insert(MatchResultHistory).from_select(
+        HISTORY_COLUMNS, select(*(changed.c[name] for name in HISTORY_COLUMNS))))
+
+
+def _item(row):
+    return {
+        "id": row.id,
+        "vacancy_id": row.vacancy_id,
+        "hh_id": row.hh_id,
+        "name": row.name,
+        "url": row.url,
+        "score": row.score,
+        "similarity": row.similarity,
+        "skill_coverage": row.skill_coverage,
+        **row.breakdown,
+        "archived": row.archived_at is not None,
+        "analyzed_at": row.analyzed_at,
+    }
+
+
+def _select_with_vacancy(model=MatchResult):
+    return (select(model.id, model.vacancy_id, model.score, model.similarity,
+                   model.skill_coverage, model.breakdown, model.analyzed_at,
+                   Vacancy.hh_id, Vacancy.name, Vacancy.url, Vacancy.archived_at)
+            .join(Vacancy, Vacancy.id == model.vacancy_id))
+
+
+async def best_matches(session: AsyncSession, resume_id, limit=20, after_vacancy_id=None, min_score=0):
+    """
+    Лучшие из уже проанализированных вакансий для резюме (индекс ix_match_results_best).
+    Почти-дубликаты (dedup.py) пропускаются.
+    Keyset: ?after_vacancy_id=<next_after_vacancy_id> - страница после этой вакансии
+    в порядке (score DESC, similarity DESC, vacancy_id), без OFFSET.
+    """
+    stmt = (_select_with_vacancy()
+            .where(MatchResult.resume_id == resume_id, MatchResult.score >= min_score,
+                   Vacancy.duplicate_of.is_(None)))
+    if after_vacancy_id is not None:
+        cursor = aliased(MatchResult)
+        pair = and_(cursor.resume_id == resume_id, cursor.vacancy_id == after_vacancy_id)
+        score = select(cursor.score).where(pair).scalar_subquery()
+        similarity = select(cursor.similarity).where(pair).scalar_subquery()
+        # Направления сортировки разные, поэтому сравнение кортежей расписано по полям
+        stmt = stmt.where(or_(MatchResult.score < score,
+                              and_(MatchResult.score == score, MatchResult.similarity < similarity),
+                              and_(MatchResult.score == score, MatchResult.similarity == similarity,
+                                   MatchResult.vacancy_id > after_vacancy_id)))
+    stmt = (stmt.order_by(MatchResult.score.desc(), MatchResult.similarity.desc(), MatchResult.vacancy_id)
+            .limit(limit + 1))
+    rows = (await session.execute(stmt)).all()
+    items = [_item(row) for row in rows[:limit]]
+    return {
+        "items": items,
+        "next_after_vacancy_id": items[-1]["vacancy_id"] if len(rows) > limit else None,
+    }
+
+
+async def match_history(session: AsyncSession, resume_id, before_id=None, limit=50):
+    """
+    Все результаты анализов резюме из match_result_history, новые сверху,
+    в том числе прежние результаты тех же пар (индекс ix_match_result_history_resume).
+    Keyset: ?before_id=<next_before_id> - страница строк старше этой.
+    """
+    stmt = _select_with_vacancy(MatchResultHistory).where(MatchResultHistory.resume_id == resume_id)
+    if before_id is not None:
+        stmt = stmt.where(MatchResultHistory.id < before_id)
+    stmt = stmt.order_by(MatchResultHistory.id.desc()).limit(limit + 1)
+    rows = (await session.execute(stmt)).all()
+    items = [_item(row) for row in rows[:limit]]
+    return {
+        "items": items,
+        "next_before_id": items[-1]["id"] if len(rows) > limit else None,
+    }
@@ -0,0 +1,171 @@
+"""
+Сопоставление резюме и вакансии без сети и моделей: нормализация русского/английского
+текста, облегчённый стемминг, TF-IDF с сублинейным tf и косинусная близость,
+плюс покрытие навыков из словаря SKILLS.
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+_WORD_RE = re.compile(r"[a-zа-я0-9][a-zа-я0-9+#]*(?:[.\-][a-zа-я0-9+#]+)*")
+
+STOP_WORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне
+было вот от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него
+до вас нибудь опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы
+тебя их чем была сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому
+этого какой совсем ним здесь этом один почти мой тем чтобы нее сейчас были куда зачем всех никогда
+можно при наконец два об другой хоть после над больше тот через эти нас про всего них какая много
+разве три эту моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда
+конечно всю между это наш ваш наши ваши также либо т д др т.д т.п.
+a an the and or of to in on for with at by from as is are be been was were it its this that these
+those we you our your they their will can should would not no but if then so than too very etc
+""".split())
+
+# Канонические навыки и их написания в тексте
+SKILLS = {
+    "python": {"python", "питон", "пайтон"},
+    "django": {"django", "джанго"},
+    "fastapi": {"fastapi"},
+    "flask": {"flask"},
+    "asyncio": {"asyncio", "async"},
+    "celery": {"celery"},
+    "sqlalchemy": {"sqlalchemy"},
+    "pytest": {"pytest"},
+    "sql": {"sql"},
+    "postgresql": {"postgresql", "postgres", "postgre", "постгрес"},
+    "mysql": {"mysql"},
+    "mongodb": {"mongodb", "mongo"},
+    "redis": {"redis"},
+    "rabbitmq": {"rabbitmq", "rabbit"},
+    "kafka": {"kafka"},
+    "docker": {"docker", "докер"},
+    "kubernetes": {"kubernetes", "k8s"},
+    "linux": {"linux", "линукс"},
+    "git": {"git", "github", "gitlab"},
+    "ci/cd": {"ci", "cd", "ci/cd", "jenkins"},
+    "aws": {"aws"},
+    "rest": {"rest", "restful"},
+    "graphql": {"graphql"},
+    "java": {"java"},
+    "spring": {"spring"},
+    "javascript": {"javascript", "js"},
+    "typescript": {"typescript"},
+    "react": {"react", "reactjs", "react.js"},
+    "vue": {"vue", "vue.js", "vuejs"},
+    "node.js": {"node", "nodejs", "node.js"},
+    "go": {"golang"},
+    "c++": {"c++", "cpp"},
+    "c#": {"c#", ".net", "dotnet"},
+    "php": {"php"},
+    "html": {"html", "html5"},
+    "css": {"css", "css3"},
+    "pandas": {"pandas"},
+    "numpy": {"numpy"},
+    "machine learning": {"ml"},
+    "english": {"english", "английский"},
+}
+_SKILL_BY_TOKEN = {variant: skill for skill, variants in SKILLS.items() for variant in variants}
+SKILL_WEIGHT = 2.0  # навыки весят больше обычных слов
+
+_RU_SUFFIXES = sorted("""
+иями ями ами ого его ому ему ыми ими ией ость ости остью ения ение ений ением ениям ированный
+ировать ировал ировании ирование ать ять ить еть ует уют ают яют ешь ишь ете ите ый ий ой ая яя
+ое ее ые ие ых их ую юю ам ям ах ях ом ем ов ев ей ия ию а я о е ы и у ю ь
+""".split(), key=len, reverse=True)
+_EN_SUFFIXES = ("ingly", "ings", "ing", "edly", "ed", "es", "s")
+_MIN_STEM = 3
+
+TOP_TERMS = 10
+# Меняется при любом изменении формулы - старые результаты в match_cache перестают находиться
+MATCHER_VERSION = 2
+
+
+@lru_cache(maxsize=100_000)
+def stem(word):
+    """Облегчённый стемминг: отрезаем самое длинное известное окончание"""
+    if word in _SKILL_BY_TOKEN or not word.isalpha():
+        return word
+    suffixes = _EN_SUFFIXES if word.isascii() else _RU_SUFFIXES
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Текст -> список нормализованных термов (навыки приводятся к каноническому имени)"""
+    if not text:
+        return []
+    text = text.lower().replace("ё", "е")
+    terms = []
+    for word in _WORD_RE.findall(text):
+        skill = _SKILL_BY_TOKEN.get(word)
+        if skill is not None:
+            terms.append(skill)
+        elif word not in STOP_WORDS and len(word) > 1:
+            terms.append(stem(word))
+    return terms
+
+
+def term_weights(terms):
+    """Сублинейный tf: 1 + log(tf), навыки умножаются на SKILL_WEIGHT"""
+    weights = {}
+    for term, count in Counter(terms).items():
+        weight = 1.0 + math.log(count)
+        if term in SKILLS:
+            weight *= SKILL_WEIGHT
+        weights[term] = weight
+    return weights
+
+
+def score_vectors(resume_weights, vacancy_weights, idf=None):
+    """
+    Косинус TF-IDF векторов и покрытие навыков вакансии.
+    idf - словарь терм -> вес по корпусу; без него все термы равноценны.
+    """
+    def weighted(weights):
+        if idf is None:
+            return weights
+        return {term: weight * idf.get(term, 1.0) for term, weight in weights.items()}
+
+    resume_vec = weighted(resume_weights)
+    vacancy_vec = weighted(vacancy_weights)
+    resume_norm = math.sqrt(sum(w * w for w in resume_vec.values()))
+    vacancy_norm = math.sqrt(sum(w * w for w in vacancy_vec.values()))
+
+    contributions = {}
+    if resume_norm and vacancy_norm:
+        small, large = sorted((resume_vec, vacancy_vec), key=len)
+        for term, weight in small.items():
+            other = large.get(term)
+            if other is not None:
+                contributions[term] = weight * other / (resume_norm * vacancy_norm)
+    similarity = sum(contributions.values())
+
+    vacancy_skills = sorted(term for term in vacancy_weights if term in SKILLS)
+    matched_skills = [skill for skill in vacancy_skills if skill in resume_weights]
+    missing_skills = [skill for skill in vacancy_skills if skill not in resume_weights]
+
+    if vacancy_skills:
+        coverage = len(matched_skills) / len(vacancy_skills)
+        score = 0.6 * coverage + 0.4 * similarity
+    else:
+        coverage = None
+        score = similarity
+
+    top_terms = sorted(contributions.items(), key=lambda item: item[1], reverse=True)[:TOP_TERMS]
+    return {
+        "score": round(100 * min(1.0, score)),
+        "similarity": round(similarity, 4),
+        "skill_coverage": None if coverage is None else round(coverage, 4),
+        "matched_skills": matched_skills,
+        "missing_skills": missing_skills,
+        "top_terms": [{"term": term, "weight": round(weight, 4)} for term, weight in top_terms],
+    }
+
+
+def score_texts(resume_text, vacancy_text, idf=None):
+    return score_vectors(term_weights(tokenize(resume_text)),
+                         term_weights(tokenize(vacancy_text)), idf)
@@ -0,0 +1,259 @@
+"""
+Метрики Prometheus. API отдаёт их на GET /metrics, воркер Celery - на своём порту
+(METRICS_WORKER_PORT, см. celery_app.py).
+
+На горячем пути только инкременты счётчиков и observe() гистограмм - единицы микросекунд
+на запрос (benchmarks/bench_metrics_overhead.py). То, что модули и так считают сами
+(пулы БД, доли попаданий кэшей, очереди Celery), собирается коллекторами в момент опроса.
+
+Воркер с prefork-пулом - это несколько процессов: тогда нужен PROMETHEUS_MULTIPROC_DIR
+(пустой каталог), и метрики всех процессов склеиваются при отдаче.
+"""
+import os
+import re
+import time
+from contextvars import ContextVar
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess, start_http_server)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Время ответа API до заголовков (у SSE/NDJSON - без самого потока)",
+    ["method", "route", "status"])
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL-запросов на один HTTP-запрос", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Суммарное время SQL-запросов одного HTTP-запроса", ["route"])
+
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Время одного SQL-запроса", ["engine"])
+
+HH_REQUEST_SECONDS = Histogram("hh_request_duration_seconds",
+                               "Время одной попытки запроса к HH API", ["endpoint"])
+HH_RESPONSES = Counter("hh_responses_total", "Ответы HH API по коду (error - сетевая ошибка)",
+                       ["endpoint", "status"])
+
+CELERY_TASK_SECONDS = Histogram("celery_task_duration_seconds", "Время выполнения задачи Celery",
+                                ["task"], buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300))
+CELERY_TASKS = Counter("celery_tasks_total", "Завершённые задачи Celery по итоговому статусу",
+                       ["task", "state"])
+
+CACHE_EVENTS = Counter("cache_events_total", "События кэшей (hits, misses, ...) по кэшам",
+                       ["cache", "event"])
+
+# [запросов, секунд] SQL текущего HTTP-запроса; вне запроса (воркер, lifespan) - None
+_db_usage = ContextVar("db_usage", default=None)
+_task_started = {}  # task_id -> perf_counter() начала
+_route_series = {}  # (метод, маршрут, код) -> серии гистограмм HTTP
+
+_HH_ID = re.compile(r"(?<=^/vacancies/)[^/]+")
+
+
+def count_cache_event(cache, name, amount=1):
+    CACHE_EVENTS.labels(cache, name).inc(amount)
+
+
+# --- HTTP ---
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware без BaseHTTPMiddleware (та копирует тело ответа через очередь).
+    Маршрут берётся шаблоном пути (/vacancies/{internal_id}), чтобы не плодить серии.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        usage = [0, 0.0]
+        token = _db_usage.set(usage)
+        response = {"status": 500, "elapsed": None}
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["elapsed"] = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _db_usage.reset(token)
+            elapsed = response["elapsed"] if response["elapsed"] is not None else time.perf_counter() - started
+            path = getattr(scope.get("route"), "path", "unmatched")
+            key = (scope["method"], path, response["status"])
+            series = _route_series.get(key)
+            if series is None:
+                # labels() стоит пару микросекунд, поэтому дочерние серии кэшируются:
+                # маршрутов и кодов ответа конечное число
+                series = _route_series[key] = (HTTP_REQUEST_SECONDS.labels(*key),
+                                               HTTP_REQUEST_DB_QUERIES.labels(path),
+                                               HTTP_REQUEST_DB_SECONDS.labels(path))
+            series[0].observe(elapsed)
+            series[1].observe(usage[0])
+            series[2].observe(usage[1])
+
+
+# --- БД ---
+
+def instrument_engine(async_engine, name):
+    """Время каждого SQL-запроса движка + учёт в текущем HTTP-запросе"""
+    histogram = DB_QUERY_SECONDS.labels(name)
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def query_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+    def query_finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        histogram.observe(elapsed)
+        usage = _db_usage.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += elapsed
+
+    @event.listens_for(async_engine.sync_engine, "handle_error")
+    def query_failed(exception_context):
+        # after_cursor_execute после ошибки не вызывается - снимаем отметку здесь,
+        # иначе стек в conn.info растёт и следующий запрос возьмёт чужое время начала
+        conn = exception_context.connection
+        if conn is not None and exception_context.execution_context is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+class PoolCollector(Collector):
+    """Занятость пулов и ожидание соединений из database.pool_stats()"""
+
+    def describe(self):
+        return []  # иначе REGISTRY.register() вызовет collect() прямо при импорте
+
+    def collect(self):
+        from database import CHECKOUT_BUCKETS, pool_stats
+
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Соединений выдано из пула", labels=["pool"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Соединений сверх pool_size", labels=["pool"])
+        size = GaugeMetricFamily("db_pool_size", "Размер пула", labels=["pool"])
+        timeouts = CounterMetricFamily("db_pool_checkout_timeouts", "Таймауты ожидания соединения",
+                                       labels=["pool"])
+        wait = HistogramMetricFamily("db_pool_checkout_wait_seconds", "Ожидание соединения из пула",
+                                     labels=["pool"])
+        for name, stats in pool_stats().items():
+            checked_out.add_metric([name], stats["checked_out"])
+            overflow.add_metric([name], max(0, stats["overflow"]))
+            size.add_metric([name], stats["size"])
+            timeouts.add_metric([name], stats.get("timeouts", 0))
+            buckets = list(stats["buckets"].values())
+            if buckets:
+                bounds = [str(bound) for bound in CHECKOUT_BUCKETS] + ["+Inf"]
+                wait.add_metric([name], list(zip(bounds, buckets)), stats["wait_seconds_total"])
+        yield from (checked_out, overflow, size, timeouts, wait)
+
+
+class CacheRatioCollector(Collector):
+    """Доли попаданий кэшей процесса API (счётчики событий - в cache_events_total)"""
+
+    def describe(self):
+        return []  # иначе REGISTRY.register() вызовет collect() прямо при импорте
+
+    def collect(self):
+        from hh_client import vacancy_cache
+        from match_cache import match_cache
+
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Доля попаданий кэша с запуска процесса",
+                                  labels=["cache"])
+        ratio.add_metric(["hh_vacancy"], vacancy_cache.stats()["hit_ratio"])
+        ratio.add_metric(["match"], match_cache.stats()["hit_ratio"])
+        yield ratio
+
+
+class CeleryQueueCollector(Collector):
+    """Длина очередей брокера: пассивный queue_declare возвращает число сообщений"""
+
+    def describe(self):
+        return []  # иначе REGISTRY.register() вызовет collect() прямо при импорте
+
+    def collect(self):
+        from celery_app import celery_app
+
+        depth = GaugeMetricFamily("celery_queue_length", "Сообщений в очереди брокера", labels=["queue"])
+        queues = [queue.name for queue in celery_app.conf.task_queues or []] \
+            or [celery_app.conf.task_default_queue]
+        try:
+            with celery_app.connection_for_read(connect_timeout=1) as conn:
+                for queue in queues:
+                    # После 404 AMQP закрывает канал - у каждой очереди свой
+                    channel = conn.channel()
+                    try:
+                        length = channel.queue_declare(queue=queue, passive=True).message_count
+                    except conn.channel_errors:  # очереди ещё нет (в Redis пустая очередь - это нет ключа)
+                        length = 0
+                    finally:
+                        channel.close()
+                    depth.add_metric([queue], length)
+        except Exception as e:  # брокер недоступен - метрика пропускается
+            print("Метрики: не удалось узнать длину очередей Celery:", e)
+        yield depth
+
+
+_api_collectors = []
+
+
+def register_api_collectors():
+    _api_collectors.extend((PoolCollector(), CacheRatioCollector(), CeleryQueueCollector()))
+    for collector in _api_collectors:
+        REGISTRY.register(collector)
+
+
+def _registry():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # Эти коллекторы читают состояние в момент сбора и в файлы multiprocess не пишут:
+        # их значения - от процесса, ответившего на /metrics
+        for collector in _api_collectors:
+            registry.register(collector)
+        return registry
+    return REGISTRY
+
+
+def render():
+    """(тело, content-type) для ответа /metrics"""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+# --- HH ---
+
+def hh_endpoint(path):
+    """/vacancies/123 -> /vacancies/{id}: id в метку не попадает"""
+    return _HH_ID.sub("{id}", path)
+
+
+def observe_hh_request(endpoint, status, elapsed):
+    HH_REQUEST_SECONDS.labels(endpoint).observe(elapsed)
+    HH_RESPONSES.labels(endpoint, status).inc()
+
+
+# --- Celery ---
+
+def task_started(task_id):
+    _task_started[task_id] = time.perf_counter()
+
+
+def task_finished(task_name, task_id, state):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_SECONDS.labels(task_name).observe(time.perf_counter() - started)
+    CELERY_TASKS.labels(task_name, state or "UNKNOWN").inc()
+
+
+def start_worker_server(port):
+    start_http_server(port, registry=_registry())
@@ -0,0 +1,108 @@
+"""Схема, которую раньше создавал create_all при старте
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+- Таблицы users, vacancy, resumes, terms, vacancy_vectors, resume_vectors, match_cache
+  с их индексами.
+- vacancy.description_html и сгенерированная колонка vacancy.search_vector
+  с GIN-индексом для локального поиска.
+
+Операции идемпотентны (IF NOT EXISTS): на БД, поднятой старым create_all, миграция
+только добавляет недостающее и ставит отметку ревизии. Схема здесь заморожена
+и не зависит от models.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_users_id", "users", ["id"], if_not_exists=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True, if_not_exists=True)
+
+    op.create_table(
+        "vacancy",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("hh_id", sa.String()),
+        sa.Column("name", sa.String()),
+        sa.Column("url", sa.String()),
+        sa.Column("description", sa.Text()),
+        sa.Column("description_html", sa.Text()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_vacancy_id", "vacancy", ["id"], if_not_exists=True)
+    op.create_index("ix_vacancy_hh_id", "vacancy", ["hh_id"], unique=True, if_not_exists=True)
+    op.add_column("vacancy", sa.Column("description_html", sa.Text()), if_not_exists=True)
+    op.add_column("vacancy", sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(description, '')), 'B')", persisted=True)),
+        if_not_exists=True)
+    op.create_index("ix_vacancy_search_vector", "vacancy", ["search_vector"],
+                    postgresql_using="gin", if_not_exists=True)
+
+    op.create_table(
+        "resumes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("content", sa.Text()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_resumes_id", "resumes", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "terms",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("term", sa.String(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_terms_term", "terms", ["term"], unique=True, if_not_exists=True)
+
+    op.create_table(
+        "vacancy_vectors",
+        sa.Column("vacancy_id", sa.Integer(), sa.ForeignKey("vacancy.id", ondelete="CASCADE"),
+                  primary_key=True),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("term_ids", sa.LargeBinary(), nullable=False),
+        sa.Column("weights", sa.LargeBinary(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "resume_vectors",
+        sa.Column("resume_id", sa.Integer(), sa.ForeignKey("resumes.id", ondelete="CASCADE"),
+                  primary_key=True),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("term_ids", sa.LargeBinary(), nullable=False),
+        sa.Column("weights", sa.LargeBinary(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "match_cache",
+        sa.Column("resume_hash", sa.String(64), primary_key=True),
+        sa.Column("vacancy_hash", sa.String(64), primary_key=True),
+        sa.Column("matcher_version", sa.SmallInteger(), primary_key=True),
+        sa.Column("result", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(),
+                  nullable=False),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    for table in ("match_cache", "resume_vectors", "vacancy_vectors", "terms", "resumes",
+                  "vacancy", "users"):
+        op.drop_table(table)
@@ -0,0 +1,57 @@
+"""Индексы под реальные запросы, created_at/updated_at, каскадное удаление резюме
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+- ix_resumes_user_id: GET /resumes фильтрует по владельцу;
+- ix_vacancy_missing_description: частичный индекс для /vacancies/fill-batch;
+- ix_users_id, ix_vacancy_id, ix_resumes_id дублировали первичные ключи - удалены;
+- резюме удаляются вместе с пользователем (ON DELETE CASCADE).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+TIMESTAMPED = ("vacancy", "resumes")
+
+
+def upgrade():
+    for table in TIMESTAMPED:
+        # Для уже существующих строк настоящего времени создания нет - ставится момент миграции
+        op.add_column(table, sa.Column("created_at", sa.DateTime(timezone=True),
+                                       server_default=sa.func.now(), nullable=False))
+        op.add_column(table, sa.Column("updated_at", sa.DateTime(timezone=True),
+                                       server_default=sa.func.now(), nullable=False))
+
+    op.create_index("ix_resumes_user_id", "resumes", ["user_id"], if_not_exists=True)
+    op.create_index("ix_vacancy_missing_description", "vacancy", ["id"],
+                    postgresql_where=sa.text("description IS NULL OR description = ''"))
+
+    for index, table in (("ix_users_id", "users"), ("ix_vacancy_id", "vacancy"),
+                         ("ix_resumes_id", "resumes")):
+        op.drop_index(index, table_name=table, if_exists=True)
+
+    op.drop_constraint("resumes_user_id_fkey", "resumes", type_="foreignkey")
+    op.create_foreign_key("resumes_user_id_fkey", "resumes", "users", ["user_id"], ["id"],
+                          ondelete="CASCADE")
+
+
+def downgrade():
+    op.drop_constraint("resumes_user_id_fkey", "resumes", type_="foreignkey")
+    op.create_foreign_key("resumes_user_id_fkey", "resumes", "users", ["user_id"], ["id"])
+
+    for index, table in (("ix_users_id", "users"), ("ix_vacancy_id", "vacancy"),
+                         ("ix_resumes_id", "resumes")):
+        op.create_index(index, table, ["id"])
+
+    op.drop_index("ix_vacancy_missing_description", table_name="vacancy")
+    op.drop_index("ix_resumes_user_id", table_name="resumes")
+
+    for table in TIMESTAMPED:
+        op.drop_column(table, "updated_at")
+        op.drop_column(table, "created_at")
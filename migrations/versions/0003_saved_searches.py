@@ -0,0 +1,51 @@
+"""Сохранённые поиски и отслеживание жизни вакансий на HH
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+- saved_searches: запросы, которые обновляет Celery beat (saved_searches.py);
+- vacancy.published_at: по нему обновление отличает изменившиеся вакансии;
+- vacancy.last_seen_at/archived_at и частичный индекс ix_vacancy_recheck
+  для проверки давно не виденных вакансий на архив.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "saved_searches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("text", sa.String(), nullable=False),
+        sa.Column("areas", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column("last_refreshed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_result", postgresql.JSONB(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_saved_searches_user_id", "saved_searches", ["user_id"])
+
+    op.add_column("vacancy", sa.Column("published_at", sa.DateTime(timezone=True), nullable=True))
+    # Существующие вакансии считаются виденными в момент миграции
+    op.add_column("vacancy", sa.Column("last_seen_at", sa.DateTime(timezone=True),
+                                       server_default=sa.func.now(), nullable=False))
+    op.add_column("vacancy", sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("ix_vacancy_recheck", "vacancy", ["last_seen_at"],
+                    postgresql_where=sa.text("archived_at IS NULL"))
+
+
+def downgrade():
+    op.drop_index("ix_vacancy_recheck", table_name="vacancy")
+    op.drop_column("vacancy", "archived_at")
+    op.drop_column("vacancy", "last_seen_at")
+    op.drop_column("vacancy", "published_at")
+
+    op.drop_index("ix_saved_searches_user_id", table_name="saved_searches")
+    op.drop_table("saved_searches")
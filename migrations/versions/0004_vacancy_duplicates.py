@@ -0,0 +1,40 @@
+"""Почти-дубликаты вакансий: MinHash-подписи и ссылка на каноническую вакансию
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+- vacancy_signatures: подписи описаний (dedup.py); существующие досчитываются
+  при первой загрузке индекса дубликатов;
+- vacancy.duplicate_of: дубликат ссылается на каноническую вакансию кластера.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "vacancy_signatures",
+        sa.Column("vacancy_id", sa.Integer(), sa.ForeignKey("vacancy.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("signature", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_vacancy_signatures_updated_at", "vacancy_signatures", ["updated_at"])
+
+    op.add_column("vacancy", sa.Column("duplicate_of", sa.Integer(),
+                                       sa.ForeignKey("vacancy.id", ondelete="SET NULL"), nullable=True))
+    op.create_index("ix_vacancy_duplicate_of", "vacancy", ["duplicate_of"])
+
+
+def downgrade():
+    op.drop_index("ix_vacancy_duplicate_of", table_name="vacancy")
+    op.drop_column("vacancy", "duplicate_of")
+
+    op.drop_index("ix_vacancy_signatures_updated_at", table_name="vacancy_signatures")
+    op.drop_table("vacancy_signatures")
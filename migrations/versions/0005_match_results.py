@@ -0,0 +1,47 @@
+"""Результаты анализа резюме + вакансия в Postgres
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+- match_results: последний результат на пару (match_results.py), индексы под
+  "лучшие вакансии для резюме" и историю анализов. Раньше результат жил
+  только в result backend Celery.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "match_results",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("resume_id", sa.Integer(), sa.ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("vacancy_id", sa.Integer(), sa.ForeignKey("vacancy.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("score", sa.SmallInteger(), nullable=False),
+        sa.Column("similarity", sa.Float(), nullable=False),
+        sa.Column("skill_coverage", sa.Float(), nullable=True),
+        sa.Column("breakdown", postgresql.JSONB(), nullable=False),
+        sa.Column("matcher_version", sa.SmallInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("analyzed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("resume_id", "vacancy_id", name="uq_match_results_pair"),
+    )
+    op.create_index("ix_match_results_vacancy_id", "match_results", ["vacancy_id"])
+    op.create_index("ix_match_results_best", "match_results",
+                    ["resume_id", sa.text("score DESC"), sa.text("similarity DESC"), "vacancy_id"])
+    op.create_index("ix_match_results_history", "match_results",
+                    ["resume_id", sa.text("analyzed_at DESC"), sa.text("id DESC")])
+
+
+def downgrade():
+    op.drop_index("ix_match_results_history", table_name="match_results")
+    op.drop_index("ix_match_results_best", table_name="match_results")
+    op.drop_index("ix_match_results_vacancy_id", table_name="match_results")
+    op.drop_table("match_results")
@@ -0,0 +1,27 @@
+"""Время изменения вектора вакансии
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+- vacancy_vectors.updated_at: по нему vacancy_index каждого процесса догружает векторы,
+  записанные другими (воркеры, /import/vacancies), как dedup - подписи.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("vacancy_vectors", sa.Column("updated_at", sa.DateTime(timezone=True),
+                                               server_default=sa.func.now(), nullable=False))
+    op.create_index("ix_vacancy_vectors_updated_at", "vacancy_vectors", ["updated_at"])
+
+
+def downgrade():
+    op.drop_index("ix_vacancy_vectors_updated_at", table_name="vacancy_vectors")
+    op.drop_column("vacancy_vectors", "updated_at")
@@ -0,0 +1,50 @@
+"""История результатов анализа
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+- match_result_history: каждый изменившийся результат пары, только добавление
+  (match_results.py). Заполняется текущими строками match_results.
+- ix_match_results_history больше не нужен: история читается из новой таблицы.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "match_result_history",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("resume_id", sa.Integer(), sa.ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("vacancy_id", sa.Integer(), sa.ForeignKey("vacancy.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("score", sa.SmallInteger(), nullable=False),
+        sa.Column("similarity", sa.Float(), nullable=False),
+        sa.Column("skill_coverage", sa.Float(), nullable=True),
+        sa.Column("breakdown", postgresql.JSONB(), nullable=False),
+        sa.Column("matcher_version", sa.SmallInteger(), nullable=False),
+        sa.Column("analyzed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_match_result_history_vacancy_id", "match_result_history", ["vacancy_id"])
+    op.create_index("ix_match_result_history_resume", "match_result_history", ["resume_id", sa.text("id DESC")])
+    op.execute("""
+        INSERT INTO match_result_history (resume_id, vacancy_id, score, similarity, skill_coverage,
+                                          breakdown, matcher_version, analyzed_at)
+        SELECT resume_id, vacancy_id, score, similarity, skill_coverage, breakdown, matcher_version, analyzed_at
+        FROM match_results ORDER BY analyzed_at, id
+    """)
+    op.drop_index("ix_match_results_history", table_name="match_results")
+
+
+def downgrade():
+    op.create_index("ix_match_results_history", "match_results",
+                    ["resume_id", sa.text("analyzed_at DESC"), sa.text("id DESC")])
+    op.drop_index("ix_match_result_history_resume", table_name="match_result_history")
+    op.drop_index("ix_match_result_history_vacancy_id", table_name="match_result_history")
+    op.drop_table("match_result_history")
@@ -0,0 +1,39 @@
+"""Частота термов по вакансиям
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+- terms.df: в скольких векторах вакансий встречается терм. Ведётся при записи
+  векторов (features._store_vectors), по нему воркеры считают IDF, не загружая
+  весь vacancy_index. Заполняется по уже сохранённым vacancy_vectors.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("terms", sa.Column("df", sa.Integer(), server_default="0", nullable=False))
+    # term_ids - array('I').tobytes(): по 4 байта little-endian на id терма
+    op.execute("""
+        UPDATE terms SET df = counts.df
+        FROM (
+            SELECT get_byte(v.term_ids, 4 * i)
+                   | (get_byte(v.term_ids, 4 * i + 1) << 8)
+                   | (get_byte(v.term_ids, 4 * i + 2) << 16)
+                   | (get_byte(v.term_ids, 4 * i + 3) << 24) AS term_id,
+                   count(*) AS df
+            FROM vacancy_vectors v, generate_series(0, length(v.term_ids) / 4 - 1) AS i
+            GROUP BY 1
+        ) counts
+        WHERE terms.id = counts.term_id
+    """)
+
+
+def downgrade():
+    op.drop_column("terms", "df")
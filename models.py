@@ -1,11 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import (Column, Computed, Index, BigInteger, Integer, SmallInteger, String, DateTime, Text, Float,
+                        ForeignKey, LargeBinary, UniqueConstraint)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import func, text
 from database import Base
 
 class User(Base):
     __tablename__ = 'users'
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -13,15 +16,150 @@ class User(Base):
 class Vacancy(Base):
     __tablename__ = 'vacancy'
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     hh_id = Column(String, unique=True, index=True)
     name = Column(String)
     url = Column(String)
-    description = Column(Text, nullable=True)
+    description = Column(Text, nullable=True)  # чистый текст
+    description_html = Column(Text, nullable=True)  # исходная разметка HH
+    # Полнотекстовый индекс (см. vacancy_search.py): название весит больше описания.
+    # Конфигурация russian стеммит кириллицу russian_stem, латиницу - english_stem
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(description, '')), 'B')", persisted=True)))
+    published_at = Column(DateTime(timezone=True), nullable=True)  # дата (пере)публикации на HH
+    # Когда HH последний раз подтвердил, что вакансия жива (выдача или проверка saved_searches.py)
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    archived_at = Column(DateTime(timezone=True), nullable=True)  # HH убрал вакансию в архив
+    # Почти-дубликат (dedup.py): ссылка на каноническую вакансию кластера
+    duplicate_of = Column(Integer, ForeignKey("vacancy.id", ondelete="SET NULL"), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    __table_args__ = (
+        Index("ix_vacancy_search_vector", "search_vector", postgresql_using="gin"),
+        # Очередь проверки на архив: давно не виденные среди ещё живых
+        Index("ix_vacancy_recheck", "last_seen_at", postgresql_where=text("archived_at IS NULL")),
+        # Очередь для /vacancies/fill-batch: вакансии, у которых ещё нет описания.
+        # Условие совпадает с запросом в main.py, иначе планировщик индекс не возьмёт
+        Index("ix_vacancy_missing_description", "id",
+              postgresql_where=text("description IS NULL OR description = ''")),
+    )
     
 class Resume(Base):
     __tablename__ = 'resumes'
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    content = Column(Text)
\ No newline at end of file
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    content = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+class SavedSearch(Base):
+    """Поиск пользователя, который Celery beat периодически обновляет (см. saved_searches.py)"""
+    __tablename__ = 'saved_searches'
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    text = Column(String, nullable=False)
+    areas = Column(ARRAY(Integer), nullable=False)
+    # Граница date_from следующего обновления: время начала последнего успешного
+    last_refreshed_at = Column(DateTime(timezone=True), nullable=True)
+    last_result = Column(JSONB, nullable=True)  # счётчики последнего обновления
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+class Term(Base):
+    """Общий словарь термов: id используются в упакованных векторах"""
+    __tablename__ = 'terms'
+    
+    id = Column(Integer, primary_key=True)
+    term = Column(String, unique=True, index=True, nullable=False)
+    # В скольких векторах вакансий встречается терм - IDF для воркеров (features.load_idf)
+    df = Column(Integer, nullable=False, server_default="0")
+    
+class VacancyVector(Base):
+    """Предпосчитанный вектор описания вакансии: array('I') id термов + float32 веса"""
+    __tablename__ = 'vacancy_vectors'
+    
+    vacancy_id = Column(Integer, ForeignKey("vacancy.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    term_ids = Column(LargeBinary, nullable=False)
+    weights = Column(LargeBinary, nullable=False)
+    # По нему индексы вакансий в других процессах догружают изменения (vacancy_index.catch_up)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    
+class VacancySignature(Base):
+    """MinHash-подпись описания вакансии (dedup.py): NUM_PERM значений uint32"""
+    __tablename__ = 'vacancy_signatures'
+    
+    vacancy_id = Column(Integer, ForeignKey("vacancy.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+    # По нему процессы догружают подписи, записанные другими
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    
+class ResumeVector(Base):
+    """Предпосчитанный вектор текста резюме, формат как у VacancyVector"""
+    __tablename__ = 'resume_vectors'
+    
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    term_ids = Column(LargeBinary, nullable=False)
+    weights = Column(LargeBinary, nullable=False)
+    
+class MatchCache(Base):
+    """Готовый результат анализа пары по хешам текстов (см. match_cache.py)"""
+    __tablename__ = 'match_cache'
+    
+    resume_hash = Column(String(64), primary_key=True)
+    vacancy_hash = Column(String(64), primary_key=True)
+    matcher_version = Column(SmallInteger, primary_key=True)
+    result = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+class MatchResult(Base):
+    """
+    Последний результат анализа пары резюме + вакансия (см. match_results.py).
+    Пишется воркером; по нему - лучшие вакансии для резюме и история анализов.
+    """
+    __tablename__ = 'match_results'
+    
+    id = Column(BigInteger, primary_key=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False)
+    vacancy_id = Column(Integer, ForeignKey("vacancy.id", ondelete="CASCADE"), nullable=False, index=True)
+    score = Column(SmallInteger, nullable=False)
+    similarity = Column(Float, nullable=False)
+    skill_coverage = Column(Float, nullable=True)
+    breakdown = Column(JSONB, nullable=False)  # matched_skills, missing_skills, top_terms
+    matcher_version = Column(SmallInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Меняется, только когда меняется сам результат
+    analyzed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("resume_id", "vacancy_id", name="uq_match_results_pair"),
+        # Лучшие для резюме: порядок индекса совпадает с ORDER BY в match_results.best_matches
+        Index("ix_match_results_best", "resume_id", text("score DESC"), text("similarity DESC"), "vacancy_id"),
+    )
+    
+class MatchResultHistory(Base):
+    """
+    Каждый изменившийся результат анализа пары, только добавление (см. match_results.py).
+    В match_results - последний результат, здесь - все по порядку.
+    """
+    __tablename__ = 'match_result_history'
+    
+    id = Column(BigInteger, primary_key=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False)
+    vacancy_id = Column(Integer, ForeignKey("vacancy.id", ondelete="CASCADE"), nullable=False, index=True)
+    score = Column(SmallInteger, nullable=False)
+    similarity = Column(Float, nullable=False)
+    skill_coverage = Column(Float, nullable=True)
+    breakdown = Column(JSONB, nullable=False)
+    matcher_version = Column(SmallInteger, nullable=False)
+    analyzed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        # Новые сверху, keyset по id
+        Index("ix_match_result_history_resume", "resume_id", text("id DESC")),
+    )
@@ -0,0 +1,164 @@
+"""
+Сохранённые поиски и их фоновое обновление (Celery beat, см. tasks.py).
+
+Обновление инкрементальное, цена цикла зависит от числа изменений, а не от размера каталога:
+1. выдача HH только с date_from = прошлое обновление минус SAVED_SEARCH_OVERLAP
+   (crawler.crawl_vacancies листает страницы и делит окно дат, если выдача глубже лимита HH);
+2. upsert отдаёт только новые и изменившиеся вакансии (название, ссылка, дата публикации);
+3. их описания запрашиваются условным GET (отдельной задачей в очереди fill), в БД
+   пишутся только те, у которых поменялся content_hash (хеш хранится в vacancy_vectors).
+Одинаковые поиски разных пользователей (тот же нормализованный текст и регионы)
+обновляются одним обходом.
+
+Архив: вакансии, которых HH не показывал дольше VACANCY_RECHECK_DAYS, проверяются
+по одной (условный запрос, у живой - 304 без тела); снятые получают archived_at.
+Если вакансия снова появится в выдаче, upsert вернёт её из архива.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, select, update
+
+from config import settings
+from crawler import MAX_PER_PAGE, crawl_to_db
+from database import async_session_maker
+from descriptions import fetch_descriptions, save_descriptions
+from features import content_hash
+from hh_cache import SearchResultCache
+from hh_client import get_vacancy_state
+from models import SavedSearch, Vacancy, VacancyVector
+
+
+def search_key(text, areas):
+    return SearchResultCache.key(text, areas, MAX_PER_PAGE)
+
+
+async def due_search_groups(now=None):
+    """
+    Поиски, которые не обновлялись дольше SAVED_SEARCH_REFRESH_INTERVAL,
+    сгруппированные по нормализованному запросу: [[id, ...], ...]
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.SAVED_SEARCH_REFRESH_INTERVAL)
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(SavedSearch.id, SavedSearch.text, SavedSearch.areas)
+            .where(or_(SavedSearch.last_refreshed_at.is_(None), SavedSearch.last_refreshed_at < cutoff))
+            .order_by(SavedSearch.id))
+        groups = {}
+        for row in result:
+            groups.setdefault(search_key(row.text, row.areas), []).append(row.id)
+    return list(groups.values())
+
+
+async def refill_changed_descriptions(targets):
+    """
+    Описания для (vacancy_id, hh_id) через условный GET; сохраняются только те,
+    чей content_hash отличается от хеша в vacancy_vectors.
+    """
+    counters = {"checked": len(targets), "updated": 0, "unchanged": 0, "failed": 0}
+    if not targets:
+        return counters
+
+    async with async_session_maker() as session:
+        known = dict((await session.execute(
+            select(VacancyVector.vacancy_id, VacancyVector.content_hash)
+            .where(VacancyVector.vacancy_id.in_([vacancy_id for vacancy_id, _ in targets])))).all())
+
+    rows = []
+    async for vacancy_id, hh_id, description in fetch_descriptions(targets, revalidate=True):
+        if not description or not description[1]:
+            counters["failed"] += 1
+        elif known.get(vacancy_id) == content_hash(description[1]):
+            counters["unchanged"] += 1
+        else:
+            rows.append({"id": vacancy_id, "description": description[1],
+                         "description_html": description[0]})
+
+    async with async_session_maker() as session:
+        await save_descriptions(session, rows)
+    counters["updated"] = len(rows)
+    return counters
+
+
+async def refresh_searches(search_ids):
+    """
+    Одно обновление группы одинаковых поисков. Окно дат - от самого давнего
+    из их последних обновлений; новый водяной знак - момент начала обхода.
+    Если HH не отдал хотя бы одну страницу, водяной знак не сдвигается: следующее
+    обновление пройдёт то же окно заново. Итог с failed_pages пишется в last_result в любом случае.
+    Возвращает (итог, [(vacancy_id, hh_id), ...]) - новые и изменившиеся вакансии,
+    описания которых нужно перезапросить (refill_changed_descriptions).
+    """
+    started = datetime.now(timezone.utc)
+    async with async_session_maker() as session:
+        searches = (await session.scalars(select(SavedSearch)
+                                          .where(SavedSearch.id.in_(search_ids)))).all()
+    if not searches:
+        return {"searches": 0}, []
+
+    marks = [search.last_refreshed_at for search in searches]
+    if None in marks:
+        date_from = started - timedelta(days=settings.SAVED_SEARCH_INITIAL_DAYS)
+    else:
+        # С запасом: HH индексирует вакансии с задержкой
+        date_from = min(marks) - timedelta(seconds=settings.SAVED_SEARCH_OVERLAP)
+
+    changed = []
+    crawl = await crawl_to_db([searches[0].text], areas=searches[0].areas, changed=changed,
+                              date_from=date_from, date_to=started)
+    result = {"searches": len(searches), "date_from": date_from.isoformat(),
+              "items": crawl["items"], "requests": crawl["requests"],
+              "saved_new": crawl["saved_new"], "updated": crawl["updated"],
+              "failed_pages": crawl["failed_pages"], "descriptions_queued": len(changed)}
+    values = {"last_result": result}
+    if not crawl["failed_pages"]:
+        values["last_refreshed_at"] = started
+    async with async_session_maker() as session:
+        await session.execute(update(SavedSearch)
+                              .where(SavedSearch.id.in_([search.id for search in searches]))
+                              .values(**values))
+        await session.commit()
+    return result, changed
+
+
+async def sweep_archived(limit=None):
+    """
+    Проверяет на HH до limit вакансий, которых не видели дольше VACANCY_RECHECK_DAYS
+    (частичный индекс ix_vacancy_recheck). Живым сдвигается last_seen_at, снятым
+    ставится archived_at; если HH не ответил, вакансия останется в очереди.
+    """
+    limit = limit or settings.VACANCY_RECHECK_BATCH
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.VACANCY_RECHECK_DAYS)
+    async with async_session_maker() as session:
+        targets = (await session.execute(
+            select(Vacancy.id, Vacancy.hh_id)
+            .where(Vacancy.archived_at.is_(None), Vacancy.last_seen_at < cutoff)
+            .order_by(Vacancy.last_seen_at)
+            .limit(limit))).all()
+
+    semaphore = asyncio.Semaphore(settings.FILL_CONCURRENCY)
+
+    async def check(hh_id):
+        async with semaphore:
+            return await get_vacancy_state(hh_id)
+
+    states = await asyncio.gather(*(check(hh_id) for _, hh_id in targets))
+    by_state = {"active": [], "archived": [], None: []}
+    for (vacancy_id, _), state in zip(targets, states):
+        by_state[state].append(vacancy_id)
+
+    async with async_session_maker() as session:
+        # updated_at не трогаем: содержимое вакансии не менялось
+        if by_state["active"]:
+            await session.execute(update(Vacancy).where(Vacancy.id.in_(by_state["active"]))
+                                  .values(last_seen_at=datetime.now(timezone.utc),
+                                          updated_at=Vacancy.updated_at))
+        if by_state["archived"]:
+            await session.execute(update(Vacancy).where(Vacancy.id.in_(by_state["archived"]))
+                                  .values(archived_at=datetime.now(timezone.utc),
+                                          updated_at=Vacancy.updated_at))
+        await session.commit()
+
+    return {"checked": len(targets), "active": len(by_state["active"]),
+            "archived": len(by_state["archived"]), "unknown": len(by_state[None])}
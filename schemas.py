@@ -1,4 +1,6 @@
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator
+
+from config import settings
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -19,4 +21,27 @@ class ResumeCreate(BaseModel):
     
 class MatchRequest(BaseModel):
     resume_id: int
-    vacancy_id: int
\ No newline at end of file
+    vacancy_id: int
+    
+class FillBatchRequest(BaseModel):
+    hh_ids: list[str] = []
+    all_missing: bool = False  # взять все вакансии без описания
+    concurrency: int | None = Field(None, ge=1, le=settings.FILL_CONCURRENCY_MAX)
+    
+class MatchBatchRequest(BaseModel):
+    resume_id: int
+    vacancy_ids: list[int] = []
+    all_with_description: bool = False  # взять все вакансии с описанием
+    limit: int | None = 50  # сколько лучших вернуть, None - все
+    
+class SavedSearchCreate(BaseModel):
+    email: str
+    text: str
+    areas: list[int] = []  # пусто - регионы по умолчанию (hh_client.DEFAULT_AREAS)
+    
+    @field_validator('text')
+    def validate_text(cls, v):
+        v = ' '.join(v.split())
+        if len(v) < 2:
+            raise ValueError('Запрос должен быть не короче 2 символов')
+        return v
@@ -0,0 +1,53 @@
+"""
+Хеширование паролей вне event loop.
+bcrypt - это 100-300 мс чистого CPU на вызов: прямо в async-обработчике он останавливает
+все остальные запросы процесса. Вызовы уходят в ограниченный пул потоков
+(C-реализация bcrypt отпускает GIL), а при переполнении очереди сервер сразу
+отвечает 503 с Retry-After вместо бесконечного ожидания.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from config import settings
+
+pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto',
+                           bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS,
+                               thread_name_prefix="bcrypt")
+_pending = 0  # выполняются + ждут в очереди пула
+
+
+async def _run_limited(func, *args):
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(status_code=503,
+                            detail="Сервер перегружен, повторите попытку позже",
+                            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)})
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password):
+    return await _run_limited(pwd_context.hash, password)
+
+
+async def verify_password(password, hashed):
+    """
+    (верный ли пароль, новый хеш или None).
+    Новый хеш приходит, если старый посчитан с другим BCRYPT_ROUNDS - его стоит сохранить.
+    """
+    return await _run_limited(pwd_context.verify_and_update, password, hashed)
+
+
+def stats():
+    return {"pending": _pending,
+            "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "rounds": settings.BCRYPT_ROUNDS}
@@ -0,0 +1,142 @@
+"""
+Single-flight: одновременные одинаковые вызовы (тот же ключ) ждут одну корутину,
+а не идут каждый в HH.
+
+В процессе - словарь ключ -> asyncio.Task. Между процессами (несколько uvicorn-воркеров,
+API + Celery) - по желанию Redis: лидер берёт блокировку SET NX и кладёт результат
+под ключом с коротким TTL, остальные опрашивают этот ключ. Упал лидер - блокировка
+истекает по lock_ttl, и ожидающий выполняет вызов сам. Результат должен сериализоваться в JSON.
+В блокировке лежит случайный токен лидера, снимается она сравнением с ним (скрипт Lua):
+если лидер работал дольше lock_ttl и блокировку уже взял другой, чужую он не удалит.
+"""
+import asyncio
+import json
+import secrets
+import time
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from config import settings
+from metrics import count_cache_event
+
+LOCK_PREFIX = "singleflight:lock:"
+RESULT_PREFIX = "singleflight:result:"
+_MISSING = object()
+# DEL, только если в блокировке всё ещё наш токен - проверка и удаление атомарно
+RELEASE_LOCK = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+
+    def __init__(self, name, redis_url=None, result_ttl=5, lock_ttl=30, wait_timeout=20.0,
+                 poll_interval=0.05):
+        self.name = name
+        self.redis_url = redis_url
+        self.result_ttl = result_ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._redis = None
+        self._inflight = {}  # ключ -> Task лидера в этом процессе
+        self.counters = {"leaders": 0, "shared": 0, "redis_shared": 0, "redis_errors": 0}
+
+    def _get_redis(self):
+        if self.redis_url and self._redis is None:
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    def count(self, name):
+        self.counters[name] += 1
+        count_cache_event(f"singleflight_{self.name}", name)
+
+    async def do(self, key, func, *args):
+        """
+        (результат, лидер ли этот вызов). Лидер - тот, кто действительно выполнил func:
+        по флагу вызывающий код решает, нужна ли ему дальнейшая обработка (например, запись в БД).
+        Отмена одного ожидающего (клиент ушёл) не отменяет общий вызов для остальных.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.count("shared")
+            value, _ = await asyncio.shield(task)
+            return value, False
+
+        task = asyncio.ensure_future(self._run(key, func, *args))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _run(self, key, func, *args):
+        redis = self._get_redis()
+        if redis is None:
+            self.count("leaders")
+            return await func(*args), True
+        try:
+            return await self._run_with_redis(redis, key, func, *args)
+        except RedisError as e:
+            self.count("redis_errors")
+            print(f"Single-flight {self.name}: Redis недоступен:", e)
+            self.count("leaders")
+            return await func(*args), True
+
+    async def _run_with_redis(self, redis, key, func, *args):
+        lock_key = f"{LOCK_PREFIX}{self.name}:{key}"
+        result_key = f"{RESULT_PREFIX}{self.name}:{key}"
+        deadline = time.monotonic() + self.wait_timeout
+        token = secrets.token_hex(16)
+        locked = False
+        while True:
+            value = await self._read_result(redis, result_key)
+            if value is not _MISSING:
+                self.count("redis_shared")
+                return value, False
+            if await redis.set(lock_key, token, nx=True, ex=self.lock_ttl):
+                locked = True
+                break
+            if time.monotonic() >= deadline:
+                break  # лидер в другом процессе завис - не ждём бесконечно
+            await asyncio.sleep(self.poll_interval)
+
+        self.count("leaders")
+        value = _MISSING
+        try:
+            value = await func(*args)
+            return value, True
+        finally:
+            # Ошибка Redis здесь не должна повторять уже выполненный вызов
+            try:
+                if value is not _MISSING and value is not None:
+                    await redis.set(result_key, json.dumps(value, ensure_ascii=False), ex=self.result_ttl)
+                if locked:
+                    await redis.eval(RELEASE_LOCK, 1, lock_key, token)
+            except RedisError as e:
+                self.count("redis_errors")
+                print(f"Single-flight {self.name}: Redis недоступен:", e)
+
+    @staticmethod
+    async def _read_result(redis, result_key):
+        raw = await redis.get(result_key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    def stats(self):
+        return {**self.counters, "inflight": len(self._inflight), "redis": bool(self.redis_url)}
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+def create_single_flight(name, result_ttl):
+    redis_url = None
+    if settings.SINGLEFLIGHT_REDIS:
+        from celery_app import REDIS_URL
+        redis_url = REDIS_URL
+    return SingleFlight(name, redis_url=redis_url, result_ttl=max(1, result_ttl),
+                        lock_ttl=settings.SINGLEFLIGHT_LOCK_TTL, wait_timeout=settings.SINGLEFLIGHT_WAIT)
@@ -0,0 +1,183 @@
+"""
+События задач Celery через Redis pub/sub вместо опроса /tasks/{task_id}.
+Воркер публикует переходы статуса (STARTED / SUCCESS / FAILURE) в один канал,
+в каждом процессе API одна подписка раздаёт их локальным очередям ожидающих клиентов:
+нагрузка на Redis не растёт с числом открытых страниц.
+"""
+import asyncio
+import json
+
+import redis
+import redis.asyncio as aioredis
+from celery import states
+from celery.result import AsyncResult
+from redis.exceptions import RedisError
+
+from config import settings
+
+CHANNEL = "task-events"
+TERMINAL_STATES = {"SUCCESS", "FAILURE", "REVOKED"}
+RECONNECT_DELAY = 1.0
+# Части chord'а и задачи по расписанию beat: их id никто не ждёт - в канал не публикуем
+SILENT_TASKS = {"score_chunk_task", "refresh_saved_searches_task", "refill_descriptions_task",
+                "sweep_archived_task"}
+
+_publisher = None
+
+
+def publish(redis_url, task_id, status, result=None):
+    """Вызывается в воркере из сигналов Celery (синхронный клиент, один на процесс)"""
+    global _publisher
+    if _publisher is None:
+        _publisher = redis.Redis.from_url(redis_url)
+    message = json.dumps({"task_id": task_id, "status": status, "result": result},
+                         ensure_ascii=False, default=str)
+    try:
+        _publisher.publish(CHANNEL, message)
+    except RedisError as e:
+        print("События задач: Redis недоступен:", e)
+
+
+class TaskEventHub:
+    """Одна подписка на процесс API, раздача событий по task_id в asyncio.Queue"""
+
+    def __init__(self, redis_url):
+        self.redis_url = redis_url
+        self._waiters = {}  # task_id -> set(asyncio.Queue)
+        self._reader = None
+        self._connected = asyncio.Event()
+
+    def start(self):
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read_forever())
+
+    async def stop(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+
+    async def _read_forever(self):
+        while True:
+            client = aioredis.from_url(self.redis_url)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CHANNEL)
+                self._connected.set()
+                async for message in pubsub.listen():
+                    self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as e:
+                print("События задач: подписка потеряна, переподключение:", e)
+            finally:
+                self._connected.clear()
+                await pubsub.aclose()
+                await client.aclose()
+            # Пока подписки не было, события могли потеряться - ожидающие перепроверят статус
+            self._wake_all()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _dispatch(self, raw):
+        event = json.loads(raw)
+        for queue in self._waiters.get(event["task_id"], ()):
+            queue.put_nowait(event)
+
+    def _wake_all(self):
+        for task_id, queues in self._waiters.items():
+            for queue in queues:
+                queue.put_nowait({"task_id": task_id, "status": None, "result": None})
+
+    def subscribe(self, task_id):
+        self.start()
+        queue = asyncio.Queue()
+        self._waiters.setdefault(task_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, task_id, queue):
+        queues = self._waiters.get(task_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._waiters[task_id]
+
+    async def wait_connected(self, timeout):
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def stats(self):
+        return {"connected": self._connected.is_set(),
+                "tasks_waited": len(self._waiters),
+                "waiters": sum(len(queues) for queues in self._waiters.values())}
+
+
+def task_snapshot(task_id):
+    """Текущий статус задачи из result backend (формат ответа /tasks/{task_id})"""
+    from celery_app import celery_app
+    task_result = AsyncResult(task_id, app=celery_app)
+    
+    response = {
+        "task_id": task_id,
+        "status": task_result.status,
+        "result": None
+    }
+    
+    if task_result.status == 'SUCCESS':
+        response["result"] = task_result.result
+    elif task_result.status == 'FAILURE':
+        response["result"] = str(task_result.result)
+        
+    return response
+
+
+def _is_behind(status, last_status):
+    """Статус раньше уже отправленного: снимок backend отстаёт от события из канала"""
+    return last_status is not None and states.state(status) < states.state(last_status)
+
+
+def _sse(event):
+    return f"event: status\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+async def stream_task_events(task_id):
+    """
+    SSE-поток для /tasks/{task_id}/events: текущий статус сразу, дальше - переходы
+    по мере публикации воркером. Поток закрывается на конечном статусе.
+    Backend опрашивается только при подключении и раз в TASK_EVENTS_HEARTBEAT секунд
+    на случай потерянного события. Статус назад (STARTED -> PENDING) не отправляется.
+    """
+    queue = task_event_hub.subscribe(task_id)
+    try:
+        # Сначала подписка, потом проверка статуса: так событие между ними не теряется
+        await task_event_hub.wait_connected(timeout=2)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.TASK_EVENTS_TIMEOUT
+        last_status = None
+        event = await asyncio.to_thread(task_snapshot, task_id)
+        
+        while True:
+            if event["status"] != last_status and not _is_behind(event["status"], last_status):
+                last_status = event["status"]
+                yield _sse(event)
+            if last_status in TERMINAL_STATES or loop.time() > deadline:
+                return
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.TASK_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                event = await asyncio.to_thread(task_snapshot, task_id)
+                continue
+            if event["status"] is None:  # подписка переподключалась
+                event = await asyncio.to_thread(task_snapshot, task_id)
+    finally:
+        task_event_hub.unsubscribe(task_id, queue)
+
+
+def create_task_event_hub():
+    from celery_app import REDIS_URL
+    return TaskEventHub(REDIS_URL)
+
+
+task_event_hub = create_task_event_hub()
@@ -1,23 +1,200 @@
-import time
-import random
-from celery_app import celery_app
+from celery import chord
 
-@celery_app.task(name="analyze_resume_task")
-def analyze_resume_task(resume_text: str, vacancy_text: str):
+from celery_app import HIGH_PRIORITY, celery_app, run_async
+from config import settings
+from database import async_session_maker
+from features import (load_idf, load_resume_vectors, load_vacancy_vectors, store_resume_vectors,
+                      store_vacancy_vectors)
+from match_cache import match_cache
+from match_results import store_match_results
+from matching import score_vectors
+from models import Resume, ResumeVector, Vacancy, VacancyVector
+from saved_searches import due_search_groups, refill_changed_descriptions, refresh_searches, sweep_archived
+from sqlalchemy import select
+
+
+async def load_pair_vectors(resume_id: int, vacancy_id: int):
+    """
+    Векторы резюме и вакансии из БД. Если вектор ещё не посчитан
+    (данные старше этой схемы), он считается из текста и сохраняется.
+    """
+    async with async_session_maker() as session:
+        resume_vectors = await load_resume_vectors(session, [resume_id])
+        vacancy_vectors = await load_vacancy_vectors(session, [vacancy_id])
+        
+        if resume_id not in resume_vectors:
+            content = await session.scalar(select(Resume.content).where(Resume.id == resume_id))
+            resume_vectors = await store_resume_vectors(session, [(resume_id, content)])
+        if vacancy_id not in vacancy_vectors:
+            description = await session.scalar(select(Vacancy.description).where(Vacancy.id == vacancy_id))
+            vacancy_vectors = await store_vacancy_vectors(session, [(vacancy_id, description)])
+        await session.commit()
+        
+    return resume_vectors.get(resume_id, {}), vacancy_vectors.get(vacancy_id, {})
+
+
+async def corpus_idf(terms):
+    """IDF термов по всем вакансиям (terms.df) - та же формула, что у /resumes/{id}/top-matches"""
+    async with async_session_maker() as session:
+        return await load_idf(session, terms)
+
+
+async def save_match_result(resume_id: int, vacancy_id: int, result, claimed_hashes=None):
+    """
+    Кладёт результат в match_results и в match_cache под хешами тех векторов,
+    по которым он посчитан, и снимает отметку "в полёте", поставленную в /match.
+    """
+    async with async_session_maker() as session:
+        await store_match_results(session, resume_id, [(vacancy_id, result)])
+        resume_hash = await session.scalar(select(ResumeVector.content_hash)
+                                           .where(ResumeVector.resume_id == resume_id))
+        vacancy_hash = await session.scalar(select(VacancyVector.content_hash)
+                                            .where(VacancyVector.vacancy_id == vacancy_id))
+        if resume_hash and vacancy_hash:
+            await match_cache.put(session, resume_hash, vacancy_hash, result)
+        await session.commit()
+    if claimed_hashes:
+        await match_cache.release(*claimed_hashes)
+
+
+# Лимиты времени по очередям (маршруты - celery_app.py). Мягкий поднимает SoftTimeLimitExceeded
+# внутри задачи, жёсткий убивает процесс пула; сообщение при этом подтверждается, а не возвращается
+INTERACTIVE_LIMITS = {"soft_time_limit": settings.CELERY_INTERACTIVE_SOFT_LIMIT,
+                      "time_limit": settings.CELERY_INTERACTIVE_HARD_LIMIT}
+BULK_LIMITS = {"soft_time_limit": settings.CELERY_BULK_SOFT_LIMIT,
+               "time_limit": settings.CELERY_BULK_HARD_LIMIT}
+CRAWL_LIMITS = {"soft_time_limit": settings.CELERY_CRAWL_SOFT_LIMIT,
+                "time_limit": settings.CELERY_CRAWL_HARD_LIMIT}
+FILL_LIMITS = {"soft_time_limit": settings.CELERY_FILL_SOFT_LIMIT,
+               "time_limit": settings.CELERY_FILL_HARD_LIMIT}
+
+
+@celery_app.task(name="analyze_resume_task", **INTERACTIVE_LIMITS)
+def analyze_resume_task(resume_id: int, vacancy_id: int, resume_hash: str = None, vacancy_hash: str = None):
     """
     Эта функция будет выполняться ОТДЕЛЬНО, на другом процессе (Worker).
+    Берёт предпосчитанные векторы резюме и вакансии, считает совместимость
+    (см. matching.py) и возвращает структуру: score, matched/missing навыки
+    и термы, давшие больший вклад. Результат сохраняется в match_cache.
+    resume_hash/vacancy_hash - пара, которую занял /match, чтобы освободить её после записи.
+    """
+    claimed = (resume_hash, vacancy_hash) if resume_hash and vacancy_hash else None
+    try:
+        resume_weights, vacancy_weights = run_async(load_pair_vectors(resume_id, vacancy_id))
+        idf = run_async(corpus_idf(resume_weights.keys() | vacancy_weights.keys()))
+        result = score_vectors(resume_weights, vacancy_weights, idf)
+        run_async(save_match_result(resume_id, vacancy_id, result, claimed))
+    except Exception:
+        if claimed:
+            run_async(match_cache.release(*claimed))
+        raise
+    return result
+
+
+async def score_chunk(resume_id: int, vacancy_ids):
+    """
+    Анализ одного резюме против части вакансий: векторы грузятся из БД пачкой,
+    недостающие досчитываются, результаты ложатся в match_results и match_cache
+    одним INSERT в каждую.
+    """
+    async with async_session_maker() as session:
+        resume_vectors = await load_resume_vectors(session, [resume_id])
+        if resume_id not in resume_vectors:
+            content = await session.scalar(select(Resume.content).where(Resume.id == resume_id))
+            resume_vectors = await store_resume_vectors(session, [(resume_id, content)])
+        resume_weights = resume_vectors.get(resume_id, {})
+        
+        vacancy_vectors = await load_vacancy_vectors(session, vacancy_ids)
+        missing = [vacancy_id for vacancy_id in vacancy_ids if vacancy_id not in vacancy_vectors]
+        if missing:
+            rows = (await session.execute(select(Vacancy.id, Vacancy.description)
+                                          .where(Vacancy.id.in_(missing)))).all()
+            vacancy_vectors.update(await store_vacancy_vectors(session, rows))
+        
+        idf = await corpus_idf(resume_weights.keys() | {term for weights in vacancy_vectors.values()
+                                                        for term in weights})
+        results = [{"vacancy_id": vacancy_id, **score_vectors(resume_weights, vacancy_vectors[vacancy_id], idf)}
+                   for vacancy_id in vacancy_ids if vacancy_id in vacancy_vectors]
+        
+        await store_match_results(session, resume_id,
+                                  [(row["vacancy_id"], row) for row in results])
+        resume_hash = await session.scalar(select(ResumeVector.content_hash)
+                                           .where(ResumeVector.resume_id == resume_id))
+        if resume_hash and results:
+            hashes = dict((await session.execute(
+                select(VacancyVector.vacancy_id, VacancyVector.content_hash)
+                .where(VacancyVector.vacancy_id.in_([row["vacancy_id"] for row in results])))).all())
+            await match_cache.put_many(session, resume_hash,
+                                       [(hashes[row["vacancy_id"]], {k: v for k, v in row.items() if k != "vacancy_id"})
+                                        for row in results if row["vacancy_id"] in hashes])
+        await session.commit()
+    return results
+
+
+@celery_app.task(name="score_chunk_task", **BULK_LIMITS)
+def score_chunk_task(resume_id: int, vacancy_ids: list[int]):
+    """Часть пакетного анализа: в сообщении только id, тексты воркер берёт из Postgres"""
+    return run_async(score_chunk(resume_id, vacancy_ids))
+
+
+@celery_app.task(name="aggregate_matches_task", **BULK_LIMITS)
+def aggregate_matches_task(chunks, resume_id: int, limit: int = None):
+    """Склеивает результаты частей и ранжирует по score, при равенстве - по косинусу"""
+    matches = [match for chunk in chunks for match in chunk]
+    matches.sort(key=lambda match: (match["score"], match["similarity"]), reverse=True)
+    return {
+        "resume_id": resume_id,
+        "total": len(matches),
+        "matches": matches[:limit] if limit else matches,
+    }
+
+
+def analyze_batch(resume_id: int, vacancy_ids, chunk_size: int = None, limit: int = None):
+    """
+    Запускает пакетный анализ: group из score_chunk_task по chunk_size вакансий
+    и aggregate_matches_task как callback chord'а. Возвращает AsyncResult итоговой задачи.
+    Склейка идёт с наивысшим приоритетом: части уже посчитаны, клиент ждёт только её.
+    """
+    chunk_size = chunk_size or settings.MATCH_BATCH_CHUNK
+    chunks = [vacancy_ids[start:start + chunk_size] for start in range(0, len(vacancy_ids), chunk_size)]
+    header = [score_chunk_task.s(resume_id, chunk) for chunk in chunks]
+    return chord(header)(aggregate_matches_task.s(resume_id, limit).set(priority=HIGH_PRIORITY))
+
+
+@celery_app.task(name="refresh_saved_search_task", bind=True, **CRAWL_LIMITS)
+def refresh_saved_search_task(self, search_ids: list[int]):
     """
-    #AI imitaion
-    time.sleep(10)
-    
-    score = random.randint(50, 99)
-    result_text = f"""
-    [AI ANALYZED ASYNC]
-    Совместимость: {score}%
-    
-    Анализ резюме (выполнено в фоне):
-    Кандидат подходит. Мы проверили это через Celery!
-    Текст вакансии: {vacancy_text[:30]}...
-    """
-    
-    return result_text
\ No newline at end of file
+    Инкрементальное обновление группы одинаковых сохранённых поисков (saved_searches.py).
+    Описания новых и изменившихся вакансий - отдельной задачей в очереди fill:
+    обход следующего поиска не ждёт сотни запросов к HH по вакансиям.
+    Приоритет наследуется: ручное обновление из API не встанет за плановыми.
+    """
+    result, changed = run_async(refresh_searches(search_ids))
+    if changed:
+        priority = (self.request.delivery_info or {}).get("priority")
+        refill_descriptions_task.apply_async(([list(target) for target in changed],), priority=priority)
+    return result
+
+
+@celery_app.task(name="refill_descriptions_task", **FILL_LIMITS)
+def refill_descriptions_task(targets: list[list]):
+    """Описания для [vacancy_id, hh_id] условным GET; пишутся только изменившиеся"""
+    return run_async(refill_changed_descriptions([tuple(target) for target in targets]))
+
+
+@celery_app.task(name="refresh_saved_searches_task", **CRAWL_LIMITS)
+def refresh_saved_searches_task():
+    """
+    По расписанию beat: задача на каждую группу поисков, которым пора обновиться.
+    Не выполненная за интервал задача снимается (expires) - следующий запуск поставит её снова.
+    """
+    groups = run_async(due_search_groups())
+    for search_ids in groups:
+        refresh_saved_search_task.apply_async((search_ids,), expires=settings.SAVED_SEARCH_REFRESH_INTERVAL)
+    return {"groups": len(groups)}
+
+
+@celery_app.task(name="sweep_archived_task", **FILL_LIMITS)
+def sweep_archived_task():
+    """По расписанию beat: проверка давно не виденных вакансий на архив"""
+    return run_async(sweep_archived())
@@ -0,0 +1,367 @@
+"""
+Индекс вакансий в памяти процесса для ранжирования "одно резюме против всех вакансий".
+Строки - вакансии, столбцы - термы, значения - сублинейный tf из matching.term_weights.
+Добавление/обновление вакансии стоит O(длины её текста), полная пересборка
+происходит только при слиянии накопленных изменений.
+Векторы, записанные другими процессами (воркеры, /import/vacancies), индекс догружает
+по vacancy_vectors.updated_at не чаще раза в VACANCY_INDEX_SYNC_INTERVAL секунд.
+Загрузка и слияние идут в потоке (asyncio.to_thread): event loop в это время
+обслуживает другие запросы, а top_k только считает по готовым матрицам.
+"""
+import asyncio
+import math
+import time
+from datetime import timedelta
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func, select
+
+from config import settings
+from database import async_session_maker
+from features import load_vacancy_vectors, load_vacancy_vectors_packed, store_vacancy_vectors, unpack_vectors
+from matching import term_weights, tokenize
+from models import Vacancy, VacancyVector
+
+LOAD_CHUNK = 2000
+MERGE_MIN_PENDING = 2000  # дельта меньше этого размера не сливается
+MERGE_PENDING_RATIO = 0.05
+COMPACT_DEAD_RATIO = 0.2  # при такой доле удалённых строк матрица пересобирается
+SYNC_OVERLAP = timedelta(seconds=30)  # запас на транзакции, закоммиченные позже начала
+
+
+class VacancyIndex:
+    """
+    Основная матрица пересобирается редко: новые и изменённые вакансии копятся
+    в небольшой "дельте", которая проверяется отдельно при каждом запросе.
+    Когда дельта или доля удалённых строк вырастает, всё сливается в одну матрицу
+    и пересчитываются IDF и нормы строк.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+        self._df = np.zeros(1024, dtype=np.int64)
+        self._csr = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._csc = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._ids = []  # vacancy_id по номерам строк основной матрицы
+        self._row_of = {}  # vacancy_id -> номер строки
+        self._alive = np.zeros(0, dtype=bool)
+        self._pending = {}  # vacancy_id -> (columns, values), ещё не в основной матрице
+        self._delta = None  # (ids, csr, нормы) собранная дельта, сбрасывается при изменениях
+        self.synced_at = None  # наибольший updated_at среди загруженных из БД векторов
+        self._synced_hashes = {}  # vacancy_id -> content_hash из последнего окна догонки
+        self._sync_checked = 0.0  # time.monotonic() последней догонки
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+        self._merge_task = None
+        self._touched = None  # vacancy_id, изменённые во время слияния в потоке
+
+    def __len__(self):
+        return int(self._alive.sum()) + len(self._pending)
+
+    def _column(self, term):
+        column = self.vocabulary.get(term)
+        if column is None:
+            column = len(self.vocabulary)
+            self.vocabulary[term] = column
+            if column >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(len(self._df), dtype=np.int64)])
+        return column
+
+    def upsert_weights(self, vacancy_id, weights):
+        """
+        Добавляет или заменяет вакансию по готовому словарю терм -> вес.
+        До загрузки индекса ничего не делает: загрузка прочитает вектор из БД сама,
+        а частичный индекс выглядел бы загруженным корпусом из нескольких вакансий.
+        """
+        if not self.loaded:
+            return
+        self._upsert_weights(vacancy_id, weights)
+
+    def _upsert_weights(self, vacancy_id, weights):
+        self.remove(vacancy_id)
+        if not weights:
+            return
+        columns = np.fromiter((self._column(term) for term in weights), dtype=np.int32, count=len(weights))
+        values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+        self._df[columns] += 1
+        self._pending[vacancy_id] = (columns, values)
+        self._delta = None
+
+    def upsert_text(self, vacancy_id, text):
+        self.upsert_weights(vacancy_id, term_weights(tokenize(text)))
+
+    def remove(self, vacancy_id):
+        if self._touched is not None:
+            self._touched.add(vacancy_id)
+        pending = self._pending.pop(vacancy_id, None)
+        if pending is not None:
+            self._df[pending[0]] -= 1
+            self._delta = None
+            return
+        row = self._row_of.pop(vacancy_id, None)
+        if row is not None:
+            start, end = self._csr.indptr[row], self._csr.indptr[row + 1]
+            self._df[self._csr.indices[start:end]] -= 1
+            self._alive[row] = False
+            self._norms[row] = np.inf  # строка остаётся в матрице до слияния, но даёт 0
+
+    @staticmethod
+    def _pending_matrix(pending, ids, n_terms):
+        columns = [pending[vacancy_id][0] for vacancy_id in ids]
+        values = [pending[vacancy_id][1] for vacancy_id in ids]
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in columns], out=indptr[1:])
+        return sparse.csr_matrix((np.concatenate(values), np.concatenate(columns), indptr),
+                                 shape=(len(ids), n_terms))
+
+    @staticmethod
+    def _idf_from(df, documents):
+        return (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32)
+
+    def _current_idf(self):
+        return self._idf_from(self._df[:len(self.vocabulary)], len(self))
+
+    def idf_for(self, terms):
+        """
+        Терм -> IDF по текущему корпусу для matching.score_vectors, формула та же, что в top_k.
+        Терм, которого нет ни в одной вакансии, получает наибольший IDF.
+        """
+        documents = len(self)
+        idf = {}
+        for term in terms:
+            column = self.vocabulary.get(term)
+            df = int(self._df[column]) if column is not None else 0
+            idf[term] = math.log((1 + documents) / (1 + df)) + 1
+        return idf
+
+    def _needs_merge(self):
+        rows = len(self._alive)
+        dead = rows - int(self._alive.sum())
+        return (len(self._pending) > max(MERGE_MIN_PENDING, MERGE_PENDING_RATIO * rows)
+                or dead > COMPACT_DEAD_RATIO * max(rows, 1)
+                or (self._csc is None and self._pending))
+
+    def _merge_snapshot(self):
+        """Всё, что нужно _build_merged, - копии, которые не меняются, пока поток считает"""
+        n_terms = max(1, len(self.vocabulary))
+        return (self._csr, list(self._ids), self._alive.copy(), dict(self._pending),
+                self._df[:n_terms].copy(), len(self), n_terms)
+
+    @classmethod
+    def _build_merged(cls, csr, ids, alive, pending, df, documents, n_terms):
+        """
+        Полная пересборка: дельта вливается в основную матрицу, IDF и нормы считаются заново.
+        Не трогает self - выполняется в потоке, пока индекс обслуживает запросы.
+        """
+        # Те же массивы, только шире по числу термов (словарь только растёт)
+        csr = sparse.csr_matrix((csr.data, csr.indices, csr.indptr), shape=(csr.shape[0], n_terms))
+
+        keep = np.flatnonzero(alive)
+        if len(keep) < len(alive):
+            csr = csr[keep]
+            ids = [ids[row] for row in keep]
+
+        if pending:
+            pending_ids = list(pending)
+            csr = sparse.vstack([csr, cls._pending_matrix(pending, pending_ids, n_terms)], format="csr")
+            ids.extend(pending_ids)
+
+        idf = cls._idf_from(df, documents)
+        return csr, ids, idf, cls._row_norms(csr, idf), csr.tocsc()
+
+    def _apply_merged(self, merged, touched=()):
+        """
+        Подменяет матрицы собранными. Вакансии, изменённые во время сборки (touched),
+        берутся из текущего состояния: их строки в новой матрице гасятся, свежие
+        версии остаются в дельте. df ведётся инкрементально и уже учитывает эти изменения.
+        """
+        self._csr, self._ids, self._idf, self._norms, self._csc = merged
+        self._row_of = {vacancy_id: row for row, vacancy_id in enumerate(self._ids)}
+        self._alive = np.ones(len(self._ids), dtype=bool)
+        self._pending = {vacancy_id: self._pending[vacancy_id] for vacancy_id in touched
+                         if vacancy_id in self._pending}
+        self._delta = None
+        for vacancy_id in touched:
+            row = self._row_of.pop(vacancy_id, None)
+            if row is not None:
+                self._alive[row] = False
+                self._norms[row] = np.inf
+
+    def _merge(self):
+        """Слияние синхронно, в текущем потоке (бенчмарки, загрузка в потоке)"""
+        self._apply_merged(self._build_merged(*self._merge_snapshot()))
+
+    async def merge(self):
+        """Слияние в потоке; запросы в это время идут по старым матрицам и дельте"""
+        self._touched = set()
+        try:
+            merged = await asyncio.to_thread(self._build_merged, *self._merge_snapshot())
+            self._apply_merged(merged, self._touched)
+        finally:
+            self._touched = None
+            self._merge_task = None
+
+    def _schedule_merge(self):
+        if self._merge_task is None and self._needs_merge():
+            self._merge_task = asyncio.create_task(self.merge())
+
+    @staticmethod
+    def _row_norms(matrix, idf):
+        squared = matrix.multiply(matrix) @ (idf[:matrix.shape[1]] ** 2)
+        norms = np.sqrt(np.asarray(squared, dtype=np.float32)).ravel()
+        norms[norms == 0] = np.inf
+        return norms
+
+    def top_k(self, resume_text, k=20):
+        """
+        Косинус TF-IDF резюме со всеми вакансиями за один проход по разреженной матрице.
+        Возвращает [(vacancy_id, similarity)] по убыванию.
+        """
+        query = {term: weight for term, weight in term_weights(tokenize(resume_text)).items()
+                 if term in self.vocabulary}
+        if not query or len(self) == 0:
+            return []
+
+        idf_now = self._current_idf()
+        columns = np.fromiter((self.vocabulary[term] for term in query), dtype=np.int32, count=len(query))
+        values = np.fromiter(query.values(), dtype=np.float32, count=len(query))
+        query_norm = math.sqrt(float(np.sum((values * idf_now[columns]) ** 2)))
+
+        parts = []
+        main_rows = 0
+        delta_ids = []
+        if self._csc is not None and self._csc.shape[0]:
+            # Только столбцы термов резюме: работа пропорциональна их постинг-листам.
+            # Нормы основной матрицы посчитаны с IDF на момент слияния - расхождение мизерное
+            main_columns = columns[columns < self._csc.shape[1]]
+            main_values = values[columns < self._csc.shape[1]]
+            idf = self._idf[main_columns]
+            parts.append(self._csc[:, main_columns] @ (main_values * idf * idf) / self._norms)
+            main_rows = len(self._ids)
+
+        if self._pending:
+            if self._delta is None:
+                delta_ids = list(self._pending)
+                delta = self._pending_matrix(self._pending, delta_ids, max(1, len(self.vocabulary)))
+                self._delta = (delta_ids, delta, self._row_norms(delta, idf_now))
+            delta_ids, delta, delta_norms = self._delta
+            dense_query = np.zeros(delta.shape[1], dtype=np.float32)
+            dense_query[columns[columns < delta.shape[1]]] = values[columns < delta.shape[1]]
+            parts.append(delta @ (dense_query * idf_now[:delta.shape[1]] ** 2) / delta_norms)
+
+        scores = np.concatenate(parts) / query_norm
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[row] if row < main_rows else delta_ids[row - main_rows], float(scores[row]))
+                for row in top if scores[row] > 0]
+
+    async def warm_up(self):
+        """Загрузка при старте API в фоне, чтобы первый /top-matches её не ждал"""
+        try:
+            async with async_session_maker() as session:
+                await self.ensure_loaded(session)
+        except Exception as error:
+            # Не страшно: загрузку повторит первый запрос
+            print(f"Индекс вакансий не загружен при старте: {error!r}")
+
+    async def ensure_loaded(self, session):
+        """
+        Первый запрос загружает предпосчитанные векторы всех вакансий с описанием.
+        Вакансии, у которых вектора ещё нет (старые данные), досчитываются и сохраняются.
+        Следующие - раз в VACANCY_INDEX_SYNC_INTERVAL секунд догоняют изменения (catch_up)
+        и, если дельта выросла, запускают слияние в фоне.
+        """
+        if self.loaded:
+            if time.monotonic() - self._sync_checked >= settings.VACANCY_INDEX_SYNC_INTERVAL:
+                self._sync_checked = time.monotonic()
+                await self.catch_up(session)
+            self._schedule_merge()
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            missing = (select(Vacancy.id, Vacancy.description)
+                       .outerjoin(VacancyVector, VacancyVector.vacancy_id == Vacancy.id)
+                       .where(Vacancy.description.is_not(None), Vacancy.description != "",
+                              VacancyVector.vacancy_id.is_(None))
+                       .limit(LOAD_CHUNK))
+            while True:
+                rows = (await session.execute(missing)).all()
+                if not rows:
+                    break
+                await store_vacancy_vectors(session, rows)
+                await session.commit()
+
+            self.synced_at = await session.scalar(select(func.max(VacancyVector.updated_at)))
+            # Почти-дубликаты (dedup.py) не ранжируются: в выдаче была бы одна вакансия несколько раз
+            rows = (await session.execute(select(VacancyVector.vacancy_id, VacancyVector.content_hash,
+                                                 VacancyVector.updated_at)
+                                          .join(Vacancy, Vacancy.id == VacancyVector.vacancy_id)
+                                          .where(Vacancy.duplicate_of.is_(None)))).all()
+            ids = [row.vacancy_id for row in rows]
+            # Строки из окна первой догонки уже загружены - повторно их не читаем
+            if self.synced_at is not None:
+                self._synced_hashes = {row.vacancy_id: row.content_hash for row in rows
+                                       if row.updated_at > self.synced_at - SYNC_OVERLAP}
+            # До loaded=True индекс никто больше не меняет и не читает - поток работает с ним напрямую
+            for start in range(0, len(ids), LOAD_CHUNK):
+                packed = await load_vacancy_vectors_packed(session, ids[start:start + LOAD_CHUNK])
+                await asyncio.to_thread(self._load_packed, *packed)
+            await asyncio.to_thread(self._merge)
+            self._sync_checked = time.monotonic()
+            self.loaded = True
+            print(f"Индекс вакансий загружен: {len(self)} шт.")
+
+    def _load_packed(self, rows, terms):
+        for vacancy_id, weights in unpack_vectors(rows, terms).items():
+            self._upsert_weights(vacancy_id, weights)
+
+    async def catch_up(self, session):
+        """
+        Догружает векторы, записанные после прошлой синхронизации, в том числе другими
+        процессами: refill_descriptions_task, /import/vacancies, fill-batch другого воркера API.
+        updated_at - время начала транзакции, поэтому окно берётся с запасом; строки из
+        прошлого окна с тем же content_hash повторно не читаются.
+        """
+        async with self._load_lock:
+            query = (select(VacancyVector.vacancy_id, VacancyVector.content_hash,
+                            VacancyVector.updated_at, Vacancy.duplicate_of)
+                     .join(Vacancy, Vacancy.id == VacancyVector.vacancy_id))
+            if self.synced_at is not None:
+                query = query.where(VacancyVector.updated_at > self.synced_at - SYNC_OVERLAP)
+            rows = (await session.execute(query)).all()
+
+            changed = []
+            for row in rows:
+                self.synced_at = max(self.synced_at or row.updated_at, row.updated_at)
+                if self._synced_hashes.get(row.vacancy_id) == row.content_hash:
+                    continue
+                if row.duplicate_of is None:
+                    changed.append(row.vacancy_id)
+                else:
+                    self.remove(row.vacancy_id)
+            for start in range(0, len(changed), LOAD_CHUNK):
+                packed = await load_vacancy_vectors_packed(session, changed[start:start + LOAD_CHUNK])
+                vectors = await asyncio.to_thread(unpack_vectors, *packed)
+                for vacancy_id, weights in vectors.items():
+                    self._upsert_weights(vacancy_id, weights)
+            self._synced_hashes = {row.vacancy_id: row.content_hash for row in rows}
+
+    async def apply_duplicates(self, session, duplicates, canonical):
+        """Итог dedup.link_duplicates: дубликаты убираются, снова канонические - возвращаются"""
+        if not self.loaded:
+            return
+        for vacancy_id in duplicates:
+            self.remove(vacancy_id)
+        missing = [vacancy_id for vacancy_id in canonical
+                   if vacancy_id not in self._row_of and vacancy_id not in self._pending]
+        if missing:
+            for vacancy_id, weights in (await load_vacancy_vectors(session, missing)).items():
+                self._upsert_weights(vacancy_id, weights)
+
+
+vacancy_index = VacancyIndex()
@@ -0,0 +1,73 @@
+"""
+Поиск по уже сохранённым вакансиям без обращения к HH:
+сгенерированная колонка Vacancy.search_vector + GIN-индекс.
+Ранжирование - ts_rank_cd, подсветка - ts_headline только для строк текущей страницы.
+
+Вектор описания (~4 КБ) лежит в TOAST, и его распаковка - основная цена и проверки @@
+без индекса, и ранжирования. Поэтому совпадения собираются отдельным CTE только из id
+(GIN-индекс отдаёт их без распаковки), а ts_rank_cd считается только для
+SEARCH_RANK_CANDIDATES самых свежих из них. Сколько совпало и ранжировано ли всё,
+видно в ответе (matched, ranked_candidates, truncated).
+"""
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Vacancy
+
+SEARCH_CONFIG = "russian"
+HEADLINE_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=25, MinWords=8, FragmentDelimiter= … "
+
+
+async def search_vacancies_local(session: AsyncSession, q, limit=20, offset=0):
+    """
+    q - запрос в синтаксисе websearch ("python -java", "\"data engineer\"", "go or rust").
+    Почти-дубликаты (dedup.py) не показываются - только каноническая вакансия.
+    Возвращает {"items": [...], "next_offset": int | None, "matched": int,
+    "ranked_candidates": int, "truncated": bool}: при truncated ранжированы только
+    ranked_candidates самых свежих из matched совпадений.
+    """
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(Vacancy.search_vector, query)
+
+    # MATERIALIZED: ORDER BY id DESC LIMIT не протекает внутрь, и планировщик не подменяет
+    # обход GIN обходом первичного ключа с проверкой @@ (и распаковкой) каждой строки
+    matches = (select(Vacancy.id)
+               .where(Vacancy.search_vector.op("@@")(query), Vacancy.duplicate_of.is_(None))
+               .cte("matches").prefix_with("MATERIALIZED"))
+    candidates = (select(matches.c.id)
+                  .order_by(matches.c.id.desc())
+                  .limit(settings.SEARCH_RANK_CANDIDATES)
+                  .cte("candidates"))
+    matched = select(func.count()).select_from(matches).scalar_subquery()
+    # Сначала страница id по рангу, потом подсветка только её строк
+    page = (select(Vacancy.id, rank.label("rank"))
+            .join(candidates, candidates.c.id == Vacancy.id)
+            .order_by(rank.desc(), Vacancy.id)
+            .limit(limit + 1).offset(offset)
+            .subquery())
+    stmt = (select(Vacancy.id, Vacancy.hh_id, Vacancy.name, Vacancy.url, page.c.rank, matched.label("matched"),
+                   func.ts_headline(SEARCH_CONFIG, Vacancy.name, query, "HighlightAll=true").label("name_highlight"),
+                   func.ts_headline(SEARCH_CONFIG, func.coalesce(Vacancy.description, ""), query,
+                                    HEADLINE_OPTIONS).label("headline"))
+            .join(page, page.c.id == Vacancy.id)
+            .order_by(page.c.rank.desc(), Vacancy.id))
+
+    rows = (await session.execute(stmt)).mappings().all()
+    if rows:
+        total = rows[0]["matched"]
+    elif offset:
+        # Страница за концом выдачи - число совпадений отдельным запросом
+        total = await session.scalar(select(matched))
+    else:
+        total = 0
+    items = [{**row, "rank": round(row["rank"], 4)} for row in rows[:limit]]
+    for item in items:
+        del item["matched"]
+    return {
+        "items": items,
+        "next_offset": offset + limit if len(rows) > limit else None,
+        "matched": total,
+        "ranked_candidates": min(total, settings.SEARCH_RANK_CANDIDATES),
+        "truncated": total > settings.SEARCH_RANK_CANDIDATES,
+    }